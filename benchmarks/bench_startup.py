@@ -0,0 +1,104 @@
+"""
+Benchmark: cold start time of the command line entry points.
+
+ - every case runs in a fresh interpreter (wall time includes Python itself)
+ - reports the in-process import / run time, whether yfinance got imported
+   and how many filter modules were loaded
+ - the snapshot run screens a synthetic snapshot with config.PIPELINE and
+   must not import yfinance
+ - --importtime prints the slowest imports of run_pipeline (python -X importtime)
+
+    python -m benchmarks.bench_startup --repeat 5 --importtime 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+%s
+seconds = time.perf_counter() - start
+print("BENCH " + json.dumps({"seconds": seconds, "yfinance": "yfinance" in sys.modules,
+                             "filters": sum(m.startswith("filters.") for m in sys.modules)}))
+"""
+
+SNAPSHOT = """
+from core.snapshot import Snapshot, save_snapshot
+from core.synthetic import synthetic_market
+prices, fundamentals, history = synthetic_market(%d, 252)
+# fetched the day of its last synthetic bar, or the check run finds the history stale
+save_snapshot(Snapshot(prices, fundamentals, history, fetched_at=history.index[-1].timestamp()), %r)
+"""
+
+
+def cases(snapshot_dir):
+    return [
+        ("screener --help", "import screener\ntry:\n    screener.main(['--help'])\nexcept SystemExit:\n    pass"),
+        ("import core.screen", "import core.screen"),
+        ("import core.data_loader", "import core.data_loader"),
+        ("import run_pipeline", "import run_pipeline"),
+        ("run --from-snapshot", "import screener\nscreener.main(['run', '--from-snapshot', %r, '--output', 'out.csv'])"
+         % snapshot_dir),
+    ]
+
+
+def python(code, cwd, *flags):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=cwd, env=env, capture_output=True,
+                          text=True, check=True)
+
+
+def probe(body, cwd):
+    start = time.perf_counter()
+    out = python(PROBE % body, cwd).stdout
+    wall = time.perf_counter() - start
+    line = [line for line in out.splitlines() if line.startswith("BENCH ")][-1]
+    return wall, json.loads(line[len("BENCH "):])
+
+
+def slowest_imports(cwd, n):
+    # -X importtime writes "import time: self | cumulative | name" lines to stderr
+    rows = []
+    for line in python("import run_pipeline", cwd, "-X", "importtime").stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tickers", type=int, default=500, help="synthetic snapshot size")
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="also list the N slowest imports")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_dir = os.path.join(tmp, "snapshot")
+        python(SNAPSHOT % (args.tickers, snapshot_dir), tmp)
+        print("%-24s %10s %10s %10s %9s %8s" % ("case", "wall ms", "min ms", "in-proc ms", "yfinance", "filters"))
+        for label, body in cases(snapshot_dir):
+            runs = [probe(body, tmp) for _ in range(args.repeat)]
+            walls = [wall for wall, _ in runs]
+            last = runs[-1][1]
+            print("%-24s %10.1f %10.1f %10.1f %9s %8d" % (
+                label, 1000 * statistics.median(walls), 1000 * min(walls),
+                1000 * statistics.median(r["seconds"] for _, r in runs), last["yfinance"], last["filters"]))
+
+        if args.importtime:
+            print("\nslowest imports of run_pipeline (cumulative ms)")
+            for micros, name in slowest_imports(tmp, args.importtime):
+                print("%10.1f  %s" % (micros / 1000, name))
+
+
+if __name__ == "__main__":
+    main()
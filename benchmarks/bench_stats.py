@@ -0,0 +1,71 @@
+"""
+Benchmark: core.stats kernel vs the old pandas volatility / momentum code.
+
+    python -m benchmarks.bench_stats --tickers 5000 --years 10
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import stats
+from core.synthetic import synthetic_history
+
+
+def pandas_volatility(history, window):
+    # what filter_by_volatility used to do
+    returns = history.pct_change().dropna()
+    return returns.rolling(window=window).std().iloc[-1]
+
+
+def pandas_momentum(history, days):
+    # what filter_by_momentum used to do
+    return (history.iloc[-1] / history.shift(days).iloc[-1]) - 1
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=5000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--months", type=int, default=3)
+    args = parser.parse_args()
+
+    # dense matrix: the old pct_change().dropna() only matches without gaps
+    history = synthetic_history(args.tickers, args.years * 252, listing_rate=0, delisting_rate=0)
+    days = args.months * 21
+    print("history: %d days x %d tickers" % history.shape)
+
+    t_old, old = timed(lambda: pandas_volatility(history, args.window))
+    stats.clear_cache()
+    t_new, new = timed(lambda: stats.volatility(history, args.window), repeat=1)
+    t_hot, _ = timed(lambda: stats.volatility(history, args.window))
+    assert np.allclose(old.to_numpy(), new.to_numpy(), equal_nan=True)
+    print("volatility: pandas %.4fs  numpy cold %.4fs  cached %.6fs" % (t_old, t_new, t_hot))
+
+    t_old, old = timed(lambda: pandas_momentum(history, days))
+    stats.clear_cache()
+    t_new, new = timed(lambda: stats.momentum(history, days), repeat=1)
+    t_hot, _ = timed(lambda: stats.momentum(history, days))
+    assert np.allclose(old.to_numpy(), new.to_numpy(), equal_nan=True)
+    print("momentum:   pandas %.4fs  numpy cold %.4fs  cached %.6fs" % (t_old, t_new, t_hot))
+
+    values = history.to_numpy()
+    windows = [20, 60, 120, 250]
+    t_multi, _ = timed(lambda: stats.trailing_volatility(values, windows))
+    print("trailing_volatility for windows %s: %.4fs" % (windows, t_multi))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: output writer throughput (core.writers) vs DataFrame.to_excel.
+
+ - one allocation-shaped frame per size, written with every format
+ - a multi result set write (--accounts frames) through write_frames
+
+    python -m benchmarks.bench_writers --rows 1000,10000,100000 --accounts 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.equal_weight import apply_equal_weight
+from core.synthetic import SECTORS, tickers
+from core.writers import EXTENSIONS, write_frame, write_frames
+
+
+def allocation_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Ticker": tickers(n),
+        "Price": rng.lognormal(np.log(60), 1.0, n),
+        "sector": pd.Categorical(rng.choice(SECTORS, n)),
+    })
+    return apply_equal_weight(df, 100000)
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(label, rows, seconds, path):
+    size = os.path.getsize(path) if os.path.isfile(path) else 0
+    print("%-22s %8d rows  %8.4fs  %10.0f rows/s  %8.2f MB" % (label, rows, seconds, rows / seconds, size / 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", default="1000,10000,100000", help="comma separated frame sizes")
+    parser.add_argument("--accounts", type=int, default=20, help="result sets for the write_frames run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-to-excel", action="store_true", help="skip the slow to_excel baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (int(r) for r in args.rows.split(",")):
+            df = allocation_frame(n)
+            if not args.skip_to_excel:
+                path = os.path.join(tmp, "baseline.xlsx")
+                report("to_excel", n, timed(lambda: df.to_excel(path, index=False), args.repeat), path)
+            for fmt, ext in EXTENSIONS.items():
+                path = os.path.join(tmp, "out" + ext)
+                report(fmt, n, timed(lambda: write_frame(df, path), args.repeat), path)
+
+            if args.accounts:
+                frames = {"account_%d" % i: df for i in range(args.accounts)}
+                for fmt, ext in EXTENSIONS.items():
+                    path = os.path.join(tmp, "multi" + ext)
+                    seconds = timed(lambda: write_frames(frames, path), args.repeat)
+                    report("%s x%d sets" % (fmt, args.accounts), n * args.accounts, seconds, path)
+            print()
+
+
+if __name__ == "__main__":
+    main()
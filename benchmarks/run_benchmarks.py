@@ -0,0 +1,165 @@
+"""
+Offline benchmark of every pipeline stage on synthetic market data.
+
+ - no network: prices, fundamentals and history come from core.synthetic
+ - times the validation stage, each filters/* function, apply_pipeline, apply_equal_weight,
+   allocate_batch (--accounts portfolio sizes) and finalize_and_save for
+   every universe size / history length asked for
+ - writes machine readable JSON so runs can be compared between releases
+
+    python -m benchmarks.run_benchmarks --sizes 500,5000,50000 --days 252 --out bench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.equal_weight import allocate_batch, apply_equal_weight
+from core.planner import Planner
+from core.synthetic import synthetic_market
+from core.validation import validate
+from filters.beta_filter import filter_by_beta
+from filters.dividend_filter import filter_by_dividend
+from filters.marketcap_filter import filter_by_marketcap
+from filters.momentum_filter import filter_by_momentum
+from filters.pe_filter import filter_by_pe
+from filters.price_filter import filter_by_price
+from filters.sector_filter import filter_by_sector
+from filters.volatility_filter import filter_by_volatility
+from filters.volume_filter import filter_by_volume
+
+import config
+import run_pipeline
+
+FILTER_FUNCTIONS = {
+    "price": (filter_by_price, None),
+    "volume": (filter_by_volume, "fundamentals_df"),
+    "marketcap": (filter_by_marketcap, "fundamentals_df"),
+    "pe": (filter_by_pe, "fundamentals_df"),
+    "dividend": (filter_by_dividend, "fundamentals_df"),
+    "beta": (filter_by_beta, "fundamentals_df"),
+    "volatility": (filter_by_volatility, "price_history_df"),
+    "momentum": (filter_by_momentum, "price_history_df"),
+    "sector": (filter_by_sector, "fundamentals_df"),
+}
+
+
+def measure(fn, repeat):
+    """Run fn `repeat` times, returns (timings, last result)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def record(results, stage, size, days, timings, rows_in, rows_out):
+    results.append({
+        "stage": stage,
+        "tickers": size,
+        "days": days,
+        "repeat": len(timings),
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "rows_in": int(rows_in),
+        "rows_out": int(rows_out),
+    })
+    logging.info("%-22s %6d tickers x %4d days  min %.5fs  median %.5fs",
+                 stage, size, days, min(timings), statistics.median(timings))
+
+
+def bench_size(size, days, repeat, seed, save, results, accounts=0):
+    prices, fundamentals, history = synthetic_market(size, days, seed=seed)
+    inputs = {"fundamentals_df": fundamentals, "price_history_df": history}
+
+    timings, (valid, _, _, _) = measure(
+        lambda: validate(prices, fundamentals, history, **(config.VALIDATION or {})), repeat)
+    record(results, "validate", size, days, timings, len(prices), len(valid))
+
+    for name, (fn, extra) in FILTER_FUNCTIONS.items():
+        params = dict(config.FILTERS.get(name, {}))
+        if extra:
+            params[extra] = inputs[extra]
+        timings, out = measure(lambda: fn(prices, **params), repeat)
+        record(results, "filter_by_%s" % name, size, days, timings, len(prices), len(out))
+
+    # in memory planner: the production stats are neither read nor written, no JSON write is timed
+    timings, screened = measure(
+        lambda: run_pipeline.apply_pipeline(prices, fundamentals, history, planner=Planner()), repeat)
+    record(results, "apply_pipeline", size, days, timings, len(prices), len(screened))
+
+    timings, final = measure(
+        lambda: apply_equal_weight(screened, config.PORTFOLIO_SIZE, config.ALLOW_FRACTIONAL), repeat)
+    record(results, "apply_equal_weight", size, days, timings, len(screened), len(final))
+
+    if accounts:
+        portfolio_sizes = np.random.default_rng(seed).lognormal(np.log(config.PORTFOLIO_SIZE), 1.0, accounts)
+        timings, shares = measure(lambda: allocate_batch(screened["Price"], portfolio_sizes), repeat)
+        record(results, "allocate_batch", size, days, timings, len(screened) * accounts, shares.size)
+
+    if save:
+        with tempfile.TemporaryDirectory() as tmp:
+            original = config.OUTPUT_FILE
+            config.OUTPUT_FILE = os.path.join(tmp, os.path.basename(original))
+            try:
+                timings, saved = measure(lambda: run_pipeline.finalize_and_save(screened), repeat)
+            finally:
+                config.OUTPUT_FILE = original
+        record(results, "finalize_and_save", size, days, timings, len(screened), len(saved))
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pipeline": list(config.PIPELINE),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the screener stages on synthetic data.")
+    parser.add_argument("--sizes", default="500,5000", help="comma separated universe sizes (up to 50000)")
+    parser.add_argument("--days", default="252", help="comma separated history lengths in trading days")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--accounts", type=int, default=1000, help="portfolio sizes for allocate_batch (0 = skip)")
+    parser.add_argument("--no-save", action="store_true", help="skip finalize_and_save (Excel write)")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+    # per-step pipeline logging would swamp the timings output
+    logging.getLogger("run_pipeline").setLevel(logging.WARNING)
+
+    results = []
+    for days in (int(d) for d in args.days.split(",")):
+        for size in (int(s) for s in args.sizes.split(",")):
+            bench_size(size, days, args.repeat, args.seed, not args.no_save, results, args.accounts)
+
+    with open(args.out, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    logging.info("Wrote %d measurements to %s", len(results), args.out)
+
+
+if __name__ == "__main__":
+    main()
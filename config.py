@@ -1,6 +1,48 @@
 PORTFOLIO_SIZE = 100000
 ALLOW_FRACTIONAL = False
 OUTPUT_FILE = "equal_weight_filtered.xlsx"
+#parquet / feather / csv / xlsx, None = pick by the OUTPUT_FILE extension
+OUTPUT_FORMAT = None
+#previous run's allocation, the trade list is diffed against it (None = no rebalance stage)
+HOLDINGS_SNAPSHOT = "data/holdings.parquet"
+TRADES_FILE = "data/trades.csv"
+#no-trade band as a share of account value, smallest trade worth sending, cost estimate in basis points
+REBALANCE = {"band": 0.005, "min_trade_value": 0.0, "cost_bps": 5.0}
+#constituent file (csv with a Symbol column or one symbol per line), None = S&P 500 list
+UNIVERSE_FILE = None
+#chunked price/history downloads for large universes: symbols per request, chunks in flight
+DOWNLOAD = {"chunk_size": 500, "max_workers": 4}
+#concurrent fundamentals fetch: worker threads, requests per second (None = unlimited), retries per ticker
+FETCH = {"max_workers": 8, "rate_limit": 10, "retries": 2, "backoff": 0.5}
+#on-disk market data cache (set CACHE_DIR = None to always download), ttl in seconds per dataset
+CACHE_DIR = ".cache/market_data"
+CACHE_TTL = {"constituents": 86400, "fundamentals": 86400, "history": 3600, "prices": 60}
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+#local append-only price history (set HISTORY_STORE = None to download the full period every run)
+HISTORY_STORE = "data/history_store.parquet"
+#yfinance style period: 60d / 6mo / 1y / 5y / ytd / max (max starts in 1962)
+HISTORY_PERIOD = "1y"
+#per-stage run metrics written by run_pipeline (None = only logged), --profile dumps cProfile for these stages
+METRICS_JSON = None
+METRICS_PROM = None
+PROFILE_STAGES = ["fetch.fundamentals", "fetch.history", "filter.volatility", "filter.momentum", "write_output"]
+#seconds the streamlit UI keeps a loaded data snapshot before fetching again
+SNAPSHOT_TTL = 3600
+#shared on-disk snapshot (memory-mapped history) written by run_pipeline and opened by the UI, None = off
+SNAPSHOT_DIR = "data/snapshot"
+#seconds between background dataset refreshes in serve.py
+SERVICE_REFRESH_SECONDS = 900
+#data quality checks between fetching and screening (None = off): bars a ticker's last close may lag the
+#latest date, largest one day close ratio either way, share of bars with a close since the first one,
+#largest live price vs last close move, dates with fewer closes than this share are dropped, reasons only
+#reported instead of quarantined (yfinance closes are split adjusted, big one day jumps are usually real)
+VALIDATION = {"max_stale_bars": 5, "max_jump": 1.9, "min_coverage": 0.8, "window": 252, "max_price_gap": 0.5,
+              "min_date_coverage": 0.5, "warn_only": ["history_jump"]}
+#quarantined tickers with their reasons, and the per-run quality report as JSON (None = only logged)
+QUARANTINE_FILE = "data/quarantine.csv"
+QUALITY_REPORT = None
+#learned per filter cost / selectivity used to order config.PIPELINE (None = run in the listed order)
+PLANNER_STATS = "data/planner_stats.json"
 #adding the filter settings
 FILTERS = {
     "price": {"min_price":5, "max_price": None},
@@ -12,6 +54,10 @@ FILTERS = {
     "volume": {"min_avg_volume":100000},
     "marketcap": {"min_mcap":1e9},
     "beta": {"max_beta": 2.0},
+    #top-N / top share by a metric (momentum, volatility, pe, ...) among the rows left at this point of the
+    #pipeline; score: raw, zscore, sector_zscore, sector_rank; ascending=True keeps the lowest
+    "rank": {"by": "momentum", "metric_params": {"months": 3}, "score": "raw", "ascending": False,
+             "top_n": None, "top_pct": None, "per_sector": False},
 }
 
 #pipeline order: order in which the filters will be applied
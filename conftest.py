@@ -0,0 +1 @@
+# keeps the repository root on sys.path so tests import core / filters like the scripts do
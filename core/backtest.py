@@ -0,0 +1,161 @@
+"""
+Historical backtest of the equal-weight screen.
+
+ - rebalances at the last trading day of every month ("M") or quarter ("Q")
+ - price, volatility and momentum filters are evaluated for all rebalance
+   dates at once from data up to each date (no look-ahead)
+ - fundamentals filters use the fundamentals given, applied as a static mask
+   (there is no point-in-time fundamentals source)
+ - equal_weight_shares sizes the holdings at each rebalance, holdings are then
+   marked to market with one matrix product per holding period
+ - reports daily equity, returns, turnover and drawdown
+"""
+
+import numpy as np
+import pandas as pd
+
+from core import stats
+from core.equal_weight import equal_weight_shares
+from core.screen import ORDERED_STEPS, step_mask
+from core.universe import build_universe
+
+TRADING_DAYS = 252
+DATED_STEPS = {"price", "volatility", "momentum"}
+
+
+def rebalance_rows(index, freq="M"):
+    """Row positions of the last trading day of each month / quarter."""
+    periods = pd.DatetimeIndex(index).to_period(freq)
+    last = np.ones(len(periods), dtype=bool)
+    last[:-1] = periods[1:] != periods[:-1]
+    return np.flatnonzero(last)
+
+
+def warmup_rows(pipeline, filters):
+    """History rows the dated filters need before the first rebalance."""
+    need = 0
+    if "volatility" in pipeline:
+        need = max(need, int(filters.get("volatility", {}).get("window_days", 60)))
+    if "momentum" in pipeline:
+        need = max(need, int(filters.get("momentum", {}).get("months", 3)) * 21)
+    return need
+
+
+def selection_matrix(values, rows, tickers, fundamentals=None, pipeline=(), filters=None):
+    """(rebalances x tickers) bool matrix of tickers passing every pipeline step at each row."""
+    filters = filters or {}
+    ranked = [step for step in pipeline if step in ORDERED_STEPS]
+    if ranked:
+        raise ValueError("the backtest does not support ranked steps yet: %s" % ", ".join(ranked))
+    prices = values[rows]
+    keep = ~np.isnan(prices)
+
+    # fundamentals filters: one static mask over the tickers
+    universe = build_universe(pd.DataFrame({"Ticker": tickers, "Price": np.nan}), fundamentals)
+    for step in pipeline:
+        if step in DATED_STEPS:
+            continue
+        mask = step_mask(step, universe, None, filters.get(step, {}))
+        if mask is not None:
+            keep &= mask[np.newaxis, :]
+
+    # dated filters: one vectorized evaluation over all rebalance rows
+    if "price" in pipeline:
+        params = filters.get("price", {})
+        if params.get("min_price") is not None:
+            keep &= prices >= params["min_price"]
+        if params.get("max_price") is not None:
+            keep &= prices <= params["max_price"]
+    if "volatility" in pipeline:
+        params = filters.get("volatility", {})
+        vol = stats.rolling_volatility(values, int(params.get("window_days", 60)))[rows]
+        keep &= vol <= params.get("max_vol", 0.05)
+    if "momentum" in pipeline:
+        params = filters.get("momentum", {})
+        pct = stats.returns_at(values, int(params.get("months", 3)) * 21, rows)
+        keep &= pct >= params.get("min_return", 0.0)
+    return keep
+
+
+def run_backtest(history, fundamentals=None, pipeline=(), filters=None, portfolio_size=100000,
+                 allow_fractional=False, freq="M"):
+    """
+    history: wide Close frame (dates x tickers).
+    Returns a dict with:
+      equity      daily portfolio value (Series)
+      returns     daily returns (Series)
+      rebalances  one row per rebalance: holdings, value, turnover, cash
+      holdings    shares held after each rebalance (rebalances x tickers DataFrame)
+      summary     total / annualized return, volatility, max drawdown, mean turnover
+    """
+    filters = filters or {}
+    values = history.to_numpy(dtype=float, na_value=np.nan)
+    tickers = history.columns.to_numpy()
+    # delisted / missing bars keep their last price for valuation
+    marks = np.nan_to_num(history.ffill().to_numpy(dtype=float, na_value=np.nan), nan=0.0)
+
+    rows = rebalance_rows(history.index, freq)
+    rows = rows[rows >= warmup_rows(pipeline, filters)]
+    if len(rows) == 0:
+        raise ValueError("not enough history for a single rebalance")
+    selected = selection_matrix(values, rows, tickers, fundamentals, pipeline, filters)
+
+    n_rows, n_tickers = values.shape
+    equity = np.full(n_rows, np.nan)
+    holdings = np.zeros((len(rows), n_tickers))
+    cash = np.zeros(len(rows))
+    turnover = np.zeros(len(rows))
+    shares = np.zeros(n_tickers)
+    value = float(portfolio_size)
+    left = float(portfolio_size)
+
+    for i, row in enumerate(rows):
+        if i > 0:
+            value = float(marks[row] @ shares) + left
+        picks = np.flatnonzero(selected[i])
+        target = np.zeros(n_tickers)
+        if len(picks):
+            target[picks] = equal_weight_shares(values[row, picks], value, allow_fractional)
+        invested = float(values[row, picks] @ target[picks]) if len(picks) else 0.0
+        turnover[i] = float(np.abs(target - shares) @ marks[row]) / value if value else 0.0
+        shares = target
+        left = value - invested
+        holdings[i] = shares
+        cash[i] = left
+
+        # mark to market until the next rebalance (inclusive of this day)
+        end = rows[i + 1] if i + 1 < len(rows) else n_rows
+        equity[row:end] = marks[row:end] @ shares + left
+
+    index = history.index
+    equity = pd.Series(equity, index=index, name="equity").iloc[rows[0]:]
+    returns = equity.pct_change().fillna(0.0).rename("returns")
+    drawdown = equity / equity.cummax() - 1
+
+    years = max(len(equity) - 1, 1) / TRADING_DAYS
+    total = equity.iloc[-1] / equity.iloc[0] - 1
+    summary = {
+        "start": str(equity.index[0].date()),
+        "end": str(equity.index[-1].date()),
+        "rebalances": int(len(rows)),
+        "total_return": float(total),
+        "annual_return": float((1 + total) ** (1 / years) - 1),
+        "annual_volatility": float(returns.std() * np.sqrt(TRADING_DAYS)),
+        "max_drawdown": float(drawdown.min()),
+        "mean_turnover": float(turnover[1:].mean()) if len(rows) > 1 else 0.0,
+        "mean_holdings": float(selected.sum(axis=1).mean()),
+    }
+    rebalances = pd.DataFrame({
+        "holdings": selected.sum(axis=1),
+        "value": equity.reindex(index[rows]).to_numpy(),
+        "turnover": turnover,
+        "cash": cash,
+    }, index=index[rows])
+    return {
+        "equity": equity,
+        "returns": returns,
+        "drawdown": drawdown.rename("drawdown"),
+        "rebalances": rebalances,
+        "holdings": pd.DataFrame(holdings, index=index[rows], columns=tickers),
+        "summary": summary,
+    }
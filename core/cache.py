@@ -0,0 +1,158 @@
+"""
+Persistent on-disk cache for market data frames.
+
+ - one sub directory per dataset (constituents, prices, fundamentals, history)
+ - per-dataset TTL, expired entries count as misses
+ - frames stored as Parquet, falling back to pickle for frames Arrow can't hold
+ - atomic writes (temp file + os.replace) so readers never see half a file
+ - size-based eviction of the least recently used entries
+ - empty results are never stored, results with failed symbols (frame
+   attrs["failed"], set by the fetchers) only for partial_ttl seconds, so a
+   short outage is not served from the cache for the whole dataset TTL
+ - served() tells when the oldest entry handed out was written, refresh=True
+   skips every entry (an explicit refresh) while still storing the new ones
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+logger = logging.getLogger("core.cache")
+
+# results that miss symbols are stored as .partial.<ext>, they expire after partial_ttl
+PARTIAL_EXTENSIONS = (".partial.parquet", ".partial.pkl")
+EXTENSIONS = (".parquet", ".pkl") + PARTIAL_EXTENSIONS
+
+
+def make_key(*parts):
+    """Stable short key from arbitrary (repr-able) arguments."""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+
+
+class DiskCache:
+    def __init__(self, cache_dir, ttl=None, max_bytes=None, partial_ttl=300, refresh=False):
+        # ttl: dict dataset -> seconds (None = never expires)
+        self.cache_dir = cache_dir
+        self.ttl = ttl or {}
+        self.max_bytes = max_bytes
+        self.partial_ttl = partial_ttl
+        self.refresh = refresh
+        self.hits = {}
+        self.misses = {}
+        # dataset -> write time of the oldest entry served
+        self.written_at = {}
+
+    def _path(self, dataset, key, ext):
+        return os.path.join(self.cache_dir, dataset, key + ext)
+
+    def _find(self, dataset, key):
+        for ext in EXTENSIONS:
+            path = self._path(dataset, key, ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _count(self, counter, dataset):
+        counter[dataset] = counter.get(dataset, 0) + 1
+
+    def get(self, dataset, key):
+        path = None if self.refresh else self._find(dataset, key)
+        ttl = self.ttl.get(dataset)
+        if path is not None and path.endswith(PARTIAL_EXTENSIONS) and ttl is not None:
+            ttl = min(ttl, self.partial_ttl)
+        if path is None or (ttl is not None and time.time() - os.path.getmtime(path) > ttl):
+            self._count(self.misses, dataset)
+            logger.info("cache miss: %s/%s", dataset, key)
+            return None
+        written = os.path.getmtime(path)
+        try:
+            if path.endswith(".parquet"):
+                df = pd.read_parquet(path)
+            else:
+                df = pd.read_pickle(path)
+        except Exception as e:
+            logger.warning("cache entry %s unreadable, ignoring: %s", path, e)
+            self._count(self.misses, dataset)
+            return None
+        # touch access time only, mtime stays the write time used for the TTL
+        os.utime(path, (time.time(), written))
+        self.written_at[dataset] = min(written, self.written_at.get(dataset, written))
+        self._count(self.hits, dataset)
+        logger.info("cache hit: %s/%s", dataset, key)
+        return df
+
+    def put(self, dataset, key, df, partial=False):
+        """partial: the result misses symbols, it expires after partial_ttl."""
+        folder = os.path.join(self.cache_dir, dataset)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        os.close(fd)
+        try:
+            try:
+                df.to_parquet(tmp)
+                ext = ".parquet"
+            except Exception:
+                # mixed object columns (raw yfinance info) are not arrow friendly
+                df.to_pickle(tmp)
+                ext = ".pkl"
+            if partial:
+                ext = ".partial" + ext
+            # drop a stale entry in another format so _find can't pick it
+            for old in EXTENSIONS:
+                if old != ext and os.path.exists(self._path(dataset, key, old)):
+                    os.remove(self._path(dataset, key, old))
+            os.replace(tmp, self._path(dataset, key, ext))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict()
+
+    def get_or_fetch(self, dataset, key, fetch_fn):
+        df = self.get(dataset, key)
+        if df is not None:
+            return df
+        df = fetch_fn()
+        if df is None or len(df) == 0:
+            logger.warning("not caching empty %s result", dataset)
+        elif df.attrs.get("failed") and self.ttl.get(dataset) is None:
+            logger.warning("not caching %s, %d symbols failed", dataset, df.attrs["failed"])
+        elif df.attrs.get("failed"):
+            logger.warning("caching %s for %ss only, %d symbols failed", dataset, self.partial_ttl,
+                           df.attrs["failed"])
+            self.put(dataset, key, df, partial=True)
+        else:
+            self.put(dataset, key, df)
+        return df
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        if not self.max_bytes or not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                entries.append((st.st_atime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            logger.info("cache evicted %s", path)
+
+    def served(self, datasets=None):
+        """Write time of the oldest entry served from the given datasets (all by default), None if none was."""
+        times = [t for d, t in self.written_at.items() if datasets is None or d in datasets]
+        return min(times) if times else None
+
+    def stats(self):
+        datasets = sorted(set(self.hits) | set(self.misses))
+        return {d: {"hits": self.hits.get(d, 0), "misses": self.misses.get(d, 0)} for d in datasets}
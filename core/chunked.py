@@ -0,0 +1,121 @@
+"""
+Chunked, memory-bounded price downloads for large universes (10k+ tickers).
+
+ - symbols are downloaded in chunks of `chunk_size`, `max_workers` chunks at a time
+ - each finished chunk is written straight into one preallocated float32
+   dates x tickers matrix, so nothing is concatenated at the end
+ - symbols that fail (whole chunk error or an all-NaN column) are re-requested
+   alone instead of failing the batch
+ - the report carries the matrix size and the peak RSS of the process
+ - the matrix spans every calendar day of the period, period="max" starts in
+   1962 (~23k rows), keep it for small universes
+"""
+
+import logging
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from core.history_store import period_to_days
+from core.instrument import count_network_call
+
+logger = logging.getLogger("core.chunked")
+
+
+def download_close(symbols, period):
+    import yfinance as yf
+    count_network_call("yf.download")
+    hist = yf.download(list(symbols), period=period, auto_adjust=True, progress=False, threads=False)
+    if "Close" in hist:
+        hist = hist["Close"]
+    if isinstance(hist, pd.Series):
+        hist = hist.to_frame(symbols[0])
+    return hist
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def download_matrix(symbols, period="1y", chunk_size=200, max_workers=4, download_fn=download_close, today=None):
+    """
+    Returns (matrix, dates, symbols, report). matrix is float32 (dates x symbols),
+    NaN where there is no bar. Only dates with at least one bar are kept.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    today = pd.Timestamp(today).normalize() if today is not None else pd.Timestamp.today().normalize()
+    # calendar days cover every exchange's trading days, empty rows are dropped at the end
+    calendar = pd.date_range(today - pd.Timedelta(days=period_to_days(period, today)), today, freq="D")
+    matrix = np.full((len(calendar), len(symbols)), np.nan, dtype=np.float32)
+    position = {s: i for i, s in enumerate(symbols)}
+    start = time.perf_counter()
+
+    def fill(frame):
+        """Write one downloaded chunk into the matrix, returns the symbols that came back empty."""
+        got = [c for c in frame.columns if c in position]
+        index = pd.to_datetime(frame.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        rows = calendar.get_indexer(index.normalize())
+        ok = rows >= 0
+        values = frame[got].to_numpy(dtype=np.float32, na_value=np.nan)[ok]
+        cols = np.array([position[c] for c in got], dtype=np.intp)
+        if len(cols):
+            matrix[np.ix_(rows[ok], cols)] = values
+        empty = set(frame.columns[frame.isna().all().to_numpy()]) if len(frame) else set(frame.columns)
+        return [c for c in got if c in empty]
+
+    def fetch(chunk):
+        try:
+            frame = download_fn(chunk, period)
+        except Exception as e:
+            logger.warning("chunk of %d symbols failed: %s", len(chunk), e)
+            return chunk
+        returned = set(frame.columns)
+        return fill(frame) + [s for s in chunk if s not in returned]
+
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+    retry = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for future in as_completed([pool.submit(fetch, c) for c in chunks]):
+            retry.extend(future.result())
+
+        # missing or failed symbols get one request each
+        failed = []
+        if retry and chunk_size > 1:
+            logger.info("re-requesting %d symbols individually", len(retry))
+            for future in as_completed([pool.submit(fetch, [s]) for s in retry]):
+                failed.extend(future.result())
+        else:
+            failed = retry
+
+    has_data = ~np.isnan(matrix).all(axis=1)
+    if not has_data.all():
+        matrix = matrix[has_data]
+    report = {
+        "symbols": len(symbols),
+        "chunks": len(chunks),
+        "retried": len(retry),
+        "failed": sorted(failed),
+        "matrix_mb": matrix.nbytes / (1024 * 1024),
+        "peak_rss_mb": peak_rss_mb(),
+        "seconds": time.perf_counter() - start,
+    }
+    logger.info("downloaded %d symbols in %d chunks (%d retried, %d failed), matrix %.1f MB, peak RSS %.0f MB",
+                len(symbols), len(chunks), len(retry), len(failed), report["matrix_mb"], report["peak_rss_mb"])
+    return matrix, calendar[has_data], symbols, report
+
+
+def last_valid(matrix):
+    """Last non-NaN value of every column (NaN if the column is empty)."""
+    valid = ~np.isnan(matrix)
+    if not len(matrix):
+        return np.full(matrix.shape[1], np.nan, dtype=matrix.dtype)
+    last_row = len(matrix) - 1 - np.argmax(valid[::-1], axis=0)
+    return matrix[last_row, np.arange(matrix.shape[1])]
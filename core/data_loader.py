@@ -1,16 +1,53 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
+
+from core.cache import make_key
+from core.chunked import download_matrix, last_valid
+from core.fetch_engine import fetch_many
+from core.fundamentals import SCHEMA, compact_fundamentals
+from core.instrument import count_network_call
+
+SP500_URL = "https://raw.githubusercontent.com/datasets/s-and-p-500-companies/master/data/constituents.csv"
+
 #fetching S&P 500 symbols form csv source
-def get_sp500_symbols():
-    url = "https://raw.githubusercontent.com/datasets/s-and-p-500-companies/master/data/constituents.csv"
-    table = pd.read_csv(url)
+def get_sp500_symbols(cache=None):
+    url = SP500_URL
+
+    def download():
+        count_network_call("constituents_csv")
+        return pd.read_csv(url)
+    if cache is not None:
+        table = cache.get_or_fetch("constituents", make_key(url), download)
+    else:
+        table = download()
     symbols = table["Symbol"].tolist()
     #converting the csv format to yfinance format
     symbols = [s.replace(".", "-") for s in symbols]
     return symbols
 
-def fetch_latest_prices(symbols):
+#user supplied constituent file (csv with a Symbol/Ticker column, or one symbol per line), None = S&P 500
+def load_symbols(path=None, cache=None):
+    if path is None:
+        return get_sp500_symbols(cache=cache)
+    if path.endswith(".csv"):
+        table = pd.read_csv(path)
+        col = next((c for c in ("Symbol", "Ticker", "symbol", "ticker") if c in table.columns), table.columns[0])
+        symbols = table[col].dropna().astype(str).tolist()
+    else:
+        with open(path) as f:
+            symbols = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    symbols = [s.strip().replace(".", "-") for s in symbols]
+    return list(dict.fromkeys(symbols))
+
+def fetch_latest_prices(symbols, chunk_size=None, max_workers=4):
+    if chunk_size and len(symbols) > chunk_size:
+        # large universe: a few days of closes in chunks, latest bar per ticker
+        matrix, _, tickers, _ = download_matrix(symbols, period="5d", chunk_size=chunk_size, max_workers=max_workers)
+        df = pd.DataFrame({"Ticker": tickers, "Price": last_valid(matrix)})
+        return df.dropna(subset=["Price"]).reset_index(drop=True)
+    # yfinance (and its requests / curl stack) is only imported once something is downloaded
+    import yfinance as yf
+    count_network_call("yf.download")
     prices = yf.download(symbols, period = "1d", threads = True, auto_adjust = True, progress = False)
     if "Close" in prices:
         close  = prices["Close"].iloc[0]
@@ -20,24 +57,46 @@ def fetch_latest_prices(symbols):
     df = df.dropna(subset=["Price"])
     return df #simply returns the today's Prices in df table with ticker and price columns
 
-def fetch_fundamentals(symbols):
-    infos = {}
-    for s in symbols:
-        try:
-            t = yf.Ticker(s)
-            info = t.info
-            infos[s] = info
-        except Exception:
-            infos[s] = {}
-    df = pd.DataFrame.from_dict(infos, orient = 'index')
-    df.index.name = 'Ticker'
-    df.reset_index(inplace=True)
+def _fetch_info(symbol):
+    import yfinance as yf
+    count_network_call("yf.info")
+    return yf.Ticker(symbol).info
+
+def fetch_fundamentals(symbols, max_workers=8, rate_limit=None, retries=2, backoff=0.5, return_report=False,
+                       schema=SCHEMA):
+    # concurrent fetch, failed symbols map to {} like the old serial loop
+    results, report = fetch_many(symbols, _fetch_info, max_workers=max_workers,
+                                 rate_limit=rate_limit, retries=retries, backoff=backoff)
+    infos = {s: (info or {}) for s, info in results.items()}
+    if schema is not None:
+        # typed frame with just the declared fields, tickers without data are left out
+        df = compact_fundamentals({s: info for s, info in infos.items() if info}, schema)
+    else:
+        df = pd.DataFrame.from_dict(infos, orient = 'index')
+        df.index.name = 'Ticker'
+        df.reset_index(inplace=True)
+    # the cache keeps a result with failed symbols only briefly (see core.cache)
+    df.attrs["failed"] = int((~report["ok"]).sum())
+    if return_report:
+        return df, report
     return df #fetches fundamentals in a big table like market cap  trailing PE etc.
 
-def fetch_history(symbols, period= '1y'):
+def fetch_history(symbols, period= '1y', chunk_size=None, max_workers=4):
+    if chunk_size and len(symbols) > chunk_size:
+        matrix, dates, tickers, _ = download_matrix(symbols, period=period, chunk_size=chunk_size, max_workers=max_workers)
+        # float32 matrix is wrapped, not copied
+        return pd.DataFrame(matrix, index=pd.DatetimeIndex(dates, name="Date"), columns=tickers, copy=False)
+    import yfinance as yf
+    count_network_call("yf.download")
     hist = yf.download(symbols, period=period, auto_adjust = True, progress = False)
     if 'Close' in hist:
         return hist['Close']
     return hist # fetching 1 year old data, for calculation of volatility and all
-    
 
+
+def cached_fetch(cache, dataset, fetch_fn, symbols, **kwargs):
+    # wraps any of the fetch_* functions above with the on-disk cache (cache=None just fetches)
+    if cache is None:
+        return fetch_fn(symbols, **kwargs)
+    key = make_key(sorted(symbols), sorted(kwargs.items()))
+    return cache.get_or_fetch(dataset, key, lambda: fetch_fn(symbols, **kwargs))
@@ -1,16 +1,67 @@
-import pandas as pd
-import math
+import numpy as np
+
+
+def equal_weight_shares(price, portfolio_size, allow_fractional=False):
+    """Share counts for an equal weight split of portfolio_size over a price array."""
+    return allocate_batch(price, [portfolio_size], allow_fractional, redistribute=False)[0]
+
+
+def allocate_batch(price, portfolio_sizes, allow_fractional=False, redistribute=True):
+    """
+    Equal weight share matrix (accounts x tickers) for many portfolio sizes at once.
+    Whole shares are floor(dollar allocation / price); with redistribute the
+    leftover cash of every account buys one more share of the most under
+    weight tickers it can still afford. Missing or non-positive prices get 0 shares.
+    """
+    price = np.asarray(price, dtype=float)
+    sizes = np.asarray(portfolio_sizes, dtype=float).reshape(-1, 1)
+    n = len(price)
+    if n == 0:
+        return np.zeros((len(sizes), 0))
+    tradable = np.isfinite(price) & (price > 0)
+    safe = np.where(tradable, price, 1.0)
+    dollar = 1.0 / n * sizes
+    if allow_fractional:
+        return np.where(tradable, dollar / safe, 0.0)
+    shares = np.where(tradable, np.floor(dollar / safe), 0.0)
+    if redistribute and tradable.any():
+        _redistribute(shares, np.where(tradable, price, 0.0), tradable, dollar, sizes[:, 0])
+    return shares
+
+
+def _redistribute(shares, price, tradable, dollar, sizes):
+    # most under weight first, the order is fixed per account
+    deficit = np.where(tradable, dollar - shares * price, -np.inf)
+    order = np.argsort(-deficit, axis=1)
+    ordered_price = price[order]
+    open_ = tradable[order]
+    cash = sizes - shares @ price
+    accounts = np.arange(len(shares))
+    # each round buys the affordable prefix of the open tickers; the ticker that
+    # stopped it can never become affordable again, so it is closed
+    while len(accounts):
+        open_ &= ordered_price <= cash[:, np.newaxis]
+        cost = np.cumsum(np.where(open_, ordered_price, 0.0), axis=1)
+        buy = open_ & (cost <= cash[:, np.newaxis])
+        rows, cols = np.nonzero(buy)
+        shares[accounts[rows], order[rows, cols]] += 1.0
+        cash -= np.where(buy, ordered_price, 0.0).sum(axis=1)
+        open_ &= ~buy
+        # accounts with nothing left to buy drop out
+        keep = open_.any(axis=1)
+        if not keep.all():
+            accounts, order, ordered_price, open_, cash = (
+                accounts[keep], order[keep], ordered_price[keep], open_[keep], cash[keep])
+
 
 def apply_equal_weight(df, portfolio_size, allow_fractional = False):
-    df = df.copy()
     n = len(df)
     if n == 0 :
-        return df
-    df['Weight'] = 1.0/n
-    df['Dollar_Allocation'] = df['Weight'] * portfolio_size
-    if allow_fractional:
-        df['Shares'] = df['Dollar_Allocation'] / df['Price']
-    else:
-        df['Shares'] = (df['Dollar_Allocation']) / df['Price'].apply(lambda x: math.floor(x) if pd.notna(x) else 0)
-    return df
-#simply calculates the weight for allocation of each stock
\ No newline at end of file
+        return df.copy()
+    weight = 1.0/n
+    return df.assign(
+        Weight=weight,
+        Dollar_Allocation=weight * portfolio_size,
+        Shares=equal_weight_shares(df['Price'].to_numpy(dtype=float, na_value=np.nan), portfolio_size, allow_fractional),
+    )
+#simply calculates the weight for allocation of each stock
@@ -0,0 +1,86 @@
+"""
+Concurrent per-symbol fetch engine.
+
+ - runs a fetch function for many symbols on a bounded thread pool
+ - limits the overall request rate (requests per second) across all workers
+ - retries failed symbols with exponential backoff
+ - returns the results plus a per-symbol success/failure report
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+class RateLimiter:
+    """
+    Simple shared limiter: hands out evenly spaced request slots.
+    rate=None or 0 disables limiting.
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _fetch_one(symbol, fetch_fn, limiter, retries, backoff):
+    start = time.perf_counter()
+    error = None
+    for attempt in range(1, retries + 2):
+        limiter.wait()
+        try:
+            result = fetch_fn(symbol)
+            return symbol, result, {
+                "Ticker": symbol,
+                "ok": True,
+                "attempts": attempt,
+                "error": None,
+                "seconds": time.perf_counter() - start,
+            }
+        except Exception as e:
+            error = e
+            if attempt <= retries:
+                time.sleep(backoff * (2 ** (attempt - 1)))
+    return symbol, None, {
+        "Ticker": symbol,
+        "ok": False,
+        "attempts": retries + 1,
+        "error": repr(error),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def fetch_many(symbols, fetch_fn, max_workers=8, rate_limit=None, retries=2, backoff=0.5):
+    """
+    Call fetch_fn(symbol) for every symbol concurrently.
+    Returns (results, report) where results maps symbol -> value (None on failure)
+    and report is a Ticker-indexed DataFrame with ok / attempts / error / seconds.
+    Results keep the input symbol order.
+    """
+    symbols = list(symbols)
+    limiter = RateLimiter(rate_limit)
+    workers = max(1, min(max_workers, len(symbols) or 1))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(
+            lambda s: _fetch_one(s, fetch_fn, limiter, retries, backoff), symbols
+        ))
+
+    results = {s: r for s, r, _ in outcomes}
+    report = pd.DataFrame([rep for _, _, rep in outcomes],
+                          columns=["Ticker", "ok", "attempts", "error", "seconds"])
+    return results, report.set_index("Ticker")
@@ -0,0 +1,91 @@
+"""
+Schema-driven fundamentals.
+
+ - only the declared fields of the yfinance info dict are kept
+ - numeric fields get fixed float dtypes, sector is a categorical
+ - save/load as a compact .npz snapshot (no pickle) for the cache, worker
+   processes and the UI
+
+Ratios the filters compare against user thresholds (PE, yield, beta) stay
+float64 so a threshold like max_beta=1.1 compares exactly as before;
+volumes are large counts where float32 is plenty.
+"""
+
+import numpy as np
+import pandas as pd
+
+SCHEMA = {
+    "marketCap": "float64",
+    "trailingPE": "float64",
+    "forwardPE": "float64",
+    "dividendYield": "float64",
+    "beta": "float64",
+    "averageVolume": "float32",
+    "averageVolume10days": "float32",
+    "volume": "float32",
+    "sector": "category",
+}
+
+
+def numeric_fields(schema=SCHEMA):
+    return [name for name, dtype in schema.items() if dtype != "category"]
+
+
+def category_fields(schema=SCHEMA):
+    return [name for name, dtype in schema.items() if dtype == "category"]
+
+
+def compact_fundamentals(data, schema=SCHEMA):
+    """
+    Typed Ticker + schema frame from either a {symbol: info dict} mapping or a
+    raw fundamentals DataFrame with a Ticker column. Missing fields become NaN.
+    """
+    if isinstance(data, pd.DataFrame):
+        tickers = data["Ticker"].astype(str).to_numpy() if "Ticker" in data.columns else np.array([], dtype=str)
+        columns = {name: data[name] if name in data.columns else None for name in schema}
+    else:
+        tickers = np.array(list(data), dtype=str)
+        infos = [data[s] or {} for s in tickers]
+        columns = {name: pd.Series([info.get(name) for info in infos], dtype=object) for name in schema}
+
+    out = {"Ticker": tickers}
+    for name, dtype in schema.items():
+        values = columns[name]
+        if values is None:
+            values = pd.Series(np.nan, index=range(len(tickers)))
+        if dtype == "category":
+            values = pd.Series(values).reset_index(drop=True)
+            out[name] = pd.Categorical(values.where(values.notna(), None).astype(object))
+        else:
+            # yfinance sometimes hands back strings like "Infinity"
+            numbers = pd.to_numeric(pd.Series(values).reset_index(drop=True), errors="coerce")
+            out[name] = numbers.to_numpy(dtype=dtype, na_value=np.nan)
+    return pd.DataFrame(out)
+
+
+def save_fundamentals(df, path):
+    """Compact binary snapshot: one array per column, categoricals as codes + categories."""
+    arrays = {"Ticker": df["Ticker"].astype(str).to_numpy(dtype=str)}
+    for name in df.columns:
+        if name == "Ticker":
+            continue
+        values = df[name]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            arrays["cat__" + name] = values.cat.codes.to_numpy()
+            arrays["categories__" + name] = values.cat.categories.astype(str).to_numpy(dtype=str)
+        else:
+            arrays["num__" + name] = values.to_numpy()
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def load_fundamentals(path):
+    with np.load(path, allow_pickle=False) as data:
+        out = {"Ticker": data["Ticker"]}
+        for key in data.files:
+            if key.startswith("num__"):
+                out[key[5:]] = data[key]
+            elif key.startswith("cat__"):
+                name = key[5:]
+                out[name] = pd.Categorical.from_codes(data[key], categories=data["categories__" + name])
+    return pd.DataFrame(out)
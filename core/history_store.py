@@ -0,0 +1,257 @@
+"""
+Append-only local store of daily closes keyed by (Ticker, Date).
+
+ - only the missing date range is downloaded per ticker (from the last stored
+   bar on, so a partial intraday bar gets replaced by the final close)
+ - tickers whose last bar is the latest completed session, fetched after its
+   close, are not downloaded at all (a warm re-run costs no requests)
+ - tickers whose download came back empty are backfilled again next run
+ - tickers new to the constituent list (or a longer lookback) get backfilled
+ - a failed or empty batch does not lose the others: its tickers are
+   re-requested one at a time, whatever still fails is retried next run
+ - tickers that dropped out are not returned, prune() (called by load_snapshot
+   and run_pipeline with the constituent list) removes them from the store
+ - update() returns the same wide Close frame (dates x tickers) as fetch_history
+
+Note: auto adjusted closes of older bars shift after splits/dividends, use
+update(..., full_refresh=True) now and then to rewrite the whole window.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from core.instrument import count_network_call
+
+logger = logging.getLogger("core.history_store")
+
+COLUMNS = ["Ticker", "Date", "Close"]
+# where period="max" starts, yfinance has no daily bars before it
+MAX_HISTORY_START = pd.Timestamp("1962-01-02")
+# a bar fetched after its session close (plus a margin for the final print) is final
+MARKET_TZ = "America/New_York"
+SESSION_CLOSE = pd.Timedelta(hours=16, minutes=30)
+
+
+def last_completed_session(now=None):
+    """Date of the latest weekday session that has closed at now (default: the current time)."""
+    now = pd.Timestamp(now) if now is not None else pd.Timestamp.now(tz=MARKET_TZ)
+    if now.tz is None:
+        now = now.tz_localize(MARKET_TZ)
+    now = now.tz_convert(MARKET_TZ).tz_localize(None)
+    day = now.normalize()
+    if now < day + SESSION_CLOSE:
+        day -= pd.Timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= pd.Timedelta(days=1)
+    return day
+
+
+def period_to_days(period, today=None):
+    """'1y' -> 365, '6mo' -> 186, '60d' -> 60, '5y' -> 1825; 'ytd' and 'max' count back from today."""
+    period = period.strip().lower()
+    if period in ("ytd", "max"):
+        today = pd.Timestamp(today).normalize() if today is not None else pd.Timestamp.today().normalize()
+        start = MAX_HISTORY_START if period == "max" else today.replace(month=1, day=1)
+        return (today - start).days
+    if period.endswith("mo"):
+        return int(period[:-2]) * 31
+    if period.endswith("y"):
+        return int(period[:-1]) * 365
+    if period.endswith("d"):
+        return int(period[:-1])
+    raise ValueError("unsupported period: %s" % period)
+
+
+def download_closes(symbols, start):
+    import yfinance as yf
+    count_network_call("yf.download")
+    hist = yf.download(list(symbols), start=start, auto_adjust=True, progress=False)
+    if "Close" in hist:
+        hist = hist["Close"]
+    if isinstance(hist, pd.Series):
+        hist = hist.to_frame(symbols[0])
+    return hist
+
+
+def _atomic_write(write_fn, path):
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    os.close(fd)
+    try:
+        write_fn(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _long_closes(wide, group):
+    """Ticker / Date / Close rows of the non-NaN closes of a downloaded wide frame."""
+    if wide is None or wide.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    wide = wide.reindex(columns=[c for c in wide.columns if c in set(group)])
+    wide.index = pd.to_datetime(wide.index).tz_localize(None).normalize()
+    wide.index.name = "Date"
+    wide.columns.name = "Ticker"
+    # pandas 3 stack() keeps NaN cells, an all-NaN column is not data
+    return wide.stack().dropna().rename("Close").reset_index()[COLUMNS]
+
+
+class HistoryStore:
+    def __init__(self, path, download_fn=download_closes, chunk_size=None, max_workers=1):
+        self.path = path
+        self.meta_path = path + ".meta.json"
+        self.download_fn = download_fn
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=COLUMNS)
+        return pd.read_parquet(self.path)
+
+    def _load_meta(self):
+        """
+        (requested, final): ticker -> earliest date we already asked the source for,
+        ticker -> last bar that was fetched after its session closed.
+        """
+        if not os.path.exists(self.meta_path):
+            return {}, {}
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        if "requested" not in meta:
+            # stores written before final dates were tracked
+            return meta, {}
+        return meta["requested"], meta["final"]
+
+    def _save(self, data, meta, final):
+        _atomic_write(lambda p: data.to_parquet(p, index=False), self.path)
+
+        def write_meta(p):
+            with open(p, "w") as f:
+                json.dump({"requested": meta, "final": final}, f)
+        _atomic_write(write_meta, self.meta_path)
+
+    def _plan(self, symbols, data, meta, final, start, session):
+        """Group symbols by the start date they need to be fetched from, up to date ones are left out."""
+        last = data.groupby("Ticker")["Date"].max() if len(data) else pd.Series(dtype="datetime64[ns]")
+        plan = {}
+        for s in symbols:
+            requested = meta.get(s)
+            if requested is None or pd.Timestamp(requested) > start or s not in last.index:
+                # new ticker, longer lookback than before or nothing stored: backfill the whole window
+                fetch_from = start
+            elif s in final and last[s] == pd.Timestamp(final[s]) >= session:
+                # the last stored bar is the latest completed session's final close
+                continue
+            else:
+                # the last stored bar is fetched again, it may be a partial intraday bar
+                fetch_from = last[s]
+            plan.setdefault(fetch_from, []).append(s)
+        return plan
+
+    def update(self, symbols, period="1y", today=None, full_refresh=False, now=None):
+        """now: the time the bars are fetched at (default: the current time), decides which are final."""
+        symbols = list(symbols)
+        today = pd.Timestamp(today).normalize() if today is not None else pd.Timestamp.today().normalize()
+        start = today - pd.Timedelta(days=period_to_days(period, today))
+        session = last_completed_session(now)
+
+        data = self.load()
+        data["Date"] = pd.to_datetime(data["Date"])
+        # stores written before NaN closes were dropped may hold them, they would count as data
+        data = data.dropna(subset=["Close"])
+        meta, final = ({}, {}) if full_refresh else self._load_meta()
+        if full_refresh:
+            data = data[~data["Ticker"].isin(symbols)]
+
+        plan = self._plan(symbols, data, meta, final, start, session)
+        skipped = len(symbols) - sum(len(group) for group in plan.values())
+        if skipped:
+            logger.info("History: %d tickers already hold the %s close", skipped, session.date())
+        batches = []
+        for fetch_from, group in sorted(plan.items()):
+            size = self.chunk_size or len(group)
+            batches.extend((fetch_from, group[i:i + size]) for i in range(0, len(group), size))
+
+        def fetch(fetch_from, group):
+            # (closes that came back, tickers without any)
+            logger.info("History: fetching %d tickers from %s", len(group), fetch_from.date())
+            try:
+                long = _long_closes(self.download_fn(group, fetch_from.strftime("%Y-%m-%d")), group)
+            except Exception as e:
+                logger.warning("History: batch of %d tickers from %s failed: %s", len(group), fetch_from.date(), e)
+                return None, list(group)
+            returned = set(long["Ticker"])
+            return long, [s for s in group if s not in returned]
+
+        new_parts, retry, failed = [], [], []
+
+        def collect(futures, missed):
+            for future in as_completed(futures):
+                fetch_from, group = futures[future]
+                long, missing = future.result()
+                missed.extend((fetch_from, s) for s in missing if len(group) > 1)
+                failed.extend(s for s in missing if len(group) == 1)
+                if long is None or long.empty:
+                    continue
+                # only tickers that returned closes count as fetched, the others are backfilled next time
+                for s, last_bar in long.groupby("Ticker")["Date"].max().items():
+                    old = meta.get(s)
+                    meta[s] = str(min(fetch_from, pd.Timestamp(old)).date()) if old else str(fetch_from.date())
+                    final[s] = str(min(last_bar, session).date())
+                new_parts.append(long)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            collect({pool.submit(fetch, f, g): (f, g) for f, g in batches}, retry)
+            if retry:
+                logger.info("History: re-requesting %d tickers individually", len(retry))
+                collect({pool.submit(fetch, f, [s]): (f, [s]) for f, s in retry}, [])
+        if failed:
+            logger.warning("History: no closes for %d tickers, retried next run: %s", len(failed),
+                           ", ".join(sorted(failed)[:20]) + (" ..." if len(failed) > 20 else ""))
+
+        if new_parts:
+            data = pd.concat([data] + new_parts, ignore_index=True)
+            data = data.drop_duplicates(subset=["Ticker", "Date"], keep="last")
+            data = data.sort_values(["Ticker", "Date"]).reset_index(drop=True)
+        if plan:
+            self._save(data, meta, final)
+        logger.info("History: %d rows fetched for %d of %d tickers",
+                    sum(len(p) for p in new_parts), sum(p["Ticker"].nunique() for p in new_parts), len(symbols))
+
+        return self.to_wide(symbols, start=start, data=data)
+
+    def to_wide(self, symbols=None, start=None, data=None):
+        """Stored closes as a dates x tickers frame (all tickers / dates by default), no network."""
+        if data is None:
+            data = self.load()
+            data["Date"] = pd.to_datetime(data["Date"])
+        if symbols is not None:
+            data = data[data["Ticker"].isin(symbols)]
+        if start is not None:
+            data = data[data["Date"] >= pd.Timestamp(start)]
+        wide = data.pivot(index="Date", columns="Ticker", values="Close").sort_index()
+        if symbols is not None:
+            wide = wide.reindex(columns=[s for s in symbols if s in wide.columns])
+        return wide
+
+    def prune(self, keep_symbols):
+        """Drop tickers that are no longer in the universe."""
+        keep = set(keep_symbols)
+        data = self.load()
+        meta, final = self._load_meta()
+        dropped = set(data["Ticker"].unique()) - keep
+        if dropped:
+            data = data[data["Ticker"].isin(keep)].reset_index(drop=True)
+            meta = {s: d for s, d in meta.items() if s in keep}
+            final = {s: d for s, d in final.items() if s in keep}
+            self._save(data, meta, final)
+            logger.info("History: pruned %d tickers", len(dropped))
+        return sorted(dropped)
@@ -0,0 +1,122 @@
+"""
+Per-stage instrumentation for the pipeline.
+
+ - wall time, CPU time, tracemalloc peak delta, peak RSS, rows in/out and
+   network calls for every stage
+ - export as JSON or Prometheus text format
+ - optional cProfile dump per stage
+"""
+
+import cProfile
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+_network_calls = Counter()
+_network_lock = threading.Lock()
+
+
+def count_network_call(kind, n=1):
+    """Called by the data loaders for every request that goes over the network."""
+    with _network_lock:
+        _network_calls[kind] += n
+
+
+def network_calls():
+    with _network_lock:
+        return dict(_network_calls)
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Instrumentation:
+    def __init__(self, enabled=True, trace_memory=False, profile_dir=None, profile_stages=None):
+        # profile_stages: stage names to profile (None = every stage) when profile_dir is set
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.profile_stages = set(profile_stages) if profile_stages else None
+        self.stages = []
+        self._profiling = False
+        if enabled and trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Measure the with-block as one stage. Yields the record dict, set
+        record["rows_out"] inside the block when it makes sense.
+        """
+        record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+        if not self.enabled:
+            yield record
+            return
+
+        profiler = None
+        if (self.profile_dir and not self._profiling
+                and (self.profile_stages is None or name in self.profile_stages)):
+            profiler = cProfile.Profile()
+            self._profiling = True
+        if self.trace_memory:
+            mem_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        calls_start = network_calls()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(self.profile_dir, name + ".prof"))
+            record["wall_seconds"] = time.perf_counter() - wall_start
+            record["cpu_seconds"] = time.process_time() - cpu_start
+            if self.trace_memory:
+                record["tracemalloc_peak_bytes"] = max(tracemalloc.get_traced_memory()[1] - mem_start, 0)
+            record["rss_peak_bytes"] = _peak_rss_bytes()
+            calls_end = network_calls()
+            record["network_calls"] = {k: v - calls_start.get(k, 0) for k, v in calls_end.items()
+                                       if v - calls_start.get(k, 0)}
+            self.stages.append(record)
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump({"stages": self.stages, "network_calls": network_calls()}, f, indent=2)
+
+    def to_prometheus(self, path):
+        metrics = [
+            ("wall_seconds", "Wall time per stage"),
+            ("cpu_seconds", "CPU time per stage"),
+            ("tracemalloc_peak_bytes", "Peak traced allocation above the stage start"),
+            ("rss_peak_bytes", "Process peak RSS at the end of the stage"),
+            ("rows_in", "Rows going into the stage"),
+            ("rows_out", "Rows coming out of the stage"),
+        ]
+        lines = []
+        for key, help_text in metrics:
+            samples = [(s["stage"], s[key]) for s in self.stages if s.get(key) is not None]
+            if not samples:
+                continue
+            lines.append("# HELP screener_stage_%s %s" % (key, help_text))
+            lines.append("# TYPE screener_stage_%s gauge" % key)
+            lines.extend('screener_stage_%s{stage="%s"} %s' % (key, stage, value) for stage, value in samples)
+        lines.append("# HELP screener_stage_network_calls Network requests made during the stage")
+        lines.append("# TYPE screener_stage_network_calls gauge")
+        for s in self.stages:
+            for kind, n in s["network_calls"].items():
+                lines.append('screener_stage_network_calls{stage="%s",kind="%s"} %d' % (s["stage"], kind, n))
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
@@ -0,0 +1,194 @@
+"""
+Cost and selectivity aware pipeline planner.
+
+ - threshold steps are masks AND-ed with the others, so their order is free;
+   they run cheapest per removed row first (cost / (1 - selectivity), the
+   classic predicate ordering rank). Ranked steps (top-N) stay where they
+   are and only the steps between them are reordered
+ - per step cost (seconds per input row) and selectivity (rows out / rows in)
+   are learned from previous runs and kept in a small JSON file
+ - history steps only see the surviving rows, so trailing statistics are
+   computed for those tickers only (see core.stats)
+ - explain() renders the plan with estimated and actual rows per step, and
+   steps whose input data is missing are reported instead of silently
+   passing every row
+"""
+
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from core.instrument import Instrumentation
+from core.screen import ORDERED_STEPS, STEPS, step_needs
+from core.universe import build_universe, select
+
+logger = logging.getLogger("core.planner")
+
+# weight of the latest run in the learned averages
+SMOOTHING = 0.3
+# guesses for steps that never ran: history steps do real work, the rest compare a column
+DEFAULT_COST = {"history": 2e-6, "ranked": 2e-6, None: 2e-7}
+DEFAULT_SELECTIVITY = 0.5
+
+# columns a step reads (any of them), history steps need the price history instead
+STEP_COLUMNS = {
+    "price": ["Price"],
+    "volume": ["averageVolume", "averageVolume10days", "volume"],
+    "marketcap": ["marketCap"],
+    "pe": ["trailingPE", "forwardPE"],
+    "dividend": ["dividendYield"],
+    "beta": ["beta"],
+    "sector": ["sector"],
+}
+
+
+class Planner:
+    def __init__(self, path=None):
+        """path: JSON file with the learned step statistics (None = nothing persisted)."""
+        self.path = path
+        self.steps = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self.steps = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning("Ignoring unreadable planner stats %s: %s", path, e)
+
+    def estimate(self, step):
+        """(seconds per row, selectivity) for a step."""
+        known = self.steps.get(step, {})
+        needs = step_needs(step) if step in STEPS else None
+        return known.get("cost", DEFAULT_COST[needs]), known.get("selectivity", DEFAULT_SELECTIVITY)
+
+    def order(self, pipeline):
+        """
+        Known threshold steps sorted by rank (ties keep the pipeline order) between
+        the fixed ranked steps; unknown steps are kept at the end.
+        """
+        def rank(step):
+            cost, selectivity = self.estimate(step)
+            return cost / max(1.0 - selectivity, 1e-9)
+
+        ordered, segment = [], []
+        for step in pipeline:
+            if step not in STEPS:
+                continue
+            if step in ORDERED_STEPS:
+                ordered += sorted(segment, key=rank) + [step]
+                segment = []
+            else:
+                segment.append(step)
+        return ordered + sorted(segment, key=rank) + [step for step in pipeline if step not in STEPS]
+
+    def record(self, step, rows_in, rows_out, seconds):
+        if step not in STEPS or rows_in == 0:
+            return
+        cost, selectivity = seconds / rows_in, rows_out / rows_in
+        known = self.steps.get(step)
+        if known:
+            cost = SMOOTHING * cost + (1 - SMOOTHING) * known["cost"]
+            selectivity = SMOOTHING * selectivity + (1 - SMOOTHING) * known["selectivity"]
+        runs = known["runs"] + 1 if known else 1
+        self.steps[step] = {"cost": cost, "selectivity": selectivity, "runs": runs}
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = "%s.tmp-%d" % (self.path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(self.steps, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def missing_inputs(step, universe, history, params=None):
+    """Why a step cannot filter anything, or None when its data is there."""
+    if step not in STEPS:
+        return "unknown step"
+    if step_needs(step) == "history":
+        return "no price history" if history is None else None
+    if step_needs(step) == "ranked":
+        from filters.rank_filter import METRICS
+        by = (params or {}).get("by", "momentum")
+        return "no price history" if by in METRICS and METRICS[by][1] and history is None else None
+    columns = [c for c in STEP_COLUMNS.get(step, []) if c in universe.columns]
+    if STEP_COLUMNS.get(step) and not columns:
+        return "no %s column" % " / ".join(STEP_COLUMNS[step])
+    if columns and all(universe[c].isna().all() for c in columns):
+        return "%s is empty" % " / ".join(columns)
+    return None
+
+
+def planned_screen(df, fundamentals=None, history=None, pipeline=(), filters=None, planner=None,
+                   on_step=None, instrument=None):
+    """
+    screen() with planner ordering. Returns (surviving rows, plan) where plan has one
+    dict per step: step, est_rows_in, est_rows_out, est_seconds, rows_in, rows_out, seconds, note.
+    """
+    filters = filters or {}
+    planner = planner or Planner()
+    instrument = instrument or Instrumentation(enabled=False)
+    with instrument.stage("build_universe", rows_in=len(df)) as record:
+        universe = build_universe(df, fundamentals)
+        keep = np.ones(len(universe), dtype=bool)
+        if "Price" in universe.columns:
+            keep &= universe["Price"].notna().to_numpy()
+        record["rows_out"] = int(keep.sum())
+
+    plan = []
+    estimate = float(keep.sum())
+    for step in planner.order(pipeline):
+        cost, selectivity = planner.estimate(step) if step in STEPS else (0.0, 1.0)
+        entry = {"step": step, "est_rows_in": estimate, "est_rows_out": estimate * selectivity,
+                 "est_seconds": estimate * cost, "rows_in": int(keep.sum()), "rows_out": None,
+                 "seconds": None, "note": missing_inputs(step, universe, history, filters.get(step))}
+        estimate *= selectivity
+        plan.append(entry)
+        if entry["note"] and step in STEPS:
+            logger.warning("Step %s does not filter anything: %s", step, entry["note"])
+        if step not in STEPS:
+            if on_step is not None:
+                on_step(step, None)
+            continue
+
+        fn, needs = STEPS[step]
+        params = filters.get(step, {})
+        with instrument.stage("filter." + step, rows_in=entry["rows_in"]) as record:
+            start = time.perf_counter()
+            if needs == "ranked":
+                keep &= fn(universe, history, keep, **params)
+            elif needs == "history":
+                # only the survivors go through the (per ticker) history statistics
+                rows = np.flatnonzero(keep)
+                keep[rows] = fn(universe.take(rows), history, **params)
+            else:
+                keep &= fn(universe, **params)
+            entry["seconds"] = time.perf_counter() - start
+            entry["rows_out"] = record["rows_out"] = int(keep.sum())
+        if not entry["note"]:
+            # a step without its data says nothing about its real selectivity
+            planner.record(step, entry["rows_in"], entry["rows_out"], entry["seconds"])
+        if on_step is not None:
+            on_step(step, entry["rows_out"])
+        if entry["rows_out"] == 0:
+            break
+
+    return select(df, keep), plan
+
+
+def explain(plan):
+    """Plan as a text table (estimated vs actual rows and time per step)."""
+    lines = ["%-12s %12s %12s %12s %12s %10s %10s  %s" % (
+        "step", "est rows in", "est out", "rows in", "rows out", "est ms", "ms", "note")]
+    for entry in plan:
+        ran = entry["rows_out"] is not None
+        lines.append("%-12s %12.0f %12.0f %12d %12s %10.2f %10s  %s" % (
+            entry["step"], entry["est_rows_in"], entry["est_rows_out"], entry["rows_in"],
+            entry["rows_out"] if ran else "-", entry["est_seconds"] * 1000,
+            "%.2f" % (entry["seconds"] * 1000) if ran else "-", entry["note"] or ""))
+    return "\n".join(lines)
@@ -0,0 +1,74 @@
+"""
+Memory-mapped dates x tickers price matrix snapshot.
+
+A snapshot directory holds:
+    values.npy    float matrix (dates x tickers), opened with mmap_mode="r"
+    dates.npy     datetime64[ns] row index
+    tickers.npy   unicode column labels
+
+Opening is effectively free (no read until a page is touched), every process
+opening the same files shares the OS page cache, and a PriceMatrix pickles
+as its path so worker processes re-open it instead of copying the data.
+core.stats reads .values / .tickers directly, so the volatility and momentum
+filters run on the mapped arrays.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+class PriceMatrix:
+    def __init__(self, values, dates, tickers, directory=None):
+        self.values = values
+        self.dates = pd.DatetimeIndex(dates, name="Date")
+        self.tickers = np.asarray(tickers)
+        self.directory = directory
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __reduce__(self):
+        if self.directory is not None:
+            return open_price_matrix, (self.directory,)
+        return PriceMatrix, (np.asarray(self.values), self.dates, self.tickers)
+
+    def to_frame(self):
+        """Wide Close DataFrame over the same buffer (no copy for a single dtype)."""
+        return pd.DataFrame(self.values, index=self.dates, columns=pd.Index(self.tickers, name="Ticker"), copy=False)
+
+
+def write_price_matrix(history, directory, dtype=np.float64):
+    """
+    Write a wide Close frame as a price matrix directory. A new directory appears in one
+    rename, an existing one is swapped in two (core.snapshot writes fresh version
+    directories, so readers never see it missing).
+    """
+    tmp = directory.rstrip("/") + ".tmp-%d" % os.getpid()
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "values.npy"), history.to_numpy(dtype=dtype, na_value=np.nan))
+    np.save(os.path.join(tmp, "dates.npy"), pd.DatetimeIndex(history.index).as_unit("ns").to_numpy())
+    np.save(os.path.join(tmp, "tickers.npy"), history.columns.astype(str).to_numpy(dtype=str))
+    if os.path.exists(directory):
+        old = directory.rstrip("/") + ".old-%d" % os.getpid()
+        os.replace(directory, old)
+        os.replace(tmp, directory)
+        shutil.rmtree(old)
+    else:
+        os.replace(tmp, directory)
+    return directory
+
+
+def open_price_matrix(directory):
+    values = np.load(os.path.join(directory, "values.npy"), mmap_mode="r")
+    dates = np.load(os.path.join(directory, "dates.npy"))
+    tickers = np.load(os.path.join(directory, "tickers.npy"))
+    return PriceMatrix(values, dates, tickers, directory=directory)
@@ -0,0 +1,191 @@
+"""
+Trade list against the previous run's holdings.
+
+ - previous and target positions are hash joined on (Account, Ticker), so the
+   cost is linear in the number of positions, for one account or thousands
+ - a no-trade band drops resizes worth less than `band` of the account value
+   (and below `min_trade_value`); new positions and full exits always trade
+ - the report gives per account trade counts, turnover (traded value /
+   account value) and an estimated transaction cost in basis points
+ - the saved holdings are the previous positions plus the trades actually
+   made, a resize held back by the band keeps its old share count (so small
+   drifts add up until they clear the band instead of being forgotten)
+"""
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.writers import read_frame, write_frame
+
+logger = logging.getLogger("core.rebalance")
+
+ACCOUNT = "Account"
+# label of the single account when the positions carry no Account column
+DEFAULT_ACCOUNT = "portfolio"
+
+HOLDING_COLUMNS = [ACCOUNT, "Ticker", "Price", "Shares"]
+TRADE_COLUMNS = [ACCOUNT, "Ticker", "Side", "Shares", "Price", "Value", "Previous_Shares", "Target_Shares",
+                 "Est_Cost"]
+
+
+def batch_holdings(shares, tickers, price, accounts=None):
+    """Long Account / Ticker / Price / Shares frame of the non-zero cells of an allocate_batch matrix."""
+    rows, cols = np.nonzero(shares)
+    accounts = np.asarray(accounts if accounts is not None else np.arange(shares.shape[0]))
+    return pd.DataFrame({
+        ACCOUNT: accounts[rows],
+        "Ticker": np.asarray(tickers)[cols],
+        "Price": np.asarray(price, dtype=float)[cols],
+        "Shares": shares[rows, cols],
+    })
+
+
+def _columns(df):
+    n = len(df)
+    account = df[ACCOUNT].to_numpy() if ACCOUNT in df.columns else np.full(n, DEFAULT_ACCOUNT, dtype=object)
+    shares = np.nan_to_num(df["Shares"].to_numpy(dtype=float, na_value=np.nan), nan=0.0, posinf=0.0)
+    price = df["Price"].to_numpy(dtype=float, na_value=np.nan) if "Price" in df.columns else np.full(n, np.nan)
+    return account, df["Ticker"].astype(str).to_numpy(), shares, price
+
+
+def compute_trades(previous, target, band=0.0, min_trade_value=0.0, cost_bps=0.0, prices=None):
+    """
+    previous / target: frames with Ticker and Shares (Price, Account optional).
+    prices: optional Series of current prices by ticker, used before the frames' Price columns.
+    Returns (trades, report): the trades that clear the band, and one report row per account.
+    """
+    if previous is None:
+        previous = pd.DataFrame({"Ticker": pd.Series(dtype=str), "Shares": pd.Series(dtype=float)})
+    acc_p, tk_p, sh_p, px_p = _columns(previous)
+    acc_t, tk_t, sh_t, px_t = _columns(target)
+    n_prev = len(acc_p)
+
+    # outer join on (Account, Ticker) through hash factorization, duplicate rows add up
+    acc_codes, accounts = pd.factorize(np.concatenate([acc_p, acc_t]))
+    tk_codes, tickers = pd.factorize(np.concatenate([tk_p, tk_t]))
+    width = max(len(tickers), 1)
+    slot, keys = pd.factorize(acc_codes.astype(np.int64) * width + tk_codes)
+    m = len(keys)
+    prev_shares = np.bincount(slot[:n_prev], weights=sh_p, minlength=m)
+    target_shares = np.bincount(slot[n_prev:], weights=sh_t, minlength=m)
+    account_code = keys // width
+    ticker = np.asarray(tickers)[keys % width]
+
+    # target price over the previous one, explicit current prices over both
+    price = np.full(m, np.nan)
+    for rows, values in ((slot[:n_prev], px_p), (slot[n_prev:], px_t)):
+        known = ~np.isnan(values)
+        price[rows[known]] = values[known]
+    if prices is not None:
+        current = prices.reindex(ticker).to_numpy(dtype=float, na_value=np.nan)
+        price = np.where(np.isnan(current), price, current)
+
+    delta = target_shares - prev_shares
+    value = delta * price
+    n_accounts = len(accounts)
+    account_value = np.bincount(account_code, weights=np.nan_to_num(target_shares * price), minlength=n_accounts)
+    resize = (prev_shares != 0) & (target_shares != 0)
+    with np.errstate(invalid="ignore"):
+        clears_band = (np.abs(value) >= band * account_value[account_code]) & (np.abs(value) >= min_trade_value)
+    trade = (delta != 0) & (~resize | clears_band)
+    suppressed = (delta != 0) & ~trade
+    cost = np.abs(value) * cost_bps / 1e4
+
+    rows = np.flatnonzero(trade)
+    trades = pd.DataFrame({
+        ACCOUNT: np.asarray(accounts)[account_code[rows]],
+        "Ticker": ticker[rows],
+        "Side": np.where(delta[rows] > 0, "BUY", "SELL"),
+        "Shares": np.abs(delta[rows]),
+        "Price": price[rows],
+        "Value": np.abs(value[rows]),
+        "Previous_Shares": prev_shares[rows],
+        "Target_Shares": target_shares[rows],
+        "Est_Cost": cost[rows],
+    }, columns=TRADE_COLUMNS)
+
+    def per_account(weights):
+        return np.bincount(account_code, weights=weights, minlength=n_accounts)
+
+    traded_value = np.where(trade, np.nan_to_num(np.abs(value)), 0.0)
+    buys, sells = trade & (delta > 0), trade & (delta < 0)
+    report = pd.DataFrame({
+        "n_trades": per_account(trade).astype(int),
+        "n_buys": per_account(buys).astype(int),
+        "n_sells": per_account(sells).astype(int),
+        "n_suppressed": per_account(suppressed).astype(int),
+        "buy_value": per_account(np.where(buys, traded_value, 0.0)),
+        "sell_value": per_account(np.where(sells, traded_value, 0.0)),
+        "traded_value": per_account(traded_value),
+        "est_cost": per_account(np.where(trade, np.nan_to_num(cost), 0.0)),
+        "account_value": account_value,
+    }, index=pd.Index(accounts, name=ACCOUNT))
+    report["turnover"] = report["traded_value"] / report["account_value"].where(report["account_value"] > 0)
+    return trades, report
+
+
+def apply_trades(previous, trades):
+    """
+    Holdings after the trades: previous positions (Ticker / Shares, Account and Price optional)
+    plus the signed trade shares, at the trade price where there is one. Closed positions are dropped.
+    """
+    if previous is None:
+        previous = pd.DataFrame({"Ticker": pd.Series(dtype=str), "Shares": pd.Series(dtype=float)})
+    acc_p, tk_p, sh_p, px_p = _columns(previous)
+    signed = np.where(trades["Side"].to_numpy() == "BUY", 1.0, -1.0) * trades["Shares"].to_numpy(dtype=float)
+    n_prev = len(acc_p)
+
+    acc_codes, accounts = pd.factorize(np.concatenate([acc_p, trades[ACCOUNT].to_numpy()]))
+    tk_codes, tickers = pd.factorize(np.concatenate([tk_p, trades["Ticker"].astype(str).to_numpy()]))
+    width = max(len(tickers), 1)
+    slot, keys = pd.factorize(acc_codes.astype(np.int64) * width + tk_codes)
+    m = len(keys)
+    shares = np.bincount(slot, weights=np.concatenate([sh_p, signed]), minlength=m)
+    price = np.full(m, np.nan)
+    for rows, values in ((slot[:n_prev], px_p), (slot[n_prev:], trades["Price"].to_numpy(dtype=float))):
+        known = ~np.isnan(values)
+        price[rows[known]] = values[known]
+
+    held = np.flatnonzero(shares != 0)
+    return pd.DataFrame({
+        ACCOUNT: np.asarray(accounts)[keys[held] // width],
+        "Ticker": np.asarray(tickers)[keys[held] % width],
+        "Price": price[held],
+        "Shares": shares[held],
+    }, columns=HOLDING_COLUMNS)
+
+
+def _makedirs_for(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def rebalance(target, holdings_path, trades_path, band=0.0, min_trade_value=0.0, cost_bps=0.0, fmt=None,
+              save_holdings=True):
+    """
+    Diff target against the holdings snapshot at holdings_path (empty when missing) and
+    write the trade list to trades_path (None = only returned). With save_holdings, the
+    holdings after the trades become the new snapshot (only when something was traded).
+    """
+    previous = read_frame(holdings_path) if os.path.exists(holdings_path) else None
+    if previous is None:
+        logger.info("No previous holdings at %s, every position is a new buy", holdings_path)
+    trades, report = compute_trades(previous, target, band=band, min_trade_value=min_trade_value,
+                                    cost_bps=cost_bps)
+    if trades_path:
+        _makedirs_for(trades_path)
+        write_frame(trades, trades_path, fmt)
+    if not save_holdings or trades.empty:
+        return trades, report
+    holdings = apply_trades(previous, trades)
+    _makedirs_for(holdings_path)
+    # write then rename, a crash never leaves a half written snapshot behind
+    root, ext = os.path.splitext(holdings_path)
+    tmp = "%s.tmp-%d%s" % (root, os.getpid(), ext)
+    write_frame(holdings, tmp)
+    os.replace(tmp, holdings_path)
+    return trades, report
@@ -0,0 +1,65 @@
+"""
+config wiring shared by the entry points (run_pipeline, serve, stream, sweep, backtest, ui).
+
+ - one logging setup for every script
+ - the configured disk cache and history store
+ - fetching the configured data snapshot (saved for the other processes),
+   or re-opening the saved one while it is fresh; refresh bypasses the cache
+"""
+
+import logging
+import sys
+
+from core.cache import DiskCache
+from core.history_store import HistoryStore
+from core.snapshot import load_snapshot, open_snapshot, save_snapshot, snapshot_exists
+
+import config
+
+
+def setup_logging(level=logging.INFO):
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s %(levelname)s %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+
+
+def make_cache(refresh=False):
+    if not config.CACHE_DIR:
+        return None
+    return DiskCache(config.CACHE_DIR, ttl=config.CACHE_TTL, max_bytes=config.CACHE_MAX_BYTES, refresh=refresh)
+
+
+def make_history_store():
+    if not config.HISTORY_STORE:
+        return None
+    return HistoryStore(config.HISTORY_STORE, chunk_size=config.DOWNLOAD["chunk_size"],
+                        max_workers=config.DOWNLOAD["max_workers"])
+
+
+def fetch_snapshot(save=True, refresh=False):
+    """
+    Fetch prices, fundamentals and history as configured, saved to config.SNAPSHOT_DIR with save.
+    refresh downloads everything again instead of reading cache entries (they are replaced).
+    """
+    snapshot = load_snapshot(cache=make_cache(refresh), fetch_kwargs=config.FETCH, history_store=make_history_store(),
+                             period=config.HISTORY_PERIOD, universe_file=config.UNIVERSE_FILE,
+                             download_kwargs=config.DOWNLOAD)
+    if save and config.SNAPSHOT_DIR:
+        save_snapshot(snapshot, config.SNAPSHOT_DIR)
+    return snapshot
+
+
+def saved_snapshot(max_age=None, directory=None):
+    """
+    The snapshot in directory (default: config.SNAPSHOT_DIR), or None when there is none
+    or it is older than max_age seconds.
+    """
+    directory = directory or config.SNAPSHOT_DIR
+    if not snapshot_exists(directory):
+        return None
+    snapshot = open_snapshot(directory)
+    if max_age is not None and snapshot.age_seconds() >= max_age:
+        return None
+    return snapshot
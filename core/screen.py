@@ -0,0 +1,161 @@
+"""
+Mask-based screening engine.
+
+ - the universe (prices + the fundamentals columns filters read) is joined once
+ - every pipeline step compiles to a boolean mask over the universe rows
+ - masks are AND-ed and the frame is selected once at the end
+ - ranked steps (top-N selection) also see the rows still left, so unlike the
+   threshold steps their position in the pipeline matters
+ - filter modules are imported the first time their step runs, a pipeline
+   only pays the import time of the filters it uses
+ - check_params validates step parameters (names, JSON types, a filter
+   module's own check_params) before anything runs
+"""
+
+import importlib
+import inspect
+from collections.abc import Mapping
+
+import numpy as np
+
+from core.instrument import Instrumentation
+from core.universe import build_universe, select
+
+# step name -> (filter module, mask function, extra input it needs)
+STEP_REGISTRY = {
+    "price": ("filters.price_filter", "price_mask", None),
+    "volume": ("filters.volume_filter", "volume_mask", None),
+    "marketcap": ("filters.marketcap_filter", "marketcap_mask", None),
+    "pe": ("filters.pe_filter", "pe_mask", None),
+    "dividend": ("filters.dividend_filter", "dividend_mask", None),
+    "beta": ("filters.beta_filter", "beta_mask", None),
+    "volatility": ("filters.volatility_filter", "volatility_mask", "history"),
+    "momentum": ("filters.momentum_filter", "momentum_mask", "history"),
+    "sector": ("filters.sector_filter", "sector_mask", None),
+    # fn(universe, history, keep, **params), ranks among the rows kept so far
+    "rank": ("filters.rank_filter", "rank_mask", "ranked"),
+}
+
+
+class _Steps(Mapping):
+    """step name -> (mask function, extra input it needs), a filter module is imported on first use."""
+
+    def __init__(self, registry):
+        self._registry = registry
+        self._loaded = {}
+
+    def __getitem__(self, step):
+        if step not in self._loaded:
+            module, name, needs = self._registry[step]
+            self._loaded[step] = (getattr(importlib.import_module(module), name), needs)
+        return self._loaded[step]
+
+    def __contains__(self, step):
+        return step in self._registry
+
+    def __iter__(self):
+        return iter(self._registry)
+
+    def __len__(self):
+        return len(self._registry)
+
+
+STEPS = _Steps(STEP_REGISTRY)
+# steps whose result depends on the steps before them
+ORDERED_STEPS = {step for step, (_, _, needs) in STEP_REGISTRY.items() if needs == "ranked"}
+
+
+# types of the parameters whose None default does not show them (None = off)
+NULLABLE_PARAMS = {"min_price": (int, float), "max_price": (int, float), "top_n": (int, float),
+                   "top_pct": (int, float), "include": (list,), "exclude": (list,), "metric_params": (dict,)}
+# leading mask function arguments that are not parameters, by what the step needs
+_INPUTS = {None: 1, "history": 2, "ranked": 3}
+
+
+def _type_name(types):
+    return {bool: "true or false", str: "a string", list: "a list", dict: "an object"}.get(types[0], "a number")
+
+
+def check_params(step, params):
+    """
+    Raise ValueError for a parameter the step's mask function does not take, or of another
+    type than its default (or NULLABLE_PARAMS) shows. Imports the step's filter module.
+    """
+    fn, needs = STEPS[step]
+    accepted = dict(list(inspect.signature(fn).parameters.items())[_INPUTS[needs]:])
+    for name, value in params.items():
+        if name not in accepted:
+            raise ValueError("%s takes no parameter %r (expected %s)" % (step, name, ", ".join(accepted)))
+        default = accepted[name].default
+        if name in NULLABLE_PARAMS:
+            types = NULLABLE_PARAMS[name]
+        elif default is None:
+            continue
+        elif isinstance(default, (bool, str)):
+            types = (type(default),)
+        else:
+            types = (int, float)
+        if value is None and name in NULLABLE_PARAMS:
+            continue
+        # JSON true / false are ints to isinstance
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            raise ValueError("%s.%s must be %s" % (step, name, _type_name(types)))
+    check = getattr(inspect.getmodule(fn), "check_params", None)
+    if check is not None:
+        check(params)
+
+
+def step_needs(step):
+    """Extra input a step needs (None, "history" or "ranked") without importing its filter."""
+    return STEP_REGISTRY[step][2]
+
+
+def step_mask(step, universe, history=None, params=None, keep=None):
+    """
+    Boolean mask for one pipeline step, or None for an unknown step.
+    keep: rows left before this step, only ranked steps look at it (None = all rows).
+    """
+    if step not in STEPS:
+        return None
+    fn, needs = STEPS[step]
+    params = params or {}
+    if needs == "ranked":
+        return fn(universe, history, keep, **params)
+    if needs == "history":
+        return fn(universe, history, **params)
+    return fn(universe, **params)
+
+
+def screen(df, fundamentals=None, history=None, pipeline=(), filters=None, on_step=None, instrument=None):
+    """
+    Apply the pipeline steps to df and return the surviving rows.
+    on_step(step, rows_left) is called after each step (rows_left is None for unknown steps).
+    instrument: optional core.instrument.Instrumentation, each step is a "filter.<step>" stage.
+    Stops early once nothing is left.
+    """
+    filters = filters or {}
+    instrument = instrument or Instrumentation(enabled=False)
+    with instrument.stage("build_universe", rows_in=len(df)) as record:
+        universe = build_universe(df, fundamentals)
+        keep = np.ones(len(universe), dtype=bool)
+        if "Price" in universe.columns:
+            keep &= universe["Price"].notna().to_numpy()
+        record["rows_out"] = int(keep.sum())
+
+    for step in pipeline:
+        with instrument.stage("filter." + step, rows_in=int(keep.sum())) as record:
+            mask = step_mask(step, universe, history, filters.get(step, {}), keep)
+            if mask is not None:
+                keep &= mask
+            record["rows_out"] = int(keep.sum())
+        if mask is None:
+            if on_step is not None:
+                on_step(step, None)
+            continue
+        rows = record["rows_out"]
+        if on_step is not None:
+            on_step(step, rows)
+        if rows == 0:
+            break
+
+    return select(df, keep)
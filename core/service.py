@@ -0,0 +1,285 @@
+"""
+Long-running screener service.
+
+ - keeps one data snapshot in memory and refreshes it in the background
+ - answers screen requests (config.FILTERS / config.PIPELINE shape) over a
+   local HTTP port or Unix socket with the apply_equal_weight allocation
+ - snapshots are immutable and swapped by reference, so request threads
+   never see a half refreshed dataset
+ - exposes request latency metrics in Prometheus text format
+
+Endpoints:
+    POST /screen   {"pipeline": [...], "filters": {...}, "portfolio_size": 100000,
+                    "allow_fractional": false}
+                   -> JSON, or Arrow IPC stream with Accept: application/vnd.apache.arrow.stream
+    GET  /health   snapshot age and size
+    GET  /metrics  Prometheus text format
+"""
+
+import bisect
+import io
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from core.equal_weight import apply_equal_weight
+from core.screen import STEPS, check_params, screen
+from core.utils import summary_stats
+
+logger = logging.getLogger("core.service")
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+LATENCY_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+
+
+class RequestError(ValueError):
+    """Bad screen request, answered with HTTP 400."""
+
+
+class LatencyMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+        self.buckets = {}
+        self.sums = {}
+
+    def observe(self, endpoint, status, seconds):
+        with self._lock:
+            key = (endpoint, status)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            hist = self.buckets.setdefault(endpoint, [0] * (len(LATENCY_BUCKETS) + 1))
+            hist[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            self.sums[endpoint] = self.sums.get(endpoint, 0.0) + seconds
+
+    def prometheus(self):
+        with self._lock:
+            lines = ["# HELP screener_requests_total Requests by endpoint and status",
+                     "# TYPE screener_requests_total counter"]
+            for (endpoint, status), n in sorted(self.counts.items()):
+                lines.append('screener_requests_total{endpoint="%s",status="%d"} %d' % (endpoint, status, n))
+            lines += ["# HELP screener_request_seconds Request latency",
+                      "# TYPE screener_request_seconds histogram"]
+            for endpoint, hist in sorted(self.buckets.items()):
+                running = 0
+                for bound, n in zip(LATENCY_BUCKETS + ["+Inf"], hist):
+                    running += n
+                    lines.append('screener_request_seconds_bucket{endpoint="%s",le="%s"} %d' % (endpoint, bound, running))
+                lines.append('screener_request_seconds_sum{endpoint="%s"} %f' % (endpoint, self.sums[endpoint]))
+                lines.append('screener_request_seconds_count{endpoint="%s"} %d' % (endpoint, running))
+        return "\n".join(lines) + "\n"
+
+
+class ScreenerService:
+    def __init__(self, loader, refresh_seconds=900, defaults=None, result_cache_size=256):
+        """
+        loader: callable returning a core.snapshot.Snapshot (network fetch or open_snapshot).
+        defaults: {"pipeline", "filters", "portfolio_size", "allow_fractional"} used for missing request keys.
+        """
+        self.loader = loader
+        self.refresh_seconds = refresh_seconds
+        self.defaults = defaults or {}
+        self.metrics = LatencyMetrics()
+        self.snapshot = None
+        self._results = OrderedDict()
+        self._results_lock = threading.Lock()
+        self._result_cache_size = result_cache_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self):
+        start = time.perf_counter()
+        snapshot = self.loader()
+        # one reference swap, requests in flight keep the snapshot they started with
+        self.snapshot = snapshot
+        with self._results_lock:
+            self._results.clear()
+        logger.info("snapshot refreshed in %.1fs (%d tickers)", time.perf_counter() - start, len(snapshot.prices))
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("snapshot refresh failed, keeping the previous one: %s", e)
+
+    def start(self):
+        if self.snapshot is None:
+            self.refresh()
+        self._thread = threading.Thread(target=self._refresh_loop, name="snapshot-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def parse_request(self, body):
+        pipeline = body.get("pipeline", self.defaults.get("pipeline", []))
+        if not isinstance(pipeline, list) or not all(isinstance(step, str) for step in pipeline):
+            raise RequestError("pipeline must be a list of step names")
+        unknown = [step for step in pipeline if step not in STEPS]
+        if unknown:
+            raise RequestError("unknown pipeline steps: %s" % ", ".join(unknown))
+        requested = body.get("filters", {})
+        if not isinstance(requested, dict):
+            raise RequestError("filters must be an object of step -> parameters")
+        filters = {step: dict(params) for step, params in self.defaults.get("filters", {}).items()}
+        for step, params in requested.items():
+            if not isinstance(params, dict):
+                raise RequestError("filters.%s must be an object" % step)
+            filters.setdefault(step, {}).update(params)
+        portfolio_size = body.get("portfolio_size", self.defaults.get("portfolio_size", 100000))
+        if isinstance(portfolio_size, bool) or not isinstance(portfolio_size, (int, float)) \
+                or not np.isfinite(portfolio_size) or portfolio_size <= 0:
+            raise RequestError("portfolio_size must be a positive number")
+        allow_fractional = body.get("allow_fractional", self.defaults.get("allow_fractional", False))
+        if not isinstance(allow_fractional, bool):
+            raise RequestError("allow_fractional must be true or false")
+        for step in pipeline:
+            try:
+                check_params(step, filters.get(step, {}))
+            except ValueError as e:
+                raise RequestError("bad filter parameters: %s" % e)
+        return list(pipeline), filters, portfolio_size, allow_fractional
+
+    def screen(self, body):
+        """Allocation frame and summary for one request body (memoized per snapshot)."""
+        pipeline, filters, portfolio_size, allow_fractional = self.parse_request(body)
+        snapshot = self.snapshot
+        key = (snapshot.fetched_at, json.dumps([pipeline, filters, portfolio_size, allow_fractional],
+                                               sort_keys=True, default=str))
+        with self._results_lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        # parameters were checked by parse_request, anything raised here is a server error
+        df = screen(snapshot.prices, snapshot.fundamentals, snapshot.history, pipeline, filters)
+        final = apply_equal_weight(df, portfolio_size, allow_fractional).sort_values("Ticker").reset_index(drop=True)
+        result = (final, summary_stats(final, portfolio_size), snapshot.fetched_at)
+        with self._results_lock:
+            self._results[key] = result
+            while len(self._results) > self._result_cache_size:
+                self._results.popitem(last=False)
+        return result
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def address_string(self):
+            # unix socket clients have no (host, port)
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, fmt, *args):
+            logger.debug(fmt, *args)
+
+        def _send(self, status, body, content_type="application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status, payload):
+            self._send(status, json.dumps(payload, default=_json_default).encode("utf-8"))
+
+        def _timed(self, endpoint, fn):
+            start = time.perf_counter()
+            status = 500
+            try:
+                status = fn()
+            except RequestError as e:
+                status = 400
+                self._send_json(status, {"error": str(e)})
+            except Exception as e:
+                logger.exception("request failed")
+                self._send_json(status, {"error": str(e)})
+            finally:
+                service.metrics.observe(endpoint, status, time.perf_counter() - start)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._timed("/health", self._health)
+            elif self.path == "/metrics":
+                self._timed("/metrics", self._metrics)
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path == "/screen":
+                self._timed("/screen", self._screen)
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def _health(self):
+            snapshot = service.snapshot
+            self._send_json(200, {"status": "ok", "snapshot_age_seconds": snapshot.age_seconds(),
+                                  "tickers": len(snapshot.prices)})
+            return 200
+
+        def _metrics(self):
+            text = service.metrics.prometheus()
+            snapshot = service.snapshot
+            text += ("# HELP screener_snapshot_age_seconds Age of the in-memory dataset\n"
+                     "# TYPE screener_snapshot_age_seconds gauge\n"
+                     "screener_snapshot_age_seconds %f\n" % snapshot.age_seconds())
+            self._send(200, text.encode("utf-8"), "text/plain; version=0.0.4")
+            return 200
+
+        def _screen(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                raise RequestError("request body is not valid JSON")
+            if not isinstance(body, dict):
+                raise RequestError("request body must be a JSON object")
+            final, summary, fetched_at = service.screen(body)
+            if ARROW_STREAM in (self.headers.get("Accept") or ""):
+                import pyarrow as pa
+                sink = io.BytesIO()
+                table = pa.Table.from_pandas(final, preserve_index=False)
+                with pa.ipc.new_stream(sink, table.schema) as writer:
+                    writer.write_table(table)
+                self._send(200, sink.getvalue(), ARROW_STREAM)
+                return 200
+            records = final.astype(object).where(final.notna(), None).to_dict(orient="records")
+            self._send_json(200, {"snapshot_fetched_at": fetched_at, "summary": summary, "allocation": records})
+            return 200
+
+    return Handler
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(service, host="127.0.0.1", port=8765, unix_socket=None):
+    """Start the refresher and serve requests until interrupted."""
+    service.start()
+    handler = make_handler(service)
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, handler)
+        logger.info("serving on unix socket %s", unix_socket)
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        logger.info("serving on http://%s:%d", host, port)
+    try:
+        server.serve_forever()
+    finally:
+        service.stop()
+        server.server_close()
@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import pandas as pd
+
+from core.data_loader import load_symbols, fetch_latest_prices, fetch_fundamentals, fetch_history, cached_fetch
+from core.fundamentals import compact_fundamentals, load_fundamentals, save_fundamentals
+from core.price_matrix import PriceMatrix, open_price_matrix, write_price_matrix
+
+# file naming the active version directory, replaced atomically by save_snapshot
+CURRENT = "CURRENT"
+# superseded versions left in place for readers that are still opening them
+KEEP_VERSIONS = 2
+# cached datasets that date a snapshot (the constituent list does not)
+MARKET_DATA = ("prices", "fundamentals", "history")
+# files of the unversioned layout written before CURRENT existed
+LEGACY_FILES = ("prices.parquet", "fundamentals.npz", "history", "meta.json")
+
+
+@dataclass
+class Snapshot:
+    """Everything the filters need, fetched once and then screened many times."""
+    prices: pd.DataFrame
+    fundamentals: Optional[pd.DataFrame]
+    # wide Close DataFrame, or a memory-mapped core.price_matrix.PriceMatrix
+    history: Optional[Any]
+    fetched_at: float = field(default_factory=time.time)
+
+    def age_seconds(self):
+        return time.time() - self.fetched_at
+
+
+def dated_snapshot(prices, fundamentals, history, cache=None):
+    """Snapshot of just loaded data, dated by the oldest market data entry the cache served."""
+    snapshot = Snapshot(prices=prices, fundamentals=fundamentals, history=history)
+    served = cache.served(MARKET_DATA) if cache is not None else None
+    if served is not None:
+        snapshot.fetched_at = min(snapshot.fetched_at, served)
+    return snapshot
+
+
+def load_snapshot(symbols=None, cache=None, fetch_kwargs=None, history_store=None, period="1y",
+                  universe_file=None, download_kwargs=None):
+    """
+    Fetch prices, fundamentals and history in one go (through the cache when given).
+    fetched_at is the oldest cache entry served, so cached data never reads as fresh.
+    symbols default to universe_file (None = S&P 500).
+    history_store: optional core.history_store.HistoryStore for incremental history.
+    download_kwargs: chunk_size / max_workers for the price and history downloads.
+    """
+    download_kwargs = download_kwargs or {}
+    if symbols is None:
+        symbols = load_symbols(universe_file, cache=cache)
+    prices = cached_fetch(cache, "prices", fetch_latest_prices, symbols, **download_kwargs)
+    tickers = prices["Ticker"].tolist()
+    fundamentals = cached_fetch(cache, "fundamentals", fetch_fundamentals, tickers, **(fetch_kwargs or {}))
+    if history_store is not None:
+        # constituents that left the universe are dropped from the store
+        history_store.prune(symbols)
+        history = history_store.update(tickers, period=period)
+    else:
+        history = cached_fetch(cache, "history", fetch_history, tickers, period=period, **download_kwargs)
+    return dated_snapshot(prices, fundamentals, history, cache)
+
+
+def snapshot_path(directory):
+    """Directory holding the active snapshot files (the directory itself for the unversioned layout)."""
+    try:
+        with open(os.path.join(directory, CURRENT)) as f:
+            return os.path.join(directory, f.read().strip())
+    except FileNotFoundError:
+        return directory
+
+
+def snapshot_exists(directory):
+    return bool(directory) and os.path.exists(os.path.join(snapshot_path(directory), "meta.json"))
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _prune(directory, current):
+    versions = sorted(name for name in os.listdir(directory)
+                      if name.startswith("v") and not name.endswith(".tmp") and name != current)
+    for name in versions[:-KEEP_VERSIONS] if KEEP_VERSIONS else versions:
+        _remove(os.path.join(directory, name))
+    for name in LEGACY_FILES:
+        _remove(os.path.join(directory, name))
+
+
+def save_snapshot(snapshot, directory):
+    """
+    Write a snapshot version: prices.parquet, fundamentals.npz, history/ (memory-mapped
+    price matrix) and meta.json with the fetch time, in a new version directory.
+    Readers switch to it in one rename of the CURRENT file, so a concurrent
+    open_snapshot sees either the old or the new snapshot, never a mix or a gap.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = "v%d-%d" % (time.time_ns(), os.getpid())
+    tmp = os.path.join(directory, version + ".tmp")
+    os.makedirs(tmp)
+    try:
+        snapshot.prices.to_parquet(os.path.join(tmp, "prices.parquet"), index=False)
+        if snapshot.fundamentals is not None and "Ticker" in snapshot.fundamentals.columns:
+            save_fundamentals(compact_fundamentals(snapshot.fundamentals), os.path.join(tmp, "fundamentals.npz"))
+        if snapshot.history is not None:
+            history = snapshot.history
+            if isinstance(history, PriceMatrix):
+                history = history.to_frame()
+            write_price_matrix(history, os.path.join(tmp, "history"))
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({"fetched_at": snapshot.fetched_at}, f)
+        os.replace(tmp, os.path.join(directory, version))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    pointer = os.path.join(directory, "%s.tmp-%d" % (CURRENT, os.getpid()))
+    with open(pointer, "w") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT))
+    _prune(directory, version)
+    return directory
+
+
+def open_snapshot(directory):
+    """Open the active saved snapshot, history stays memory-mapped (nothing is read up front)."""
+    directory = snapshot_path(directory)
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+    prices = pd.read_parquet(os.path.join(directory, "prices.parquet"))
+    path = os.path.join(directory, "fundamentals.npz")
+    fundamentals = load_fundamentals(path) if os.path.exists(path) else None
+    path = os.path.join(directory, "history")
+    history = open_price_matrix(path) if os.path.exists(path) else None
+    return Snapshot(prices=prices, fundamentals=fundamentals, history=history, fetched_at=meta["fetched_at"])
@@ -0,0 +1,171 @@
+"""
+NumPy trailing statistics over a dates x tickers close matrix.
+
+ - only the last rows a statistic needs are touched (window + 1 for volatility,
+   lookback + 1 for returns), never the whole history
+ - several windows are answered from one returns slice
+ - results are cached per history snapshot, so re-screening with a different
+   threshold (same window) costs a dictionary lookup
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# how many history snapshots keep their computed statistics around
+MAX_SNAPSHOTS = 8
+# below this share of the columns a ticker subset is computed directly (uncached)
+SUBSET_FRACTION = 0.5
+
+_cache = OrderedDict()
+# the screener service calls in from many request threads
+_lock = threading.RLock()
+
+
+def history_arrays(history):
+    """(values, tickers) for a wide Close DataFrame or any object exposing .values/.tickers."""
+    if isinstance(history, pd.DataFrame):
+        return history.to_numpy(dtype=float, na_value=np.nan), history.columns.to_numpy()
+    return history.values, np.asarray(history.tickers)
+
+
+def trailing_returns(values, lookbacks):
+    """Dict lookback -> last / close `lookback` rows earlier - 1, per column."""
+    n = len(values)
+    last = values[-1] if n else None
+    out = {}
+    for lb in lookbacks:
+        if n <= lb:
+            out[lb] = np.full(values.shape[1], np.nan)
+        else:
+            out[lb] = last / values[n - 1 - lb] - 1
+    return out
+
+
+def trailing_volatility(values, windows):
+    """Dict window -> sample std (ddof=1) of the last `window` daily returns, per column."""
+    windows = list(windows)
+    n = len(values)
+    span = min(max(windows) + 1, n) if windows else 0
+    tail = np.asarray(values[n - span:], dtype=float)
+    returns = tail[1:] / tail[:-1] - 1
+    out = {}
+    for w in windows:
+        if len(returns) < w or w < 2:
+            out[w] = np.full(values.shape[1], np.nan)
+        else:
+            out[w] = np.std(returns[-w:], axis=0, ddof=1)
+    return out
+
+
+def _snapshot_key(history):
+    if isinstance(history, pd.DataFrame):
+        index = history.index
+        ends = (index[0], index[-1]) if len(index) else (None, None)
+        return (id(history), history.shape) + ends
+    return (id(history), history.values.shape)
+
+
+def _entry(history):
+    key = _snapshot_key(history)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            values, tickers = history_arrays(history)
+            # holding the snapshot keeps its id from being reused by another frame
+            entry = {"history": history, "values": values, "tickers": tickers}
+            _cache[key] = entry
+            while len(_cache) > MAX_SNAPSHOTS:
+                _cache.popitem(last=False)
+        else:
+            _cache.move_to_end(key)
+        return entry
+
+
+def _subset(entry, tickers):
+    """Column positions for tickers, or None when computing every column is the better deal."""
+    if tickers is None or len(tickers) >= SUBSET_FRACTION * len(entry["tickers"]):
+        return None
+    index = entry.get("index")
+    if index is None:
+        index = entry.setdefault("index", pd.Index(entry["tickers"]))
+    positions = index.get_indexer(pd.unique(np.asarray(tickers)))
+    return positions[positions >= 0]
+
+
+def volatility(history, window, tickers=None):
+    """
+    Cached trailing daily volatility per ticker (Series indexed by ticker).
+    With a small tickers subset and nothing cached yet, only those columns are computed.
+    """
+    entry = _entry(history)
+    key = ("volatility", window)
+    if key not in entry:
+        cols = _subset(entry, tickers)
+        if cols is not None:
+            tail = entry["values"][-(window + 1):]
+            return pd.Series(trailing_volatility(tail[:, cols], [window])[window], index=entry["tickers"][cols])
+        result = pd.Series(trailing_volatility(entry["values"], [window])[window], index=entry["tickers"])
+        entry.setdefault(key, result)
+    return entry[key]
+
+
+def momentum(history, days, tickers=None):
+    """
+    Cached trailing return over `days` rows per ticker (Series indexed by ticker).
+    With a small tickers subset and nothing cached yet, only those columns are computed.
+    """
+    entry = _entry(history)
+    key = ("momentum", days)
+    if key not in entry:
+        cols = _subset(entry, tickers)
+        if cols is not None:
+            tail = entry["values"][-(days + 1):]
+            return pd.Series(trailing_returns(tail[:, cols], [days])[days], index=entry["tickers"][cols])
+        result = pd.Series(trailing_returns(entry["values"], [days])[days], index=entry["tickers"])
+        entry.setdefault(key, result)
+    return entry[key]
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def rolling_volatility(values, window):
+    """
+    Trailing sample std of the last `window` daily returns at every row
+    (dates x tickers, NaN until enough returns or when the window has a gap).
+    Uses running sums, so the cost is one pass over the matrix whatever the window.
+    """
+    values = np.asarray(values, dtype=float)
+    n_rows, n_cols = values.shape
+    out = np.full((n_rows, n_cols), np.nan)
+    if window < 2 or n_rows <= window:
+        return out
+    returns = values[1:] / values[:-1] - 1
+    valid = ~np.isnan(returns)
+    returns = np.where(valid, returns, 0.0)
+    zero = np.zeros((1, n_cols))
+    # c[k] = sum of returns[0..k-1]; the window ending at row t covers returns t-window..t-1
+    c1 = np.concatenate([zero, np.cumsum(returns, axis=0)])
+    c2 = np.concatenate([zero, np.cumsum(returns * returns, axis=0)])
+    cn = np.concatenate([zero, np.cumsum(valid, axis=0)])
+    s1 = c1[window:] - c1[:-window]
+    s2 = c2[window:] - c2[:-window]
+    count = cn[window:] - cn[:-window]
+    var = np.maximum((s2 - s1 * s1 / window) / (window - 1), 0.0)
+    out[window:] = np.where(count == window, np.sqrt(var), np.nan)
+    return out
+
+
+def returns_at(values, lookback, rows):
+    """Return over `lookback` rows ending at each of `rows` (NaN where not enough history)."""
+    values = np.asarray(values, dtype=float)
+    rows = np.asarray(rows)
+    out = np.full((len(rows), values.shape[1]), np.nan)
+    ok = rows >= lookback
+    out[ok] = values[rows[ok]] / values[rows[ok] - lookback] - 1
+    return out
@@ -0,0 +1,182 @@
+"""
+Intraday streaming refresh.
+
+ - only Price moves intraday, so every pipeline step that does not read the
+   price is evaluated once into a static mask over the universe
+ - each tick updates the price array, re-applies the price step, recomputes
+   the equal weight share counts and the summary, and reports only the rows
+   whose selection, price or share count changed (every kept row when the
+   number of selected rows changes, their weight moved with it)
+ - per tick cost grows with the number of tickers, not the number of filters
+   (a ranked step after a price step is re-ranked on every tick, it
+   depends on which rows the live price lets through)
+ - ticks come from polling fetch_latest_prices or from any iterator of
+   Ticker / Price frames (e.g. core.synthetic.synthetic_ticks)
+"""
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.data_loader import fetch_latest_prices
+from core.equal_weight import equal_weight_shares
+from core.screen import ORDERED_STEPS, STEPS, step_mask
+from core.universe import build_universe
+
+logger = logging.getLogger("core.streaming")
+
+# pipeline steps whose mask only reads the Price column
+PRICE_STEPS = ("price",)
+
+DELTA_COLUMNS = ["Ticker", "Price", "Weight", "Dollar_Allocation", "Shares", "Change"]
+
+
+class StreamingScreen:
+    def __init__(self, prices, fundamentals=None, history=None, pipeline=(), filters=None,
+                 portfolio_size=100000, allow_fractional=False):
+        """
+        prices / fundamentals / history: the safe_fetch outputs the static mask is built from.
+        Tickers in prices are expected to be unique (as fetch_latest_prices returns them).
+        """
+        filters = filters or {}
+        universe = build_universe(prices, fundamentals)
+        self.tickers = universe["Ticker"].astype(str).to_numpy()
+        self._rows = pd.Index(self.tickers)
+        self.price = universe["Price"].to_numpy(dtype=float, na_value=np.nan).copy()
+        self.portfolio_size = portfolio_size
+        self.allow_fractional = allow_fractional
+
+        # segments of (static mask, price steps, ranked step or None); a ranked step that
+        # ranks by price or comes after a price step depends on the live price, so it
+        # closes a segment
+        self.segments = []
+        static = np.ones(len(universe), dtype=bool)
+        price_steps = []
+        initial = ~np.isnan(self.price)
+        for step in pipeline:
+            if step not in STEPS:
+                continue
+            params = filters.get(step, {})
+            if step in PRICE_STEPS:
+                price_steps.append((STEPS[step][0], params))
+            elif step in ORDERED_STEPS and (price_steps or self.segments or params.get("by") in PRICE_STEPS):
+                self.segments.append((static, price_steps, (STEPS[step][0], params)))
+                static = np.ones(len(universe), dtype=bool)
+                price_steps = []
+            else:
+                static &= step_mask(step, universe, history, params, initial & static)
+        self.segments.append((static, price_steps, None))
+        dynamic = len(self.segments) > 1
+        self._universe = universe if dynamic else None
+        self._history = history if dynamic else None
+
+        n = len(self.tickers)
+        self.selected = np.zeros(n, dtype=bool)
+        self.shares = np.full(n, np.nan)
+        self._emitted_price = np.full(n, np.nan)
+        self.summary = None
+
+    def _evaluate(self):
+        keep = ~np.isnan(self.price)
+        frame = pd.DataFrame({"Price": self.price}, copy=False)
+        if self._universe is not None:
+            self._universe["Price"] = self.price
+        for static, price_steps, ranked in self.segments:
+            keep &= static
+            for mask_fn, params in price_steps:
+                keep &= mask_fn(frame, **params)
+            if ranked is not None:
+                mask_fn, params = ranked
+                keep &= mask_fn(self._universe, self._history, keep, **params)
+        shares = np.full(len(keep), np.nan)
+        rows = np.flatnonzero(keep)
+        shares[rows] = equal_weight_shares(self.price[rows], self.portfolio_size, self.allow_fractional)
+        return keep, shares
+
+    def update(self, ticks=None):
+        """
+        Apply a tick (Ticker / Price frame or {ticker: price}, unknown tickers ignored)
+        and return (delta frame, summary dict). The first call returns every selected row.
+        """
+        if ticks is not None:
+            if isinstance(ticks, pd.DataFrame):
+                symbols, values = ticks["Ticker"].astype(str).to_numpy(), ticks["Price"].to_numpy(dtype=float)
+            else:
+                symbols, values = np.array(list(ticks), dtype=str), np.fromiter(ticks.values(), dtype=float)
+            positions = self._rows.get_indexer(symbols)
+            known = positions >= 0
+            self.price[positions[known]] = values[known]
+
+        keep, shares = self._evaluate()
+        n = int(keep.sum())
+        added = keep & ~self.selected
+        removed = ~keep & self.selected
+        # a new count re-weights every kept row
+        reweighted = n != int(self.selected.sum())
+        # shares are finite (0 for a non-positive price) on kept rows, NaN only shows up on unselected rows
+        updated = keep & self.selected & (reweighted | (shares != self.shares) | (self.price != self._emitted_price))
+        changed = np.flatnonzero(added | removed | updated)
+
+        weight = np.where(keep[changed], 1.0 / n if n else 0.0, 0.0)
+        delta = pd.DataFrame({
+            "Ticker": self.tickers[changed],
+            "Price": self.price[changed],
+            "Weight": weight,
+            "Dollar_Allocation": weight * self.portfolio_size,
+            "Shares": np.where(keep[changed], shares[changed], 0.0),
+            "Change": np.where(added[changed], "added", np.where(removed[changed], "removed", "updated")),
+        }, columns=DELTA_COLUMNS)
+
+        self.selected = keep
+        self.shares = shares
+        self._emitted_price = self.price.copy()
+        invested = float(np.nansum(shares[keep] * self.price[keep]))
+        self.summary = {
+            "n_stocks": n,
+            "invested": invested,
+            "remaining_cash": self.portfolio_size - invested,
+            "Total_Portfolio": self.portfolio_size,
+        }
+        return delta, self.summary
+
+    def allocation(self):
+        """Current full allocation, same columns and order as finalize_and_save."""
+        rows = np.flatnonzero(self.selected)
+        n = len(rows)
+        out = pd.DataFrame({"Ticker": self.tickers[rows], "Price": self.price[rows]})
+        if n:
+            out["Weight"] = 1.0 / n
+            out["Dollar_Allocation"] = out["Weight"] * self.portfolio_size
+            out["Shares"] = self.shares[rows]
+        return out.sort_values("Ticker").reset_index(drop=True)
+
+
+def poll_prices(symbols, interval=60, fetch_fn=fetch_latest_prices, max_ticks=None, **fetch_kwargs):
+    """Yield a fresh Ticker / Price frame every interval seconds (failed polls are skipped)."""
+    n = 0
+    while max_ticks is None or n < max_ticks:
+        start = time.monotonic()
+        try:
+            yield fetch_fn(symbols, **fetch_kwargs)
+        except Exception as e:
+            logger.warning("price poll failed, waiting for the next one: %s", e)
+        n += 1
+        time.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+
+def run_stream(stream, ticks, on_delta=None):
+    """
+    Feed every tick to stream.update and call on_delta(delta, summary, seconds)
+    for ticks that changed something. Returns the number of ticks processed.
+    """
+    n = 0
+    for tick in ticks:
+        start = time.perf_counter()
+        delta, summary = stream.update(tick)
+        seconds = time.perf_counter() - start
+        n += 1
+        if on_delta is not None and len(delta):
+            on_delta(delta, summary, seconds)
+    return n
@@ -0,0 +1,175 @@
+"""
+Parameter sweep: screen many filter configurations in one pass.
+
+ - threshold parameters (max_pe, max_beta, max_vol, ...) are evaluated by
+   computing each metric once and broadcasting it against all threshold
+   values, giving a (configs x tickers) membership matrix in one go
+ - other parameters (window_days, months, include/exclude, ...) change the
+   metric itself, every combination of those is one task on a process pool
+ - the result is one row per configuration with its count and a packed
+   membership bitset over the universe tickers
+"""
+
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.screen import ORDERED_STEPS, step_mask
+from core.universe import build_universe
+from filters.beta_filter import beta_metric
+from filters.dividend_filter import dividend_metric
+from filters.marketcap_filter import marketcap_metric
+from filters.momentum_filter import momentum_metric
+from filters.pe_filter import pe_metric
+from filters.price_filter import price_metric
+from filters.volatility_filter import volatility_metric
+from filters.volume_filter import volume_metric
+
+logger = logging.getLogger("core.sweep")
+
+# (step, parameter) -> (metric function, comparison that keeps a ticker)
+THRESHOLDS = {
+    ("price", "min_price"): (price_metric, ">="),
+    ("price", "max_price"): (price_metric, "<="),
+    ("volume", "min_avg_volume"): (volume_metric, ">="),
+    ("marketcap", "min_mcap"): (marketcap_metric, ">="),
+    ("pe", "max_pe"): (pe_metric, "<="),
+    ("dividend", "min_yield"): (dividend_metric, ">="),
+    ("beta", "max_beta"): (beta_metric, "<="),
+    ("volatility", "max_vol"): (volatility_metric, "<="),
+    ("momentum", "min_return"): (momentum_metric, ">="),
+}
+HISTORY_STEPS = {"volatility", "momentum"}
+
+
+def _metric(step, universe, history, params):
+    fn = THRESHOLDS[next(k for k in THRESHOLDS if k[0] == step)][0]
+    threshold_names = {p for s, p in THRESHOLDS if s == step}
+    extra = {k: v for k, v in params.items() if k not in threshold_names}
+    if step in HISTORY_STEPS:
+        return fn(universe, history, **extra)
+    return fn(universe, **extra)
+
+
+def _passes(metric, op, values):
+    """(len(values), n) bool matrix: which tickers pass each threshold value."""
+    out = np.ones((len(values), len(metric)), dtype=bool)
+    for i, v in enumerate(values):
+        if v is None:
+            continue
+        out[i] = metric >= v if op == ">=" else metric <= v
+    return out
+
+
+def evaluate_grid(universe, history, pipeline, filters, dims):
+    """
+    Membership matrix (n_configs x n_tickers) for one set of fixed parameters.
+    dims: list of ((step, param), values) threshold dimensions, configs are in
+    itertools.product order over the dims.
+    """
+    n = len(universe)
+    swept = {key for key, _ in dims}
+    swept_steps = {step for step, _ in swept}
+    base = np.ones(n, dtype=bool)
+    if "Price" in universe.columns:
+        base &= universe["Price"].notna().to_numpy()
+
+    metrics = {}
+    for step in pipeline:
+        params = filters.get(step, {})
+        if step not in swept_steps:
+            mask = step_mask(step, universe, history, params)
+            if mask is not None:
+                base &= mask
+            continue
+        metric = _metric(step, universe, history, params)
+        metrics[step] = metric
+        if metric is None:
+            continue
+        # thresholds of this step that are not swept stay fixed
+        for (s, p), (_, op) in THRESHOLDS.items():
+            if s == step and (s, p) not in swept and p in params:
+                base &= _passes(metric, op, [params[p]])[0]
+
+    result = base[np.newaxis, :]
+    for (step, param), values in dims:
+        metric = metrics.get(step)
+        if metric is None:
+            # dataset missing: the filter is a no-op for every value
+            passes = np.ones((len(values), n), dtype=bool)
+        else:
+            passes = _passes(metric, THRESHOLDS[(step, param)][1], values)
+        result = (result[:, np.newaxis, :] & passes[np.newaxis, :, :]).reshape(-1, n)
+    return result
+
+
+def _run_task(args):
+    universe, history, pipeline, filters, dims = args
+    return np.packbits(evaluate_grid(universe, history, pipeline, filters, dims), axis=1)
+
+
+def sweep(df, fundamentals=None, history=None, grid=None, pipeline=(), filters=None, workers=1):
+    """
+    grid: {step: {param: [values, ...]}} over entries of filters (config.FILTERS shape).
+    Returns a DataFrame with one row per configuration: the swept parameters
+    as "<step>.<param>" columns, "count" and "members" (packed bitset bytes,
+    bit i = universe ticker i, see decode_members). The universe tickers are
+    in result.attrs["tickers"].
+    """
+    grid = grid or {}
+    filters = {step: dict(params) for step, params in (filters or {}).items()}
+    for step in grid:
+        if step not in pipeline:
+            raise ValueError("swept step %r is not in the pipeline" % step)
+    # a top-N step depends on everything before it, thresholds cannot be broadcast through it
+    ranked = [step for step in pipeline if step in ORDERED_STEPS]
+    if ranked:
+        raise ValueError("sweeps do not support ranked steps (%s), use screen() per configuration" % ", ".join(ranked))
+
+    universe = build_universe(df, fundamentals)
+    dims, structural = [], []
+    for step, params in grid.items():
+        for param, values in params.items():
+            key = (step, param)
+            (dims if key in THRESHOLDS else structural).append((key, list(values)))
+
+    tasks, combos = [], []
+    for combo in itertools.product(*[values for _, values in structural]):
+        task_filters = {step: dict(params) for step, params in filters.items()}
+        for ((step, param), _), value in zip(structural, combo):
+            task_filters.setdefault(step, {})[param] = value
+        tasks.append((universe, history, tuple(pipeline), task_filters, dims))
+        combos.append(combo)
+
+    n_configs = len(tasks) * int(np.prod([len(v) for _, v in dims]))
+    logger.info("Sweeping %d configurations (%d tasks) over %d tickers", n_configs, len(tasks), len(universe))
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            packed = list(pool.map(_run_task, tasks))
+    else:
+        packed = [_run_task(t) for t in tasks]
+    bits = np.concatenate(packed, axis=0)
+
+    # parameter columns in the same (product) order as the bit rows
+    rows = [
+        list(combo) + list(thresholds)
+        for combo in combos
+        for thresholds in itertools.product(*[values for _, values in dims])
+    ]
+    columns = ["%s.%s" % key for key, _ in structural] + ["%s.%s" % key for key, _ in dims]
+    result = pd.DataFrame(rows, columns=columns)
+    counts = np.unpackbits(bits, axis=1, count=len(universe)).sum(axis=1)
+    result["count"] = counts
+    result["members"] = [row.tobytes() for row in bits]
+    result.attrs["tickers"] = universe["Ticker"].tolist()
+    return result
+
+
+def decode_members(members, tickers):
+    """Ticker list for one packed membership bitset."""
+    bits = np.unpackbits(np.frombuffer(members, dtype=np.uint8), count=len(tickers)).astype(bool)
+    return [t for t, keep in zip(tickers, bits) if keep]
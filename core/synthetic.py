@@ -0,0 +1,105 @@
+"""
+Deterministic synthetic market data for offline runs (backtests, benchmarks).
+Same seed -> same data.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def tickers(n):
+    return ["T%05d" % i for i in range(n)]
+
+
+def synthetic_history(n_tickers=500, n_days=252, seed=0, start="2005-01-03",
+                      listing_rate=0.05, delisting_rate=0.03):
+    """
+    Wide Close frame (business days x tickers) like fetch_history returns.
+    Log returns are a common market factor times a per-ticker beta plus
+    idiosyncratic noise with per-ticker drift and volatility.
+    A share of tickers lists late (leading NaN) or delists early (trailing NaN).
+    """
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0.0003, 0.0003, n_tickers)
+    vol = rng.lognormal(np.log(0.015), 0.35, n_tickers)
+    beta = rng.normal(1.0, 0.3, n_tickers)
+    market = rng.normal(0.0, 0.01, (n_days, 1))
+    steps = market * beta + rng.standard_normal((n_days, n_tickers)) * vol + drift
+    start_price = rng.lognormal(np.log(60), 1.0, n_tickers)
+    values = start_price * np.exp(np.cumsum(steps, axis=0))
+
+    listed = rng.random(n_tickers) < listing_rate
+    first = np.where(listed, rng.integers(0, n_days, n_tickers), 0)
+    delisted = rng.random(n_tickers) < delisting_rate
+    last = np.where(delisted, rng.integers(0, n_days, n_tickers), n_days)
+    rows = np.arange(n_days)[:, np.newaxis]
+    values[(rows < first) | (rows >= last)] = np.nan
+
+    index = pd.bdate_range(start, periods=n_days, name="Date")
+    return pd.DataFrame(values, index=index, columns=pd.Index(tickers(n_tickers), name="Ticker"))
+
+
+SECTORS = [
+    "Technology", "Healthcare", "Financial Services", "Consumer Cyclical", "Industrials",
+    "Communication Services", "Consumer Defensive", "Energy", "Utilities", "Real Estate",
+    "Basic Materials",
+]
+
+
+def synthetic_prices(history):
+    """Ticker / Price frame like fetch_latest_prices: last close of every ticker still trading."""
+    last = history.iloc[-1]
+    df = pd.DataFrame({"Ticker": last.index.to_numpy(), "Price": last.to_numpy()})
+    return df.dropna(subset=["Price"]).reset_index(drop=True)
+
+
+def synthetic_fundamentals(symbols, seed=0):
+    """
+    Fundamentals frame like fetch_fundamentals, restricted to the fields the
+    filters read, with yfinance-like gaps: trailingPE missing for loss makers
+    (~15%), forwardPE (~5%), beta (~6%), dividendYield for non payers (~40%),
+    averageVolume (~2%) and sector (~1%).
+    """
+    rng = np.random.default_rng(seed)
+    n = len(symbols)
+
+    def gaps(values, rate):
+        values = values.astype(object) if values.dtype == object else values.astype(float)
+        values[rng.random(n) < rate] = np.nan
+        return values
+
+    df = pd.DataFrame({
+        "Ticker": list(symbols),
+        "marketCap": rng.lognormal(np.log(8e9), 1.6, n),
+        "trailingPE": gaps(rng.lognormal(np.log(22), 0.6, n), 0.15),
+        "forwardPE": gaps(rng.lognormal(np.log(18), 0.5, n), 0.05),
+        "dividendYield": gaps(rng.gamma(2.0, 0.01, n), 0.40),
+        "beta": gaps(rng.normal(1.05, 0.4, n), 0.06),
+        "averageVolume": gaps(rng.lognormal(np.log(1.5e6), 1.3, n), 0.02),
+        "averageVolume10days": gaps(rng.lognormal(np.log(1.5e6), 1.3, n), 0.02),
+        "volume": gaps(rng.lognormal(np.log(1.5e6), 1.4, n), 0.01),
+        "sector": gaps(rng.choice(np.array(SECTORS, dtype=object), n), 0.01),
+    })
+    return df
+
+
+def synthetic_market(n_tickers=500, n_days=252, seed=0):
+    """(prices, fundamentals, history) shaped like the three safe_fetch outputs."""
+    history = synthetic_history(n_tickers, n_days, seed=seed)
+    prices = synthetic_prices(history)
+    fundamentals = synthetic_fundamentals(prices["Ticker"].tolist(), seed=seed + 1)
+    return prices, fundamentals, history
+
+
+def synthetic_ticks(prices, n_ticks=100, seed=0, move_fraction=0.2, tick_vol=0.002):
+    """
+    Local stand-in for intraday polling: yields Ticker / Price frames with a
+    random move_fraction of the tickers stepping by a small log return.
+    """
+    rng = np.random.default_rng(seed)
+    symbols = prices["Ticker"].to_numpy()
+    price = prices["Price"].to_numpy(dtype=float).copy()
+    for _ in range(n_ticks):
+        moved = np.flatnonzero(rng.random(len(price)) < move_fraction)
+        price[moved] *= np.exp(rng.normal(0.0, tick_vol, len(moved)))
+        yield pd.DataFrame({"Ticker": symbols[moved], "Price": price[moved]})
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from core.fundamentals import category_fields, numeric_fields
+
+# the only fundamentals columns any filter reads (see core.fundamentals.SCHEMA)
+NUMERIC_FIELDS = numeric_fields()
+CATEGORY_FIELDS = category_fields()
+
+
+def build_universe(df, fundamentals_df=None):
+    """
+    Join the fundamentals the filters need onto df once.
+    Rows keep df's order (positional), so a boolean mask over the universe
+    selects the same rows of df. Missing fundamentals columns are simply absent.
+    """
+    universe = df.reset_index(drop=True)
+    if fundamentals_df is None or "Ticker" not in fundamentals_df.columns:
+        return universe
+    cols = [c for c in NUMERIC_FIELDS + CATEGORY_FIELDS
+            if c in fundamentals_df.columns and c not in universe.columns]
+    if not cols:
+        return universe
+    fund = fundamentals_df.drop_duplicates(subset="Ticker").set_index("Ticker")[cols]
+    joined = fund.reindex(universe["Ticker"].to_numpy())
+    for c in cols:
+        values = joined[c]
+        if c in NUMERIC_FIELDS:
+            # yfinance sometimes hands back strings like "Infinity" in raw info frames
+            universe[c] = pd.to_numeric(values, errors="coerce").to_numpy()
+        else:
+            universe[c] = values.array
+    return universe
+
+
+def column(universe, name):
+    """Float array for a numeric column, or None if the column is missing."""
+    if name not in universe.columns:
+        return None
+    return universe[name].to_numpy(dtype=float, na_value=np.nan)
+
+
+def align_metric(metric, universe):
+    """Per-ticker metric Series -> float array in universe row order (NaN when unknown)."""
+    return metric.reindex(universe["Ticker"].to_numpy()).to_numpy(dtype=float, na_value=np.nan)
+
+
+def select(df, mask):
+    # positional selection, matches the row order used by build_universe
+    return df.reset_index(drop=True)[mask]
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 def safe_merge(left, right, on = 'Ticker'):
     return left.merge(right, on=on, how = 'left')
@@ -12,3 +13,15 @@ def summary_stats(df, portfolio_size):  #literally just tells the status of the
         'Total_Portfolio': portfolio_size
     }
 
+def summary_stats_batch(shares, price, portfolio_sizes, accounts=None):
+    """summary_stats for every row of an accounts x tickers share matrix, one row per account."""
+    price = np.nan_to_num(np.asarray(price, dtype=float))
+    sizes = np.asarray(portfolio_sizes, dtype=float)
+    invested = shares @ price
+    return pd.DataFrame({
+        'n_stocks': shares.shape[1],
+        'n_held': (shares > 0).sum(axis=1),
+        'invested': invested,
+        'remaining_cash': sizes - invested,
+        'Total_Portfolio': sizes,
+    }, index=pd.Index(accounts if accounts is not None else range(len(sizes)), name='Account'))
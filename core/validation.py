@@ -0,0 +1,169 @@
+"""
+Data quality checks between fetching and screening.
+
+ - one vectorized pass over the prices, the fundamentals coverage and the
+   last `window` bars of the history, whatever the number of tickers
+ - tickers with a missing or non-positive price, a stale or gappy history,
+   an implausible one day jump or a live price far from the last close are
+   quarantined with their reasons instead of reaching the filters; reasons in
+   warn_only (e.g. jumps, real on adjusted data) are only counted
+ - with the run date as_of, a history whose last bar lags it (a store or
+   snapshot that stopped updating) is stale for every ticker
+ - dates where most tickers have no close (a partial bar) are dropped from
+   a DataFrame history, they would skew every ticker's returns
+ - the report counts every reason plus history / fundamentals coverage,
+   quality_summary() renders it as one log line
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.universe import NUMERIC_FIELDS
+
+# in the order they are listed in the Reasons column
+REASONS = ("duplicate_ticker", "missing_price", "non_positive_price", "stale_history", "low_coverage",
+           "history_jump", "non_positive_history", "price_gap")
+
+QUARANTINE_COLUMNS = ["Ticker", "Price", "Reasons"]
+
+
+def _history_tail(history, rows):
+    """(values, dates, tickers) of the last rows of a wide Close DataFrame or a PriceMatrix."""
+    if isinstance(history, pd.DataFrame):
+        tail = history.iloc[-rows:]
+        return tail.to_numpy(dtype=float, na_value=np.nan), tail.index, history.columns.to_numpy()
+    return np.asarray(history.values[-rows:], dtype=float), history.dates[-rows:], np.asarray(history.tickers)
+
+
+def _history_checks(values, max_stale_bars, max_jump, min_coverage):
+    # per column flags over a dates x tickers window
+    n = len(values)
+    valid = ~np.isnan(values)
+    has_data = valid.any(axis=0)
+    first = np.argmax(valid, axis=0)
+    last = n - 1 - np.argmax(valid[::-1], axis=0)
+    # coverage counts from the first bar, a recent listing is not a gap
+    coverage = np.where(has_data, valid.sum(axis=0) / np.maximum(n - first, 1), 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = values[1:] / values[:-1]
+        jump = ((ratio > max_jump) | (ratio < 1.0 / max_jump)).any(axis=0)
+        non_positive = (values <= 0).any(axis=0)
+    last_close = values[np.where(has_data, last, 0), np.arange(values.shape[1])]
+    return {
+        "stale_history": has_data & (n - 1 - last > max_stale_bars),
+        "low_coverage": coverage < min_coverage,
+        "history_jump": jump,
+        "non_positive_history": non_positive,
+    }, coverage, np.where(has_data, last_close, np.nan)
+
+
+def validate(prices, fundamentals=None, history=None, max_stale_bars=5, max_jump=1.9, min_coverage=0.8,
+             window=252, max_price_gap=0.5, min_date_coverage=0.5, as_of=None, warn_only=()):
+    """
+    prices: Ticker / Price frame, history: wide Close DataFrame or PriceMatrix (optional).
+    max_jump: largest close_t / close_t-1 ratio either way (1.9 catches unadjusted 2:1 splits).
+    max_price_gap: largest |Price / last close - 1|.
+    as_of: run date, the last bar may lag it by max_stale_bars business days (None = not checked).
+    warn_only: reasons that are reported but do not quarantine.
+    Returns (clean prices, history, quarantine, report); only a DataFrame history
+    loses its sparse dates, the quarantined tickers are simply absent from the prices.
+    """
+    start = time.perf_counter()
+    tickers = prices["Ticker"].astype(str).to_numpy()
+    price = prices["Price"].to_numpy(dtype=float, na_value=np.nan)
+    n = len(tickers)
+    flags = {reason: np.zeros(n, dtype=bool) for reason in REASONS}
+    # object index: hash lookups without a round trip through arrow strings
+    index = pd.Index(tickers, dtype=object)
+    flags["duplicate_ticker"] = index.duplicated()
+    flags["missing_price"] = np.isnan(price)
+    flags["non_positive_price"] = ~np.isnan(price) & ~(np.isfinite(price) & (price > 0))
+    report = {"tickers": n}
+
+    if history is not None and len(history):
+        values, dates, columns = _history_tail(history, window)
+        row_coverage = (~np.isnan(values)).mean(axis=1) if values.shape[1] else np.zeros(len(values))
+        sparse = row_coverage < min_date_coverage
+        # a mostly failed fetch makes every date sparse, judge the tickers on all of them instead
+        if sparse.all():
+            sparse[:] = False
+        if sparse.any():
+            values, dates = values[~sparse], dates[~sparse]
+            if isinstance(history, pd.DataFrame):
+                drop = np.zeros(len(history), dtype=bool)
+                drop[len(history) - len(sparse):] = sparse
+                history = history.iloc[~drop]
+        positions = pd.Index(columns.astype(str), dtype=object).get_indexer(index)
+        known = positions >= 0
+        if len(values):
+            column_flags, coverage, last_close = _history_checks(values, max_stale_bars, max_jump, min_coverage)
+            for reason, flag in column_flags.items():
+                flags[reason][known] = flag[positions[known]]
+            close = np.full(n, np.nan)
+            close[known] = last_close[positions[known]]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                flags["price_gap"] = np.abs(price / close - 1) > max_price_gap
+            if as_of is not None:
+                lag = int(np.busday_count(np.datetime64(pd.Timestamp(dates[-1]).date()),
+                                          np.datetime64(pd.Timestamp(as_of).date())))
+                report["history_lag_days"] = lag
+                if lag > max_stale_bars:
+                    flags["stale_history"][known] = True
+        else:
+            # no bars to check against, nobody has coverage
+            known[:] = False
+            flags["low_coverage"][:] = True
+        report.update({
+            "history_bars": len(values),
+            "history_last_date": str(dates[-1])[:10] if len(dates) else None,
+            "sparse_dates": int(sparse.sum()),
+            "no_history": int((~known).sum()),
+            "history_coverage": float(np.median(coverage[positions[known]])) if known.any() else 0.0,
+        })
+
+    if fundamentals is not None and "Ticker" in fundamentals.columns:
+        present = index.isin(fundamentals["Ticker"].astype(str).to_numpy())
+        fields = [c for c in NUMERIC_FIELDS if c in fundamentals.columns]
+        report["fundamentals_coverage"] = float(present.mean()) if n else 0.0
+        report["field_coverage"] = {c: float(fundamentals[c].notna().mean()) if len(fundamentals) else 0.0
+                                    for c in fields}
+
+    matrix = np.column_stack([flags[reason] for reason in REASONS])
+    blocking = np.array([reason not in warn_only for reason in REASONS])
+    bad = matrix[:, blocking].any(axis=1)
+    rows = np.flatnonzero(bad)
+    names = np.array(REASONS)
+    quarantine = pd.DataFrame({
+        "Ticker": tickers[rows],
+        "Price": price[rows],
+        "Reasons": [";".join(names[row]) for row in matrix[rows]],
+    }, columns=QUARANTINE_COLUMNS)
+    report["quarantined"] = len(rows)
+    counts = dict(zip(REASONS, matrix.sum(axis=0)))
+    report["reasons"] = {reason: int(counts[reason]) for reason in REASONS
+                         if counts[reason] and reason not in warn_only}
+    report["warnings"] = {reason: int(counts[reason]) for reason in REASONS if counts[reason] and reason in warn_only}
+    clean = prices.iloc[np.flatnonzero(~bad)].reset_index(drop=True) if len(rows) else prices
+    report["seconds"] = time.perf_counter() - start
+    return clean, history, quarantine, report
+
+
+def quality_summary(report):
+    """The report as one line: counts, reasons and coverage."""
+    parts = ["%d tickers, %d quarantined" % (report["tickers"], report["quarantined"])]
+    if report["reasons"]:
+        parts.append(" ".join("%s=%d" % item for item in report["reasons"].items()))
+    if report["warnings"]:
+        parts.append("warnings " + " ".join("%s=%d" % item for item in report["warnings"].items()))
+    if "history_bars" in report:
+        parts.append("history %d bars to %s, coverage %.1f%%, %d without history, %d sparse dates dropped" % (
+            report["history_bars"], report["history_last_date"], 100 * report["history_coverage"],
+            report["no_history"], report["sparse_dates"]))
+    if report.get("history_lag_days", 0) > 0:
+        parts.append("last bar %d business days before the run date" % report["history_lag_days"])
+    if "fundamentals_coverage" in report:
+        parts.append("fundamentals %.1f%%" % (100 * report["fundamentals_coverage"]))
+    parts.append("%.1fms" % (1000 * report["seconds"]))
+    return "; ".join(parts)
@@ -0,0 +1,174 @@
+"""
+Output writers for result frames.
+
+ - the format comes from the file extension or an explicit name:
+   parquet, feather (Arrow IPC), csv, xlsx
+ - xlsx rows are streamed straight from the frame into a constant memory
+   xlsxwriter workbook (openpyxl write-only mode when xlsxwriter is missing)
+   instead of building a styled cell grid
+ - write_frames writes several result sets (per account, per sweep point)
+   in one pass: one sheet each in xlsx, a Result column in a single
+   parquet / feather / csv file, or one file each when the path is a directory
+"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+FORMATS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".ipc": "feather",
+    ".csv": "csv",
+    ".xlsx": "xlsx",
+}
+
+EXTENSIONS = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv", "xlsx": ".xlsx"}
+
+MIME_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "feather": "application/vnd.apache.arrow.file",
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# excel caps sheet names at 31 characters
+MAX_SHEET_NAME = 31
+
+
+def output_format(path=None, fmt=None):
+    """Writer name for an explicit format or the path's extension."""
+    if fmt:
+        fmt = fmt.lower().lstrip(".")
+        if fmt == "arrow":
+            fmt = "feather"
+        if fmt not in EXTENSIONS:
+            raise ValueError("unknown output format %r, expected one of %s" % (fmt, ", ".join(EXTENSIONS)))
+        return fmt
+    ext = os.path.splitext(str(path or ""))[1].lower()
+    if ext not in FORMATS:
+        raise ValueError("cannot tell the output format of %r, use one of %s" % (path, ", ".join(FORMATS)))
+    return FORMATS[ext]
+
+
+def _arrow_table(df):
+    import pyarrow as pa
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _xlsx_rows(df):
+    # write-only cells take plain python values, NaN becomes an empty cell like to_excel
+    values = df.astype(object).where(df.notna(), None)
+    yield list(df.columns)
+    yield from values.itertuples(index=False, name=None)
+
+
+def _write_xlsx(sheets, target):
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+    if xlsxwriter is not None:
+        # constant_memory flushes every row as it is written, file objects need in_memory
+        options = {"constant_memory": True} if isinstance(target, (str, os.PathLike)) else {"in_memory": True}
+        workbook = xlsxwriter.Workbook(target, options)
+        for name, df in sheets:
+            sheet = workbook.add_worksheet(str(name)[:MAX_SHEET_NAME])
+            for i, row in enumerate(_xlsx_rows(df)):
+                sheet.write_row(i, 0, row)
+        workbook.close()
+        return
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    for name, df in sheets:
+        sheet = workbook.create_sheet(title=str(name)[:MAX_SHEET_NAME])
+        for row in _xlsx_rows(df):
+            sheet.append(row)
+    workbook.save(target)
+
+
+def write_frame(df, target, fmt=None):
+    """Write one frame to a path or binary file object (fmt required for file objects)."""
+    fmt = output_format(target if isinstance(target, (str, os.PathLike)) else None, fmt)
+    if fmt == "parquet":
+        df.to_parquet(target, index=False)
+    elif fmt == "feather":
+        import pyarrow.feather as feather
+        feather.write_feather(_arrow_table(df), target)
+    elif fmt == "csv":
+        df.to_csv(target, index=False)
+    else:
+        _write_xlsx([("Sheet1", df)], target)
+    return target
+
+
+def read_frame(path, fmt=None):
+    """Read back a frame written by write_frame."""
+    fmt = output_format(path, fmt)
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    if fmt == "feather":
+        return pd.read_feather(path)
+    if fmt == "csv":
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+
+def frame_bytes(df, fmt):
+    """Serialized frame, e.g. for a download button."""
+    buffer = io.BytesIO()
+    write_frame(df, buffer, fmt)
+    return buffer.getvalue()
+
+
+def write_frames(frames, path, fmt=None, key="Result"):
+    """
+    Write {name: frame} result sets in one pass.
+    path without an extension (or an existing directory) -> one <name>.<ext> file per set (fmt required).
+    Otherwise a single file: a sheet per set for xlsx, and for the other formats
+    the sets are stacked with a `key` column (they must share their columns).
+    """
+    items = list(frames.items())
+    if os.path.isdir(path) or not os.path.splitext(path)[1]:
+        fmt = output_format(fmt=fmt or "parquet")
+        os.makedirs(path, exist_ok=True)
+        return [write_frame(df, os.path.join(path, "%s%s" % (name, EXTENSIONS[fmt])), fmt) for name, df in items]
+
+    fmt = output_format(path, fmt)
+    if fmt == "xlsx":
+        _write_xlsx(items, path)
+        return [path]
+    columns = [list(df.columns) for _, df in items]
+    if any(c != columns[0] for c in columns[1:]):
+        raise ValueError("result sets have different columns, write them to a directory instead")
+
+    if fmt == "csv":
+        with open(path, "w", newline="") as f:
+            for i, (name, df) in enumerate(items):
+                out = pd.concat([pd.Series(np.full(len(df), name, dtype=object), name=key), df.reset_index(drop=True)],
+                                axis=1)
+                out.to_csv(f, index=False, header=(i == 0))
+        return [path]
+
+    import pyarrow as pa
+    tables = []
+    names = pa.array([str(name) for name, _ in items])
+    for i, (name, df) in enumerate(items):
+        table = _arrow_table(df)
+        # dictionary encoded, so the label costs an index per row
+        labels = pa.DictionaryArray.from_arrays(pa.array(np.full(len(df), i, dtype=np.int32)), names)
+        tables.append(table.add_column(0, key, labels))
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        with pq.ParquetWriter(path, tables[0].schema) as writer:
+            for table in tables:
+                writer.write_table(table)
+    else:
+        with pa.ipc.new_file(path, tables[0].schema) as writer:
+            for table in tables:
+                writer.write_table(table)
+    return [path]
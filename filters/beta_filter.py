@@ -1,10 +1,22 @@
+import numpy as np
 import pandas as pd
 
+from core.universe import build_universe, column, select
+
+
+def beta_metric(universe):
+    return column(universe, 'beta')
+
+
+def beta_mask(universe, max_beta=2.0):
+    beta = beta_metric(universe)
+    if beta is None:
+        return np.ones(len(universe), dtype=bool)
+    # NaN compares False, so missing beta is dropped like before
+    return beta <= max_beta
+
 
 def filter_by_beta(df, fundamentals_df=None, max_beta=2.0):
     if fundamentals_df is None:
         return df
-    merged = df.merge(fundamentals_df[['Ticker', 'beta']], on='Ticker', how='left')
-    merged = merged[merged['beta'].notna()]
-    merged = merged[merged['beta'] <= max_beta]
-    return merged.drop(columns=['beta'], errors='ignore')
\ No newline at end of file
+    return select(df, beta_mask(build_universe(df, fundamentals_df), max_beta))
@@ -1,10 +1,25 @@
+import numpy as np
 import pandas as pd
 
+from core.universe import build_universe, column, select
+
+
+def dividend_metric(universe):
+    dividend_yield = column(universe, 'dividendYield')
+    if dividend_yield is None:
+        return None
+    # no yield reported means no dividend
+    return np.nan_to_num(dividend_yield, nan=0.0)
+
+
+def dividend_mask(universe, min_yield=0.0):
+    dividend_yield = dividend_metric(universe)
+    if dividend_yield is None:
+        return np.ones(len(universe), dtype=bool)
+    return dividend_yield >= min_yield
+
 
 def filter_by_dividend(df, fundamentals_df=None, min_yield=0.0):
     if fundamentals_df is None:
         return df
-    merged = df.merge(fundamentals_df[['Ticker', 'dividendYield']], on='Ticker', how='left')
-    merged['dividendYield'] = merged['dividendYield'].fillna(0)
-    merged = merged[merged['dividendYield'] >= min_yield]
-    return merged.drop(columns=['dividendYield'], errors='ignore')
\ No newline at end of file
+    return select(df, dividend_mask(build_universe(df, fundamentals_df), min_yield))
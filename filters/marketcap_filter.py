@@ -1,9 +1,21 @@
+import numpy as np
 import pandas as pd
 
+from core.universe import build_universe, column, select
+
+
+def marketcap_metric(universe):
+    return column(universe, 'marketCap')
+
+
+def marketcap_mask(universe, min_mcap=1e9):
+    mcap = marketcap_metric(universe)
+    if mcap is None:
+        return np.ones(len(universe), dtype=bool)
+    return mcap >= min_mcap
+
 
 def filter_by_marketcap(df, fundamentals_df=None, min_mcap=1e9):
     if fundamentals_df is None:
         return df
-    merged = df.merge(fundamentals_df[['Ticker', 'marketCap']], on='Ticker', how='left')
-    merged = merged[merged['marketCap'] >= min_mcap]
-    return merged.drop(columns=['marketCap'], errors='ignore')
\ No newline at end of file
+    return select(df, marketcap_mask(build_universe(df, fundamentals_df), min_mcap))
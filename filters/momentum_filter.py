@@ -1,15 +1,28 @@
+import numpy as np
 import pandas as pd
 
+from core import stats
+from core.universe import align_metric, select
+
 
 # simple momentum over past N months
-def filter_by_momentum(df, price_history_df=None, months=3, min_return=0.0):
+def momentum_metric(universe, price_history_df=None, months=3):
     if price_history_df is None:
-        return df
+        return None
     # convert months to approx trading days
     days = months * 21
-    pct = (price_history_df.iloc[-1] / price_history_df.shift(days).iloc[-1]) - 1
-    pct = pct.reset_index()
-    pct.columns = ['Ticker', 'momentum']
-    merged = df.merge(pct, on='Ticker', how='left')
-    merged = merged[merged['momentum'] >= min_return]
-    return merged.drop(columns=['momentum'], errors='ignore')
\ No newline at end of file
+    pct = stats.momentum(price_history_df, int(days), universe["Ticker"].to_numpy())
+    return align_metric(pct, universe)
+
+
+def momentum_mask(universe, price_history_df=None, months=3, min_return=0.0):
+    pct = momentum_metric(universe, price_history_df, months)
+    if pct is None:
+        return np.ones(len(universe), dtype=bool)
+    return pct >= min_return
+
+
+def filter_by_momentum(df, price_history_df=None, months=3, min_return=0.0):
+    if price_history_df is None:
+        return df
+    return select(df, momentum_mask(df.reset_index(drop=True), price_history_df, months, min_return))
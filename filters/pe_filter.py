@@ -1,10 +1,28 @@
+import numpy as np
 import pandas as pd
 
+from core.universe import build_universe, column, select
+
+
+def pe_metric(universe):
+    # trailing PE, falling back to forward PE
+    trailing = column(universe, 'trailingPE')
+    forward = column(universe, 'forwardPE')
+    if trailing is None:
+        return forward
+    if forward is None:
+        return trailing
+    return np.where(np.isnan(trailing), forward, trailing)
+
+
+def pe_mask(universe, max_pe=50):
+    pe = pe_metric(universe)
+    if pe is None:
+        return np.ones(len(universe), dtype=bool)
+    return pe <= max_pe
+
+
 def filter_by_pe(df, fundamentals_df=None, max_pe=50):
     if fundamentals_df is None:
         return df
-    merged = df.merge(fundamentals_df[['Ticker', 'trailingPE', 'forwardPE']], on='Ticker', how='left')
-    merged['pe'] = merged['trailingPE'].fillna(merged['forwardPE'])
-    merged = merged[merged['pe'].notna()]
-    merged = merged[merged['pe'] <= max_pe]
-    return merged.drop(columns=['trailingPE','forwardPE','pe'], errors='ignore')
\ No newline at end of file
+    return select(df, pe_mask(build_universe(df, fundamentals_df), max_pe))
@@ -1,8 +1,22 @@
+import numpy as np
 import pandas as pd
 
-def filter_by_price(df, min_price=5, max_price=None):
+
+def price_metric(universe):
+    return universe['Price'].to_numpy(dtype=float, na_value=np.nan)
+
+
+def price_mask(universe, min_price=5, max_price=None):
+    price = price_metric(universe)
+    mask = np.ones(len(price), dtype=bool)
     if min_price is not None:
-        df = df[df['Price']>=min_price]
+        mask &= price >= min_price
     if max_price is not None:
-        df = df[df['Price']<=max_price]
-    return df
+        mask &= price <= max_price
+    return mask
+
+
+def filter_by_price(df, min_price=5, max_price=None):
+    if min_price is None and max_price is None:
+        return df
+    return df[price_mask(df, min_price, max_price)]
@@ -0,0 +1,161 @@
+import inspect
+
+import numpy as np
+import pandas as pd
+
+from core.universe import build_universe, select
+from filters.beta_filter import beta_metric
+from filters.dividend_filter import dividend_metric
+from filters.marketcap_filter import marketcap_metric
+from filters.momentum_filter import momentum_metric
+from filters.pe_filter import pe_metric
+from filters.price_filter import price_metric
+from filters.volatility_filter import volatility_metric
+from filters.volume_filter import volume_metric
+
+# metric name -> (metric function, needs the price history)
+METRICS = {
+    "momentum": (momentum_metric, True),
+    "volatility": (volatility_metric, True),
+    "price": (price_metric, False),
+    "volume": (volume_metric, False),
+    "marketcap": (marketcap_metric, False),
+    "pe": (pe_metric, False),
+    "dividend": (dividend_metric, False),
+    "beta": (beta_metric, False),
+}
+
+SCORES = ("raw", "zscore", "sector_zscore", "sector_rank")
+
+
+def check_params(params):
+    """Raise ValueError for an unknown metric or score, or metric_params the metric does not take."""
+    by = params.get("by", "momentum")
+    if by not in METRICS:
+        raise ValueError("unknown rank metric %r, expected one of %s" % (by, ", ".join(METRICS)))
+    score = params.get("score", "raw")
+    if score not in SCORES:
+        raise ValueError("unknown score %r, expected one of %s" % (score, ", ".join(SCORES)))
+    fn, needs_history = METRICS[by]
+    accepted = list(inspect.signature(fn).parameters)[2 if needs_history else 1:]
+    for name, value in (params.get("metric_params") or {}).items():
+        if name not in accepted:
+            raise ValueError("rank metric %s takes no parameter %r" % (by, name))
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError("rank metric_params.%s must be a number" % name)
+
+
+def sector_codes(universe):
+    """Integer sector group per row (one extra group for a missing sector, all 0 without the column)."""
+    if 'sector' not in universe.columns:
+        return np.zeros(len(universe), dtype=np.int64)
+    codes, _ = pd.factorize(universe['sector'], use_na_sentinel=False)
+    return codes
+
+
+def _grouped_zscore(values, groups):
+    # per group mean / sample std with bincount, one pass whatever the number of groups
+    counts = np.bincount(groups)
+    sums = np.bincount(groups, weights=values)
+    squares = np.bincount(groups, weights=values * values)
+    mean = sums / np.maximum(counts, 1)
+    var = (squares - counts * mean * mean) / np.maximum(counts - 1, 1)
+    std = np.sqrt(np.maximum(var, 0.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(std[groups] > 0, (values - mean[groups]) / std[groups], 0.0)
+
+
+def rank_scores(universe, price_history_df=None, keep=None, by="momentum", metric_params=None, score="raw"):
+    """
+    Cross-sectional score per universe row, computed over the keep rows only
+    (NaN elsewhere and where the metric is unknown). None when the metric's data is missing.
+    raw: the metric, zscore: across the rows, sector_zscore / sector_rank: within each sector
+    (sector_rank is the percentile rank, 1 = highest).
+    """
+    if by not in METRICS:
+        raise ValueError("unknown rank metric %r, expected one of %s" % (by, ", ".join(METRICS)))
+    if score not in SCORES:
+        raise ValueError("unknown score %r, expected one of %s" % (score, ", ".join(SCORES)))
+    fn, needs_history = METRICS[by]
+    rows = np.arange(len(universe)) if keep is None else np.flatnonzero(keep)
+    if needs_history:
+        if price_history_df is None:
+            return None
+        # history statistics only for the candidate tickers
+        metric = fn(universe.take(rows), price_history_df, **(metric_params or {}))
+    else:
+        metric = fn(universe, **(metric_params or {}))
+        metric = None if metric is None else metric[rows]
+    if metric is None:
+        return None
+
+    scores = np.full(len(universe), np.nan)
+    known = ~np.isnan(metric)
+    values = metric[known]
+    if score == "raw":
+        out = values
+    elif score == "zscore":
+        out = _grouped_zscore(values, np.zeros(len(values), dtype=np.int64))
+    else:
+        groups = sector_codes(universe)[rows[known]]
+        if score == "sector_zscore":
+            out = _grouped_zscore(values, groups)
+        else:
+            out = pd.Series(values).groupby(groups).rank(pct=True).to_numpy()
+    scores[rows[known]] = out
+    return scores
+
+
+def _top(order_key, k):
+    # positions of the k largest keys, partial selection (no full sort)
+    if k >= len(order_key):
+        return np.arange(len(order_key))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    return np.argpartition(-order_key, k - 1)[:k]
+
+
+def _pick(key, top_n, top_pct):
+    k = len(key)
+    if top_n is not None:
+        k = min(k, int(top_n))
+    if top_pct is not None:
+        k = min(k, int(np.ceil(top_pct * len(key))))
+    return _top(key, k)
+
+
+def rank_mask(universe, price_history_df=None, keep=None, by="momentum", metric_params=None, score="raw",
+              ascending=False, top_n=None, top_pct=None, per_sector=False):
+    """
+    Keep the best top_n (and / or top_pct share) of the keep rows by score,
+    highest first (lowest with ascending=True), overall or within each sector.
+    Rows without a score are dropped; without top_n / top_pct every scored row stays.
+    """
+    scores = rank_scores(universe, price_history_df, keep, by, metric_params, score)
+    if scores is None:
+        mask = np.ones(len(universe), dtype=bool)
+        return mask if keep is None else mask & keep
+    rows = np.flatnonzero(~np.isnan(scores))
+    key = -scores[rows] if ascending else scores[rows]
+    mask = np.zeros(len(universe), dtype=bool)
+    if top_n is None and top_pct is None:
+        mask[rows] = True
+        return mask
+    if not per_sector:
+        mask[rows[_pick(key, top_n, top_pct)]] = True
+        return mask
+
+    # group the scored rows by sector (small integer codes sort in linear time)
+    groups = sector_codes(universe)[rows]
+    order = np.argsort(groups, kind="stable")
+    bounds = np.flatnonzero(np.diff(groups[order])) + 1
+    for members in np.split(order, bounds):
+        mask[rows[members[_pick(key[members], top_n, top_pct)]]] = True
+    return mask
+
+
+def filter_by_rank(df, fundamentals_df=None, price_history_df=None, by="momentum", metric_params=None,
+                   score="raw", ascending=False, top_n=None, top_pct=None, per_sector=False):
+    universe = build_universe(df, fundamentals_df)
+    return select(df, rank_mask(universe, price_history_df, None, by, metric_params, score, ascending,
+                                top_n, top_pct, per_sector))
@@ -1,14 +1,24 @@
+import numpy as np
 import pandas as pd
 
+from core.universe import build_universe, select
 
-def filter_by_sector(df, fundamentals_df=None, include=None, exclude=None):
-    if fundamentals_df is None:
-        return df
+
+def sector_mask(universe, include=None, exclude=None):
     include = include or None
     exclude = exclude or []
-    merged = df.merge(fundamentals_df[['Ticker', 'sector']], on='Ticker', how='left')
+    mask = np.ones(len(universe), dtype=bool)
+    if 'sector' not in universe.columns:
+        return mask
+    sector = universe['sector']
     if include:
-        merged = merged[merged['sector'].isin(include)]
+        mask &= sector.isin(include).to_numpy()
     if exclude:
-        merged = merged[~merged['sector'].isin(exclude)]
-    return merged.drop(columns=['sector'], errors='ignore')
\ No newline at end of file
+        mask &= ~sector.isin(exclude).to_numpy()
+    return mask
+
+
+def filter_by_sector(df, fundamentals_df=None, include=None, exclude=None):
+    if fundamentals_df is None:
+        return df
+    return select(df, sector_mask(build_universe(df, fundamentals_df), include, exclude))
@@ -1,19 +1,29 @@
+import numpy as np
 import pandas as pd
 
-# calculate daily returns std over a window and filter by max_vol (fractional daily std)
-def filter_by_volatility(df, price_history_df=None, window_days=60, max_vol=0.05):
-    if price_history_df is None:
-        return df
+from core import stats
+from core.universe import align_metric, select
 
-    returns = price_history_df.pct_change().dropna()
 
-    vol = returns.rolling(window=window_days).std().iloc[-1]
+# daily returns std over a window (fractional daily std), in universe row order
+def volatility_metric(universe, price_history_df=None, window_days=60):
+    if price_history_df is None:
+        return None
+    # only the last window_days + 1 rows are read, cached per history snapshot
+    # (a small universe, e.g. the planner's survivors, only computes its own tickers)
+    vol = stats.volatility(price_history_df, int(window_days), universe["Ticker"].to_numpy())
+    return align_metric(vol, universe)
 
-    vol = vol.reset_index()
-    vol.columns = ['Ticker', 'volatility']
 
-    merged = df.merge(vol, on='Ticker', how='left')
+# filter by max_vol
+def volatility_mask(universe, price_history_df=None, window_days=60, max_vol=0.05):
+    vol = volatility_metric(universe, price_history_df, window_days)
+    if vol is None:
+        return np.ones(len(universe), dtype=bool)
+    return vol <= max_vol
 
-    merged = merged[merged['volatility'] <= max_vol]
 
-    return merged.drop(columns=['volatility'], errors='ignore')
+def filter_by_volatility(df, price_history_df=None, window_days=60, max_vol=0.05):
+    if price_history_df is None:
+        return df
+    return select(df, volatility_mask(df.reset_index(drop=True), price_history_df, window_days, max_vol))
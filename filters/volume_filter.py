@@ -1,7 +1,28 @@
+import numpy as np
 import pandas as pd
 
+from core.universe import build_universe, column, select
+
+
+def volume_metric(universe):
+    avg_vol = None
+    # averageVolume, then the 10 day average, then today's volume
+    for name in ('averageVolume', 'averageVolume10days', 'volume'):
+        values = column(universe, name)
+        if values is None:
+            continue
+        avg_vol = values if avg_vol is None else np.where(np.isnan(avg_vol), values, avg_vol)
+    return avg_vol
+
+
+def volume_mask(universe, min_avg_volume=10000):
+    avg_vol = volume_metric(universe)
+    if avg_vol is None:
+        return np.ones(len(universe), dtype=bool)
+    return avg_vol >= min_avg_volume
+
+
 def filter_by_volume(df, fundamentals_df = None, min_avg_volume = 10000):
-    merged= df.merge(fundamentals_df[['Ticker', 'averageVolume', 'averageVolume10days', 'volume']], on= 'Ticker', how='left')
-    merged['avg_vol'] = merged['averageVolume'].fillna(merged['averageVolume10days']).fillna(merged['volume'])
-    merged = merged[merged['avg_vol'] >= min_avg_volume]
-    return merged.drop(columns=['averageVolume','averageVolume10days','volume','avg_vol'], errors='ignore')
\ No newline at end of file
+    if fundamentals_df is None:
+        return df
+    return select(df, volume_mask(build_universe(df, fundamentals_df), min_avg_volume))
@@ -1,32 +1,37 @@
 """
  - loads S&P 500 symbols and prices
- - fetches fundamentals and history needed by filters
- - applies filters in the order defined in config.PIPELINE
+ - fetches fundamentals and history needed by filters, or opens a saved
+   snapshot with --from-snapshot (no network, yfinance is never imported)
+ - quarantines tickers with bad data (stale, gappy, jumping or non-positive prices, see core.validation)
+ - applies the filters of config.PIPELINE, ordered by the planner from past runs' cost and selectivity
  - computes equal weight allocations
- - writes final result to an Excel file defined in config.OUTPUT_FILE
+ - writes final result to config.OUTPUT_FILE (Excel, Parquet, Feather or CSV, see core.writers)
+ - diffs the result against the previous run's holdings and writes the trade list
 """
 
+import argparse
+import json
 import logging
-import sys
-from typing import List
+import os
+from typing import List, Optional
 
 import pandas as pd
 
 # core functions
-from core.data_loader import get_sp500_symbols, fetch_latest_prices, fetch_fundamentals, fetch_history
+from core.cache import DiskCache
+from core.data_loader import load_symbols, fetch_latest_prices, fetch_fundamentals, fetch_history, cached_fetch
 from core.equal_weight import apply_equal_weight
+from core.instrument import Instrumentation
+from core.planner import Planner, explain, planned_screen
+from core.rebalance import rebalance
+from core.runtime import make_cache, make_history_store, setup_logging
+from core.snapshot import dated_snapshot, open_snapshot, save_snapshot
 from core.utils import summary_stats
+from core.validation import quality_summary, validate
+from core.writers import write_frame
 
 # filters
-from filters.price_filter import filter_by_price
-from filters.volume_filter import filter_by_volume
-from filters.marketcap_filter import filter_by_marketcap
-from filters.pe_filter import filter_by_pe
-from filters.dividend_filter import filter_by_dividend
-from filters.beta_filter import filter_by_beta
-from filters.volatility_filter import filter_by_volatility
-from filters.momentum_filter import filter_by_momentum
-from filters.sector_filter import filter_by_sector
+from core.screen import screen
 
 import config
 
@@ -34,22 +39,31 @@ import config
 SAMPLE_IMAGE_PATH = r"/mnt/data/1ac64b02-2d2d-42da-8b71-cff40b0586c3.png"
 
 # setup basic logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+setup_logging()
 logger = logging.getLogger("run_pipeline")
 
 
-def safe_fetch(symbols: List[str]):
+def _fetch_fundamentals_logged(symbols, **kwargs):
+    fundamentals_df, report = fetch_fundamentals(symbols, return_report=True, **kwargs)
+    logger.info("Fundamentals ok: %d, failed: %d", int(report["ok"].sum()), int((~report["ok"]).sum()))
+    if not report["ok"].all():
+        logger.warning("Fundamentals failed for: %s", ", ".join(report.index[~report["ok"]]))
+    return fundamentals_df
+
+
+def safe_fetch(symbols: List[str], cache: Optional[DiskCache] = None,
+               instrument: Optional[Instrumentation] = None):
     """
     Fetch prices, fundamentals, and history.
     Wrap downloads in try/except so one failure does not crash everything.
+    With a cache, fresh entries are reused instead of downloading again.
     """
+    instrument = instrument or Instrumentation(enabled=False)
     logger.info("Fetching latest prices for %d symbols", len(symbols))
     try:
-        prices_df = fetch_latest_prices(symbols)
+        with instrument.stage("fetch.prices", rows_in=len(symbols)) as record:
+            prices_df = cached_fetch(cache, "prices", fetch_latest_prices, symbols, **config.DOWNLOAD)
+            record["rows_out"] = len(prices_df)
         logger.info("Prices fetched, rows: %d", len(prices_df))
     except Exception as e:
         logger.exception("Failed to fetch latest prices: %s", e)
@@ -58,16 +72,29 @@ def safe_fetch(symbols: List[str]):
     # fundamentals
     logger.info("Fetching fundamentals (this may take a while)...")
     try:
-        fundamentals_df = fetch_fundamentals(prices_df["Ticker"].tolist())
+        with instrument.stage("fetch.fundamentals", rows_in=len(prices_df)) as record:
+            fundamentals_df = cached_fetch(cache, "fundamentals", _fetch_fundamentals_logged,
+                                           prices_df["Ticker"].tolist(), **config.FETCH)
+            record["rows_out"] = len(fundamentals_df)
         logger.info("Fundamentals fetched, rows: %d", len(fundamentals_df))
     except Exception as e:
         logger.warning("Failed to fetch fundamentals, continuing without them: %s", e)
         fundamentals_df = pd.DataFrame(columns=["Ticker"])
 
     # history for volatility and momentum
-    logger.info("Fetching price history (1 year) ...")
+    logger.info("Fetching price history (%s) ...", config.HISTORY_PERIOD)
     try:
-        history_df = fetch_history(prices_df["Ticker"].tolist(), period="1y")
+        tickers = prices_df["Ticker"].tolist()
+        with instrument.stage("fetch.history", rows_in=len(tickers)) as record:
+            if config.HISTORY_STORE:
+                # only the bars missing from the local store get downloaded, dropped constituents are pruned
+                store = make_history_store()
+                store.prune(symbols)
+                history_df = store.update(tickers, period=config.HISTORY_PERIOD)
+            else:
+                history_df = cached_fetch(cache, "history", fetch_history, tickers,
+                                          period=config.HISTORY_PERIOD, **config.DOWNLOAD)
+            record["rows_out"] = history_df.shape[1]
         logger.info("History fetched")
     except Exception as e:
         logger.warning("Failed to fetch history, continuing without it: %s", e)
@@ -76,75 +103,84 @@ def safe_fetch(symbols: List[str]):
     return prices_df, fundamentals_df, history_df
 
 
-def apply_pipeline(df: pd.DataFrame, fundamentals: pd.DataFrame, history: pd.DataFrame):
+def validate_data(prices_df: pd.DataFrame, fundamentals_df: pd.DataFrame, history_df,
+                  instrument: Optional[Instrumentation] = None, as_of=None):
     """
-    Apply filters in the order defined in config.PIPELINE.
-    Each filter gets only the inputs it needs, and returns a filtered DataFrame.
+    Quarantine tickers whose data would mislead the filters or the allocation
+    (config.VALIDATION) and log the quality report. as_of is the date the data was
+    fetched (default: today), the history must reach it. Returns the cleaned prices and history.
     """
-    working = df.copy()
-
-    for step in config.PIPELINE:
-        logger.info("Applying filter: %s", step)
-        if step == "price":
-            params = config.FILTERS.get("price", {})
-            working = filter_by_price(working, **params)
-
-        elif step == "volume":
-            params = config.FILTERS.get("volume", {})
-            working = filter_by_volume(working, fundamentals_df=fundamentals, **params)
-
-        elif step == "marketcap":
-            params = config.FILTERS.get("marketcap", {})
-            working = filter_by_marketcap(working, fundamentals_df=fundamentals, **params)
-
-        elif step == "pe":
-            params = config.FILTERS.get("pe", {})
-            working = filter_by_pe(working, fundamentals_df=fundamentals, **params)
-
-        elif step == "dividend":
-            params = config.FILTERS.get("dividend", {})
-            working = filter_by_dividend(working, fundamentals_df=fundamentals, **params)
-
-        elif step == "beta":
-            params = config.FILTERS.get("beta", {})
-            working = filter_by_beta(working, fundamentals_df=fundamentals, **params)
-
-        elif step == "volatility":
-            params = config.FILTERS.get("volatility", {})
-            working = filter_by_volatility(working, price_history_df=history, **params)
-
-        elif step == "momentum":
-            params = config.FILTERS.get("momentum", {})
-            working = filter_by_momentum(working, price_history_df=history, **params)
-
-        elif step == "sector":
-            params = config.FILTERS.get("sector", {})
-            working = filter_by_sector(working, fundamentals_df=fundamentals, **params)
-
-        else:
+    if not config.VALIDATION:
+        return prices_df, history_df
+    instrument = instrument or Instrumentation(enabled=False)
+    with instrument.stage("validate", rows_in=len(prices_df)) as record:
+        prices_df, history_df, quarantine, report = validate(prices_df, fundamentals_df, history_df,
+                                                             as_of=as_of or pd.Timestamp.now(),
+                                                             **config.VALIDATION)
+        record["rows_out"] = len(prices_df)
+    logger.info("Data quality: %s", quality_summary(report))
+    if len(quarantine):
+        logger.warning("Quarantined %d tickers: %s", len(quarantine),
+                       ", ".join(quarantine["Ticker"].head(20)) + (" ..." if len(quarantine) > 20 else ""))
+    try:
+        if config.QUARANTINE_FILE:
+            os.makedirs(os.path.dirname(config.QUARANTINE_FILE) or ".", exist_ok=True)
+            write_frame(quarantine, config.QUARANTINE_FILE)
+        if config.QUALITY_REPORT:
+            with open(config.QUALITY_REPORT, "w") as f:
+                json.dump(report, f, indent=2)
+    except OSError as e:
+        logger.warning("Failed to save the quality report: %s", e)
+    return prices_df, history_df
+
+
+def apply_pipeline(df: pd.DataFrame, fundamentals: pd.DataFrame, history: pd.DataFrame,
+                   instrument: Optional[Instrumentation] = None, planner: Optional[Planner] = None):
+    """
+    Apply the filters in config.PIPELINE.
+    Fundamentals are joined once, each filter becomes a boolean mask and the
+    rows are selected once at the end (see core.screen). With config.PLANNER_STATS
+    the steps are reordered from the cost / selectivity of earlier runs and the
+    plan is logged (see core.planner).
+    planner: use this planner instead (Planner() learns in memory only, for
+    benchmarks and other runs that must not touch the production stats).
+    """
+    def log_step(step, rows):
+        if rows is None:
             logger.warning("Unknown pipeline step: %s, skipping", step)
-
-        # defensive: drop any rows that lost price data during filtering
-        if "Price" in working.columns:
-            working = working.dropna(subset=["Price"])
-
-        logger.info("Rows after %s: %d", step, len(working))
-
+            return
+        logger.info("Rows after %s: %d", step, rows)
         # stop early if all filtered out
-        if len(working) == 0:
+        if rows == 0:
             logger.warning("No symbols left after %s filter. Exiting pipeline.", step)
-            break
 
-    return working
+    if planner is None and not config.PLANNER_STATS:
+        return screen(df, fundamentals, history, config.PIPELINE, config.FILTERS, on_step=log_step,
+                      instrument=instrument)
+
+    planner = planner or Planner(config.PLANNER_STATS)
+    result, plan = planned_screen(df, fundamentals, history, config.PIPELINE, config.FILTERS, planner,
+                                  on_step=log_step, instrument=instrument)
+    logger.info("Pipeline plan:\n%s", explain(plan))
+    try:
+        planner.save()
+    except OSError as e:
+        logger.warning("Failed to save planner stats to %s: %s", planner.path, e)
+    return result
 
 
-def finalize_and_save(df: pd.DataFrame):
+def finalize_and_save(df: pd.DataFrame, instrument: Optional[Instrumentation] = None,
+                      out: Optional[str] = None, fmt: Optional[str] = None):
     """
     Compute equal weights and save final output.
+    The writer is picked by fmt or the file extension (config.OUTPUT_FILE by default).
     Also print a short summary.
     """
+    instrument = instrument or Instrumentation(enabled=False)
     logger.info("Applying equal weight allocation")
-    final = apply_equal_weight(df, config.PORTFOLIO_SIZE, config.ALLOW_FRACTIONAL)
+    with instrument.stage("allocate", rows_in=len(df)) as record:
+        final = apply_equal_weight(df, config.PORTFOLIO_SIZE, config.ALLOW_FRACTIONAL)
+        record["rows_out"] = len(final)
 
     # summary
     s = summary_stats(final, config.PORTFOLIO_SIZE)
@@ -153,9 +189,11 @@ def finalize_and_save(df: pd.DataFrame):
 
     # final clean up and save
     final = final.sort_values("Ticker").reset_index(drop=True)
-    out = config.OUTPUT_FILE
+    out = out or config.OUTPUT_FILE
     try:
-        final.to_excel(out, index=False)
+        with instrument.stage("write_output", rows_in=len(final)) as record:
+            write_frame(final, out, fmt or config.OUTPUT_FORMAT)
+            record["rows_out"] = len(final)
         logger.info("Saved final output to %s", out)
     except Exception as e:
         logger.exception("Failed to save output to %s: %s", out, e)
@@ -164,21 +202,129 @@ def finalize_and_save(df: pd.DataFrame):
     return final
 
 
-def main():
-    logger.info("Starting EqualWeight Screener pipeline")
-    symbols = get_sp500_symbols()
+def rebalance_trades(final: pd.DataFrame, instrument: Optional[Instrumentation] = None,
+                     save_holdings: bool = True, trades_path: Optional[str] = None):
+    """
+    Trade list from the previous holdings snapshot to final, written to trades_path
+    (default: config.TRADES_FILE when save_holdings, a check run only logs it unless
+    given a path). With save_holdings the holdings after the trades become the new snapshot.
+    A failure here never loses the allocation that was already written.
+    """
+    if not config.HOLDINGS_SNAPSHOT:
+        return None
+    instrument = instrument or Instrumentation(enabled=False)
+    if trades_path is None and save_holdings:
+        trades_path = config.TRADES_FILE
+    try:
+        with instrument.stage("rebalance", rows_in=len(final)) as record:
+            trades, report = rebalance(final, config.HOLDINGS_SNAPSHOT, trades_path,
+                                       save_holdings=save_holdings, **config.REBALANCE)
+            record["rows_out"] = len(trades)
+    except Exception as e:
+        logger.exception("Failed to compute trades against %s: %s", config.HOLDINGS_SNAPSHOT, e)
+        return None
+    for account, row in report.iterrows():
+        logger.info("Trades %s: %d (%d buys, %d sells, %d inside the band) turnover %.2f%% est. cost %.2f",
+                    account, row["n_trades"], row["n_buys"], row["n_sells"], row["n_suppressed"],
+                    100 * (row["turnover"] if pd.notna(row["turnover"]) else 0.0), row["est_cost"])
+    if trades_path:
+        logger.info("Saved %d trades to %s", len(trades), trades_path)
+    return trades
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the equal-weight screener pipeline.")
+    parser.add_argument("--output", default=config.OUTPUT_FILE, help="result file (.xlsx, .parquet, .feather, .csv)")
+    parser.add_argument("--format", default=config.OUTPUT_FORMAT, choices=["xlsx", "parquet", "feather", "csv"],
+                        help="output format (default: by the --output extension)")
+    parser.add_argument("--from-snapshot", metavar="DIR", default=None,
+                        help="screen a snapshot saved by an earlier run instead of fetching (no network)")
+    parser.add_argument("--update-holdings", action=argparse.BooleanOptionalAction, default=None,
+                        help="save the holdings after the trades as the next baseline "
+                             "(default: yes, except for --from-snapshot check runs)")
+    parser.add_argument("--trades-out", metavar="PATH", default=None,
+                        help="trade list file (default: config.TRADES_FILE, a check run that does not "
+                             "update the holdings only logs its trades)")
+    parser.add_argument("--metrics-json", default=config.METRICS_JSON, help="write per-stage metrics as JSON")
+    parser.add_argument("--metrics-prom", default=config.METRICS_PROM,
+                        help="write per-stage metrics in Prometheus text format")
+    parser.add_argument("--trace-memory", action="store_true", help="record tracemalloc peaks per stage (slower)")
+    parser.add_argument("--profile", metavar="DIR", help="dump cProfile stats of the hot stages into DIR")
+    parser.add_argument("--profile-stages", default=",".join(config.PROFILE_STAGES),
+                        help="comma separated stage names to profile")
+    return parser.parse_args(argv)
+
+
+def export_metrics(instrument: Instrumentation, args):
+    for stage in instrument.stages:
+        logger.info("Stage %-20s wall %.3fs cpu %.3fs rows %s -> %s net %s", stage["stage"],
+                    stage["wall_seconds"], stage["cpu_seconds"], stage["rows_in"], stage["rows_out"],
+                    stage["network_calls"] or "-")
+    if args.metrics_json:
+        instrument.to_json(args.metrics_json)
+        logger.info("Saved stage metrics to %s", args.metrics_json)
+    if args.metrics_prom:
+        instrument.to_prometheus(args.metrics_prom)
+        logger.info("Saved Prometheus metrics to %s", args.metrics_prom)
+
+
+def fetch_and_snapshot(instrument: Instrumentation):
+    """Fetch everything (through the cache) and save it as the shared snapshot."""
+    cache = make_cache()
+    with instrument.stage("fetch.constituents") as record:
+        symbols = load_symbols(config.UNIVERSE_FILE, cache=cache)
+        record["rows_out"] = len(symbols)
     logger.info("Loaded %d symbols", len(symbols))
 
-    prices_df, fundamentals_df, history_df = safe_fetch(symbols)
+    prices_df, fundamentals_df, history_df = safe_fetch(symbols, cache=cache, instrument=instrument)
+    if cache is not None:
+        logger.info("Cache stats: %s", cache.stats())
+
+    # share the fetched data with the UI / worker processes as a memory-mapped snapshot
+    if config.SNAPSHOT_DIR:
+        try:
+            with instrument.stage("save_snapshot"):
+                save_snapshot(dated_snapshot(prices_df, fundamentals_df, history_df, cache), config.SNAPSHOT_DIR)
+            logger.info("Saved data snapshot to %s", config.SNAPSHOT_DIR)
+        except Exception as e:
+            logger.warning("Failed to save data snapshot to %s: %s", config.SNAPSHOT_DIR, e)
+
+    return prices_df, fundamentals_df, history_df
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    instrument = Instrumentation(trace_memory=args.trace_memory, profile_dir=args.profile,
+                                 profile_stages=[s for s in args.profile_stages.split(",") if s])
+    logger.info("Starting EqualWeight Screener pipeline")
+    if args.from_snapshot:
+        with instrument.stage("open_snapshot") as record:
+            snapshot = open_snapshot(args.from_snapshot)
+            record["rows_out"] = len(snapshot.prices)
+        logger.info("Opened data snapshot %s (%d symbols, %.0fs old)", args.from_snapshot,
+                    len(snapshot.prices), snapshot.age_seconds())
+        prices_df, fundamentals_df, history_df = snapshot.prices, snapshot.fundamentals, snapshot.history
+        # a check run holds the snapshot to the day it was fetched
+        as_of = pd.Timestamp(snapshot.fetched_at, unit="s")
+    else:
+        prices_df, fundamentals_df, history_df = fetch_and_snapshot(instrument)
+        as_of = None
+
+    prices_df, history_df = validate_data(prices_df, fundamentals_df, history_df, instrument=instrument,
+                                          as_of=as_of)
 
     # initial DF for pipeline is prices_df
-    df_after_filters = apply_pipeline(prices_df, fundamentals_df, history_df)
+    df_after_filters = apply_pipeline(prices_df, fundamentals_df, history_df, instrument=instrument)
 
     if df_after_filters.empty:
         logger.error("No stocks left after filtering. Exiting.")
+        export_metrics(instrument, args)
         return
 
-    final = finalize_and_save(df_after_filters)
+    final = finalize_and_save(df_after_filters, instrument=instrument, out=args.output, fmt=args.format)
+    update_holdings = args.update_holdings if args.update_holdings is not None else not args.from_snapshot
+    rebalance_trades(final, instrument=instrument, save_holdings=update_holdings, trades_path=args.trades_out)
+    export_metrics(instrument, args)
 
     logger.info("Pipeline finished successfully. Final rows: %d", len(final))
     # If you want to inspect example image for reference, path is:
@@ -0,0 +1,47 @@
+"""
+Single command line entry point for the screener scripts.
+
+ - only argparse is imported up front, the subcommand's module (and with it
+   pandas / numpy / the filters it uses) is imported once it is picked, so
+   `--help` and typos answer instantly
+ - filters are loaded through the core.screen registry by their
+   config.PIPELINE names, yfinance only when something is downloaded
+ - `run --from-snapshot DIR` screens a saved snapshot without touching the
+   network stack
+
+Examples:
+    python screener.py run
+    python screener.py run --from-snapshot data/snapshot --output result.parquet
+    python screener.py serve --port 8765
+    python screener.py stream --synthetic 5000 --ticks 200
+"""
+
+import argparse
+import importlib
+
+# subcommand -> (script module with main(argv), description)
+COMMANDS = {
+    "run": ("run_pipeline", "fetch (or open a snapshot), screen, allocate and write the result"),
+    "serve": ("serve", "keep the screener running as a local HTTP service"),
+    "stream": ("stream", "stream intraday price updates through the screen"),
+    "sweep": ("sweep", "batch parameter sweep over config.FILTERS"),
+    "backtest": ("backtest", "offline backtest of the pipeline with equal-weight rebalancing"),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Equal-weight S&P 500 screener.",
+        epilog="\n".join("  %-9s %s" % (name, text) for name, (_, text) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command",
+                        help="one of: %s (pass --help after it for its options)" % ", ".join(COMMANDS))
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(COMMANDS[args.command][0])
+    module.main(args.args)
+
+
+if __name__ == "__main__":
+    main()
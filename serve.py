@@ -0,0 +1,50 @@
+"""
+Run the screener as a long-lived local service (see core/service.py).
+
+Examples:
+    python serve.py --port 8765
+    python serve.py --unix /tmp/screener.sock --from-snapshot data/snapshot
+
+    curl -s localhost:8765/screen -d '{"filters": {"pe": {"max_pe": 30}}}'
+"""
+
+import argparse
+import logging
+
+from core.runtime import fetch_snapshot, setup_logging
+from core.service import ScreenerService, serve
+from core.snapshot import open_snapshot
+
+import config
+
+setup_logging()
+logger = logging.getLogger("serve")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve screen requests from an in-memory dataset.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--refresh", type=float, default=config.SERVICE_REFRESH_SECONDS,
+                        help="seconds between background dataset refreshes")
+    parser.add_argument("--from-snapshot", metavar="DIR",
+                        help="re-open a saved snapshot directory instead of fetching (no network)")
+    args = parser.parse_args(argv)
+
+    if args.from_snapshot:
+        loader = lambda: open_snapshot(args.from_snapshot)
+    else:
+        loader = fetch_snapshot
+    defaults = {
+        "pipeline": list(config.PIPELINE),
+        "filters": config.FILTERS,
+        "portfolio_size": config.PORTFOLIO_SIZE,
+        "allow_fractional": config.ALLOW_FRACTIONAL,
+    }
+    service = ScreenerService(loader, refresh_seconds=args.refresh, defaults=defaults)
+    serve(service, host=args.host, port=args.port, unix_socket=args.unix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Intraday streaming mode: keep the screen and share counts in step with live prices.
+
+ - fundamentals and history filters are evaluated once from the snapshot
+ - every poll of fetch_latest_prices (or every synthetic tick) only
+   re-runs the price filter, the equal weight allocation and the summary
+ - rows whose selection, price or share count changed are logged and
+   optionally appended to a CSV (--deltas)
+
+Examples:
+    python stream.py --interval 60
+    python stream.py --from-snapshot data/snapshot --interval 30 --deltas deltas.csv
+    python stream.py --synthetic 5000 --ticks 200
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from core.runtime import setup_logging
+from core.snapshot import open_snapshot, snapshot_exists
+from core.streaming import StreamingScreen, poll_prices, run_stream
+from core.synthetic import synthetic_market, synthetic_ticks
+
+import config
+
+setup_logging()
+logger = logging.getLogger("stream")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream intraday price updates through the screen.")
+    parser.add_argument("--interval", type=float, default=60, help="seconds between price polls")
+    parser.add_argument("--ticks", type=int, help="stop after this many ticks (default: run until interrupted)")
+    parser.add_argument("--from-snapshot", metavar="DIR", default=None,
+                        help="snapshot directory with fundamentals and history (default: config.SNAPSHOT_DIR)")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="N synthetic tickers and ticks, no network")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--deltas", help="append every delta to this CSV file")
+    args = parser.parse_args(argv)
+
+    if args.synthetic:
+        prices, fundamentals, history = synthetic_market(args.synthetic, seed=args.seed)
+        ticks = synthetic_ticks(prices, n_ticks=args.ticks or 100, seed=args.seed)
+    else:
+        directory = args.from_snapshot or config.SNAPSHOT_DIR
+        if not snapshot_exists(directory):
+            raise SystemExit("no snapshot at %r, run run_pipeline.py first or pass --from-snapshot" % directory)
+        snapshot = open_snapshot(directory)
+        prices, fundamentals, history = snapshot.prices, snapshot.fundamentals, snapshot.history
+        ticks = poll_prices(prices["Ticker"].tolist(), interval=args.interval, max_ticks=args.ticks,
+                            **config.DOWNLOAD)
+
+    start = time.perf_counter()
+    stream = StreamingScreen(prices, fundamentals, history, config.PIPELINE, config.FILTERS,
+                             config.PORTFOLIO_SIZE, config.ALLOW_FRACTIONAL)
+    _, s = stream.update()
+    logger.info("Static masks built in %.2fs: n_stocks=%d invested=%.2f remaining_cash=%.2f",
+                time.perf_counter() - start, s["n_stocks"], s["invested"], s["remaining_cash"])
+
+    def on_delta(delta, summary, seconds):
+        counts = delta["Change"].value_counts()
+        logger.info("Tick: %d added, %d removed, %d updated in %.2fms; n_stocks=%d invested=%.2f remaining_cash=%.2f",
+                    counts.get("added", 0), counts.get("removed", 0), counts.get("updated", 0), seconds * 1000,
+                    summary["n_stocks"], summary["invested"], summary["remaining_cash"])
+        if args.deltas:
+            header = not os.path.exists(args.deltas)
+            delta.assign(Time=time.strftime("%Y-%m-%dT%H:%M:%S")).to_csv(args.deltas, mode="a", header=header,
+                                                                         index=False)
+
+    try:
+        n = run_stream(stream, ticks, on_delta)
+    except KeyboardInterrupt:
+        n = None
+    logger.info("Stream stopped%s", " after %d ticks" % n if n is not None else "")
+
+
+if __name__ == "__main__":
+    main()
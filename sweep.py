@@ -0,0 +1,88 @@
+"""
+Batch parameter sweep over config.FILTERS.
+
+ - loads the same data snapshot as the pipeline (through the cache), or
+   screens a saved one with --from-snapshot (no network)
+ - evaluates every combination of the given parameter ranges
+ - writes one row per configuration (parameters, count, membership bitset)
+
+Example:
+    python sweep.py --grid pe.max_pe=10:60:5 --grid beta.max_beta=0.5,1,1.5,2 \\
+        --grid volatility.max_vol=0.01:0.05:0.005 --out sweep.parquet
+    python sweep.py --from-snapshot data/snapshot --grid pe.max_pe=10:60:5
+"""
+
+import argparse
+import json
+import logging
+
+import numpy as np
+
+from core.runtime import fetch_snapshot, saved_snapshot, setup_logging
+from core.sweep import sweep
+
+import config
+
+setup_logging()
+logger = logging.getLogger("sweep")
+
+
+def parse_values(text):
+    """'10:60:5' -> inclusive range, '1,2,3' -> list, anything else -> JSON."""
+    if text.count(":") == 2:
+        start, stop, step = (float(x) for x in text.split(":"))
+        return [round(float(v), 10) for v in np.arange(start, stop + step / 2, step)]
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(v) if v not in ("None", "") else None for v in text.split(",")]
+
+
+def parse_grid(items):
+    grid = {}
+    for item in items:
+        key, _, values = item.partition("=")
+        step, _, param = key.partition(".")
+        if not param or step not in config.FILTERS:
+            raise SystemExit("bad --grid entry %r, expected <step>.<param>=<values>" % item)
+        grid.setdefault(step, {})[param] = parse_values(values)
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep filter thresholds over the screener universe.")
+    parser.add_argument("--grid", action="append", default=[],
+                        help="<step>.<param>=start:stop:step | v1,v2,... | JSON list (repeatable)")
+    parser.add_argument("--out", default="sweep.parquet", help=".parquet or .csv output file")
+    parser.add_argument("--workers", type=int, default=1, help="processes for non-threshold parameters")
+    parser.add_argument("--from-snapshot", metavar="DIR", default=None,
+                        help="sweep a snapshot saved by an earlier run instead of fetching (no network)")
+    args = parser.parse_args(argv)
+
+    grid = parse_grid(args.grid)
+    if args.from_snapshot:
+        snapshot = saved_snapshot(directory=args.from_snapshot)
+        if snapshot is None:
+            raise SystemExit("no snapshot in %s" % args.from_snapshot)
+        logger.info("Opened data snapshot %s (%d symbols, %.0fs old)", args.from_snapshot,
+                    len(snapshot.prices), snapshot.age_seconds())
+    else:
+        snapshot = fetch_snapshot(save=False)
+
+    result = sweep(snapshot.prices, snapshot.fundamentals, snapshot.history, grid,
+                   config.PIPELINE, config.FILTERS, workers=args.workers)
+
+    tickers = result.attrs["tickers"]
+    if args.out.endswith(".csv"):
+        out = result.assign(members=result["members"].map(bytes.hex))
+        out.to_csv(args.out, index=False)
+    else:
+        result.to_parquet(args.out, index=False)
+    # bit i of every members bitset is tickers[i]
+    with open(args.out + ".tickers.txt", "w") as f:
+        f.write("\n".join(tickers))
+    logger.info("Wrote %d configurations to %s (counts %d..%d)", len(result), args.out,
+                result["count"].min(), result["count"].max())
+
+
+if __name__ == "__main__":
+    main()
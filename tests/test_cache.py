@@ -0,0 +1,64 @@
+import os
+import time
+
+import core.data_loader as data_loader
+from core.cache import DiskCache
+from core.data_loader import cached_fetch, fetch_fundamentals
+
+SYMBOLS = ["A", "B", "C"]
+
+
+def fake_info(failing):
+    def fetch(symbol):
+        if symbol in failing:
+            raise RuntimeError("429 Too Many Requests")
+        return {"marketCap": 1e10, "beta": 1.0, "sector": "Tech"}
+    return fetch
+
+
+def fetch(cache, monkeypatch, failing):
+    monkeypatch.setattr(data_loader, "_fetch_info", fake_info(failing))
+    return cached_fetch(cache, "fundamentals", fetch_fundamentals, SYMBOLS, retries=0, backoff=0)
+
+
+def test_failed_fetch_is_not_cached(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), ttl={"fundamentals": 86400})
+    assert len(fetch(cache, monkeypatch, failing=set(SYMBOLS))) == 0
+    # the source recovered: fetched again instead of a day of empty screens
+    assert len(fetch(cache, monkeypatch, failing=set())) == 3
+    assert cache.stats()["fundamentals"] == {"hits": 0, "misses": 2}
+    assert len(fetch(cache, monkeypatch, failing=set(SYMBOLS))) == 3
+
+
+def test_partial_result_expires_after_partial_ttl(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), ttl={"fundamentals": 86400}, partial_ttl=60)
+    assert len(fetch(cache, monkeypatch, failing={"B"})) == 2
+    assert len(fetch(cache, monkeypatch, failing=set())) == 2  # still fresh
+
+    folder = os.path.join(str(tmp_path), "fundamentals")
+    for name in os.listdir(folder):
+        assert name.endswith(".partial.parquet")
+        # 61 seconds later
+        path = os.path.join(folder, name)
+        os.utime(path, (time.time(), os.path.getmtime(path) - 61))
+    assert len(fetch(cache, monkeypatch, failing=set())) == 3
+    assert os.listdir(folder) == [name.replace(".partial", "")]
+
+
+def test_served_reports_the_oldest_entry_and_refresh_skips_entries(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), ttl={"fundamentals": 86400})
+    fetch(cache, monkeypatch, failing=set())
+    assert cache.served() is None
+    folder = os.path.join(str(tmp_path), "fundamentals")
+    path = os.path.join(folder, os.listdir(folder)[0])
+    written = time.time() - 3600
+    os.utime(path, (written, written))
+    fetch(cache, monkeypatch, failing=set())
+    assert abs(cache.served() - written) < 1
+    assert cache.served(["prices"]) is None
+
+    refresh = DiskCache(str(tmp_path), ttl={"fundamentals": 86400}, refresh=True)
+    fetch(refresh, monkeypatch, failing=set())
+    assert refresh.served() is None and refresh.stats()["fundamentals"] == {"hits": 0, "misses": 1}
+    # the fresh result replaced the hour old entry
+    assert time.time() - os.path.getmtime(path) < 60
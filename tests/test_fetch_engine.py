@@ -0,0 +1,91 @@
+import sys
+import threading
+import time
+import types
+
+import pandas as pd
+import pytest
+
+from core.data_loader import fetch_fundamentals
+from core.fetch_engine import fetch_many
+
+LATENCY = 0.02
+SYMBOLS = ["T%02d" % i for i in range(40)] + ["BAD1", "BAD2", "FLAKY"]
+
+
+class StubYFinance(types.ModuleType):
+    """
+    Stand-in for the yfinance module: every .info sleeps, BAD* always raise, FLAKY fails once.
+    peak is the largest number of .info calls in flight, with gate (a Barrier) they wait for each other.
+    """
+
+    def __init__(self):
+        super().__init__("yfinance")
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.gate = None
+        stub = self
+
+        class Ticker:
+            def __init__(self, symbol):
+                self.symbol = symbol
+
+            @property
+            def info(self):
+                with stub.lock:
+                    stub.calls[self.symbol] = stub.calls.get(self.symbol, 0) + 1
+                    attempt = stub.calls[self.symbol]
+                    stub.active += 1
+                    stub.peak = max(stub.peak, stub.active)
+                try:
+                    if stub.gate is not None:
+                        stub.gate.wait(timeout=5)
+                    time.sleep(LATENCY)
+                finally:
+                    with stub.lock:
+                        stub.active -= 1
+                if self.symbol.startswith("BAD") or (self.symbol == "FLAKY" and attempt == 1):
+                    raise RuntimeError("429 Too Many Requests")
+                return {"marketCap": 1e10, "beta": 1.1, "trailingPE": 20.0, "sector": "Tech"}
+
+        self.Ticker = Ticker
+
+
+@pytest.fixture
+def yf(monkeypatch):
+    stub = StubYFinance()
+    monkeypatch.setitem(sys.modules, "yfinance", stub)
+    return stub
+
+
+def test_report_and_frame(yf):
+    df, report = fetch_fundamentals(SYMBOLS, max_workers=8, retries=2, backoff=0, return_report=True)
+    assert sorted(df["Ticker"]) == sorted(s for s in SYMBOLS if not s.startswith("BAD"))
+    assert df["marketCap"].eq(1e10).all()
+
+    assert list(report.index) == SYMBOLS
+    assert sorted(report.index[~report["ok"]]) == ["BAD1", "BAD2"]
+    assert report.loc["BAD1", "attempts"] == 3 and "429" in report.loc["BAD1", "error"]
+    assert report.loc["FLAKY", "ok"] and report.loc["FLAKY", "attempts"] == 2
+    assert report.loc["T00", "attempts"] == 1 and pd.isna(report.loc["T00", "error"])
+    assert df.attrs["failed"] == 2
+
+
+@pytest.mark.parametrize("workers", [1, 4, 8])
+def test_every_worker_has_a_request_in_flight(yf, workers):
+    symbols = [s for s in SYMBOLS if s.startswith("T")]
+    # 40 symbols fill every wave, each wave only passes the gate once all workers are in it
+    yf.gate = threading.Barrier(workers)
+    df = fetch_fundamentals(symbols, max_workers=workers, retries=0, backoff=0)
+    assert len(df) == len(symbols)
+    assert yf.peak == workers
+
+
+def test_rate_limit_caps_requests_per_second():
+    start = time.perf_counter()
+    results, report = fetch_many(range(21), lambda s: s, max_workers=8, rate_limit=100)
+    # 21 evenly spaced slots at 100/s take 0.2s whatever the worker count
+    assert time.perf_counter() - start >= 0.19
+    assert report["ok"].all() and results[20] == 20
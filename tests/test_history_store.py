@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from core.chunked import download_matrix
+from core.history_store import MAX_HISTORY_START, HistoryStore, period_to_days
+
+
+class StubSource:
+    """download_fn serving closes from a wide frame, tickers in `empty` come back all NaN."""
+
+    def __init__(self, closes, empty=()):
+        self.closes = closes
+        self.empty = set(empty)
+        self.calls = []
+
+    def __call__(self, symbols, start):
+        self.calls.append((list(symbols), start))
+        wide = self.closes.loc[pd.Timestamp(start):, list(symbols)].copy()
+        for s in self.empty & set(symbols):
+            wide[s] = np.nan
+        return wide
+
+
+def closes(days=30, end="2024-03-01"):
+    dates = pd.bdate_range(end=end, periods=days)
+    return pd.DataFrame({"A": np.arange(days, dtype=float) + 10, "B": np.arange(days, dtype=float) + 20},
+                        index=dates)
+
+
+def test_empty_download_is_backfilled_on_the_next_run(tmp_path):
+    path = str(tmp_path / "history.parquet")
+    source = StubSource(closes(), empty={"B"})
+    HistoryStore(path, download_fn=source).update(["A", "B"], period="60d", today="2024-03-01")
+    assert set(HistoryStore(path).load()["Ticker"]) == {"A"}
+
+    source.empty = set()
+    wide = HistoryStore(path, download_fn=source).update(["A", "B"], period="60d", today="2024-03-01")
+    assert wide["B"].notna().sum() == 30
+    # B was asked for the whole window again, not only for the days after A's last bar
+    assert (["B"], "2024-01-01") in source.calls
+
+
+def test_last_bar_is_fetched_again(tmp_path):
+    path = str(tmp_path / "history.parquet")
+    data = closes()
+    source = StubSource(data)
+    HistoryStore(path, download_fn=source).update(["A"], period="60d", today="2024-03-01")
+
+    # the last bar was a partial intraday close, the source now has the final one
+    data.loc[data.index[-1], "A"] = 99.0
+    wide = HistoryStore(path, download_fn=source).update(["A"], period="60d", today="2024-03-01")
+    assert source.calls[-1] == (["A"], "2024-03-01")
+    assert wide["A"].iloc[-1] == 99.0
+    assert len(wide) == 30
+
+
+def test_failed_batch_keeps_the_others_and_retries_alone(tmp_path):
+    path = str(tmp_path / "history.parquet")
+    data = pd.concat([closes(), closes().add_prefix("X")], axis=1)
+    source = StubSource(data)
+
+    def flaky(symbols, start):
+        # a batch containing XB errors out, XB alone has no data at all
+        if "XB" in symbols:
+            source.calls.append((list(symbols), start))
+            raise RuntimeError("read timed out")
+        return source(symbols, start)
+
+    store = HistoryStore(path, download_fn=flaky, chunk_size=2, max_workers=2)
+    wide = store.update(["A", "B", "XA", "XB"], period="60d", today="2024-03-01")
+    assert list(wide.columns) == ["A", "B", "XA"]
+    assert (["XA"], "2024-01-01") in source.calls and (["XB"], "2024-01-01") in source.calls
+
+    # XB is back: only it is backfilled over the whole window
+    store.download_fn = source
+    before = len(source.calls)
+    wide = store.update(["A", "B", "XA", "XB"], period="60d", today="2024-03-01")
+    assert wide["XB"].notna().sum() == 30
+    backfills = [symbols for symbols, start in source.calls[before:] if start == "2024-01-01"]
+    assert backfills == [["XB"]]
+
+
+def test_ytd_and_max_periods():
+    assert period_to_days("ytd", today="2024-03-01") == 60
+    assert period_to_days("max", today="2024-03-01") == (pd.Timestamp("2024-03-01") - MAX_HISTORY_START).days
+    wide = closes()
+    matrix, dates, symbols, report = download_matrix(["A", "B"], period="max", today="2024-03-01",
+                                                     download_fn=lambda chunk, period: wide[list(chunk)])
+    assert matrix.shape == (30, 2) and dates[0] == wide.index[0]
+
+
+def test_warm_run_after_the_close_downloads_nothing(tmp_path):
+    path = str(tmp_path / "history.parquet")
+    source = StubSource(closes())
+    # 2024-03-01 is a Friday: at 11:00 its bar is partial, at 17:00 it is final
+    HistoryStore(path, download_fn=source).update(["A", "B"], period="60d", today="2024-03-01",
+                                                  now="2024-03-01 11:00")
+    HistoryStore(path, download_fn=source).update(["A", "B"], period="60d", today="2024-03-01",
+                                                  now="2024-03-01 11:30")
+    assert source.calls[-1] == (["A", "B"], "2024-03-01")
+    HistoryStore(path, download_fn=source).update(["A", "B"], period="60d", today="2024-03-01",
+                                                  now="2024-03-01 17:00")
+    calls = len(source.calls)
+    wide = HistoryStore(path, download_fn=source).update(["A", "B"], period="60d", today="2024-03-02",
+                                                         now="2024-03-02 10:00")
+    assert len(source.calls) == calls and wide.shape == (30, 2)
+
+
+def test_prune_drops_tickers_that_left_the_universe(tmp_path):
+    path = str(tmp_path / "history.parquet")
+    HistoryStore(path, download_fn=StubSource(closes())).update(["A", "B"], period="60d", today="2024-03-01")
+    assert HistoryStore(path).prune(["A"]) == ["B"]
+    assert set(HistoryStore(path).load()["Ticker"]) == {"A"}
@@ -0,0 +1,64 @@
+import pandas as pd
+
+import config
+import run_pipeline
+from core.rebalance import compute_trades, rebalance
+from core.writers import read_frame
+
+
+def target(shares, price=10.0):
+    return pd.DataFrame({"Ticker": ["A"], "Price": [price], "Shares": [float(shares)]})
+
+
+def test_held_back_resizes_accumulate_until_they_clear_the_band(tmp_path):
+    holdings = str(tmp_path / "holdings.parquet")
+    trades_path = str(tmp_path / "data" / "trades.csv")
+    traded = []
+    # 5% band: 102 and 104 are held back, 108 is 8% away from the 100 shares really held
+    for shares in (100, 102, 104, 108):
+        trades, _ = rebalance(target(shares), holdings, trades_path, band=0.05)
+        traded.append(trades["Shares"].tolist())
+    assert traded == [[100.0], [], [], [8.0]]
+    assert read_frame(holdings)["Shares"].tolist() == [108.0]
+
+
+def test_held_back_row_keeps_previous_shares(tmp_path):
+    holdings = str(tmp_path / "holdings.parquet")
+    trades_path = str(tmp_path / "trades.csv")
+    rebalance(pd.DataFrame({"Ticker": ["A", "B"], "Price": [10.0, 10.0], "Shares": [100.0, 100.0]}),
+              holdings, trades_path)
+    # A moves by 1% (held back), B is sold, C is bought
+    rebalance(pd.DataFrame({"Ticker": ["A", "C"], "Price": [10.0, 10.0], "Shares": [101.0, 50.0]}),
+              holdings, trades_path, band=0.05)
+    saved = read_frame(holdings).set_index("Ticker")["Shares"].to_dict()
+    assert saved == {"A": 100.0, "C": 50.0}
+
+
+def test_check_run_does_not_advance_the_baseline(tmp_path):
+    holdings = str(tmp_path / "holdings.parquet")
+    trades_path = str(tmp_path / "trades.csv")
+    rebalance(target(100), holdings, trades_path)
+    trades, _ = rebalance(target(200), holdings, trades_path, save_holdings=False)
+    assert trades["Shares"].tolist() == [100.0]
+    assert read_frame(holdings)["Shares"].tolist() == [100.0]
+
+
+def test_compute_trades_band_only_holds_back_resizes():
+    previous = pd.DataFrame({"Ticker": ["A", "B"], "Price": [10.0, 10.0], "Shares": [100.0, 1.0]})
+    trades, report = compute_trades(previous, target(101), band=0.05)
+    assert trades[["Ticker", "Side", "Shares"]].values.tolist() == [["B", "SELL", 1.0]]
+    assert report["n_suppressed"].tolist() == [1]
+
+
+def test_check_run_leaves_the_trade_list_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "HOLDINGS_SNAPSHOT", str(tmp_path / "holdings.parquet"))
+    monkeypatch.setattr(config, "TRADES_FILE", str(tmp_path / "trades.csv"))
+    run_pipeline.rebalance_trades(target(100))
+    before = open(config.TRADES_FILE).read()
+    trades = run_pipeline.rebalance_trades(target(200), save_holdings=False)
+    assert trades["Shares"].tolist() == [100.0]
+    assert open(config.TRADES_FILE).read() == before
+    # an explicit path still gets the check run's trades
+    check = str(tmp_path / "check.csv")
+    run_pipeline.rebalance_trades(target(200), save_holdings=False, trades_path=check)
+    assert read_frame(check)["Shares"].tolist() == [100.0]
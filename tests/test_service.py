@@ -0,0 +1,71 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import core.service
+from core.service import ScreenerService, make_handler
+from core.snapshot import Snapshot
+from core.synthetic import synthetic_market
+
+import config
+
+
+@pytest.fixture(scope="module")
+def url():
+    snapshot = Snapshot(*synthetic_market(200, 120))
+    service = ScreenerService(lambda: snapshot, defaults={"pipeline": config.PIPELINE, "filters": config.FILTERS})
+    service.refresh()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield "http://127.0.0.1:%d/screen" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"), method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_screen_ok(url):
+    status, payload = post(url, {"filters": {"pe": {"max_pe": 30}}, "portfolio_size": 50000})
+    assert status == 200
+    assert payload["summary"]["n_stocks"] == len(payload["allocation"]) > 0
+
+
+@pytest.mark.parametrize("body, message", [
+    ({"pipeline": ["rank"], "filters": {"rank": {"by": "nope", "top_n": 5}}}, "unknown rank metric"),
+    ({"portfolio_size": "lots"}, "portfolio_size"),
+    ({"portfolio_size": -5}, "portfolio_size"),
+    ({"filters": [1]}, "filters must be an object"),
+    ({"filters": {"pe": 3}}, "filters.pe"),
+    ({"pipeline": "price"}, "pipeline must be a list"),
+    ({"pipeline": ["price", "bogus"]}, "unknown pipeline steps: bogus"),
+    ({"allow_fractional": "yes"}, "allow_fractional"),
+    ({"filters": {"pe": {"max_pe": "thirty"}}}, "bad filter parameters"),
+    ({"filters": {"pe": {"unknown_param": 1}}}, "bad filter parameters"),
+    ({"filters": {"pe": {"max_pe": True}}}, "pe.max_pe must be a number"),
+    ({"pipeline": ["rank"], "filters": {"rank": {"top_n": "five"}}}, "rank.top_n must be a number"),
+    ({"pipeline": ["rank"], "filters": {"rank": {"metric_params": {"weeks": 2}}}}, "takes no parameter 'weeks'"),
+])
+def test_bad_requests_are_400(url, body, message):
+    status, payload = post(url, body)
+    assert status == 400
+    assert message in payload["error"]
+
+
+def test_errors_inside_the_screen_are_500(url, monkeypatch):
+    def broken(*args, **kwargs):
+        raise ValueError("operands could not be broadcast together")
+    monkeypatch.setattr(core.service, "screen", broken)
+    status, payload = post(url, {"portfolio_size": 12345})
+    assert status == 500
+    assert "broadcast" in payload["error"]
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from core.cache import DiskCache
+from core.price_matrix import write_price_matrix
+from core.snapshot import Snapshot, dated_snapshot, open_snapshot, save_snapshot, snapshot_exists
+from core.synthetic import synthetic_market
+
+
+def test_reader_never_sees_a_partial_snapshot(tmp_path):
+    directory = str(tmp_path / "snapshot")
+    prices, fundamentals, history = synthetic_market(50, 60)
+    save_snapshot(Snapshot(prices, fundamentals, history), directory)
+
+    done = threading.Event()
+    errors = []
+
+    def reader():
+        while not done.is_set():
+            try:
+                snapshot = open_snapshot(directory)
+                if snapshot.history is None or snapshot.fundamentals is None or len(snapshot.prices) != len(prices):
+                    errors.append("partial snapshot")
+            except Exception as e:
+                errors.append(repr(e))
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for _ in range(20):
+        save_snapshot(Snapshot(prices, fundamentals, history), directory)
+    done.set()
+    for t in threads:
+        t.join()
+    assert errors == []
+    # the active version plus the ones kept for readers still opening them
+    assert len([name for name in os.listdir(directory) if name.startswith("v")]) == 3
+
+
+def test_unversioned_layout_still_opens(tmp_path):
+    directory = str(tmp_path / "snapshot")
+    prices, _, history = synthetic_market(20, 30)
+    os.makedirs(directory)
+    prices.to_parquet(os.path.join(directory, "prices.parquet"), index=False)
+    write_price_matrix(history, os.path.join(directory, "history"))
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        f.write('{"fetched_at": 0}')
+    assert snapshot_exists(directory)
+    assert open_snapshot(directory).history.shape == history.shape
+
+    save_snapshot(Snapshot(prices, None, history), directory)
+    assert not os.path.exists(os.path.join(directory, "meta.json"))
+    assert open_snapshot(directory).fundamentals is None
+
+
+def test_snapshot_is_dated_by_the_oldest_cached_market_data(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl={"prices": 86400, "constituents": 86400})
+    frame = pd.DataFrame({"Ticker": ["A"], "Price": [1.0]})
+    for dataset, age in (("prices", 600), ("constituents", 7200)):
+        cache.put(dataset, "k", frame)
+        written = time.time() - age
+        os.utime(os.path.join(str(tmp_path), dataset, "k.parquet"), (written, written))
+        cache.get(dataset, "k")
+    prices, fundamentals, history = synthetic_market(10, 20)
+    # the constituent list does not age the market data
+    assert 599 < dated_snapshot(prices, fundamentals, history, cache).age_seconds() < 610
+    assert dated_snapshot(prices, fundamentals, history).age_seconds() < 1
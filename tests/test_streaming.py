@@ -0,0 +1,24 @@
+import pandas as pd
+
+from core.streaming import StreamingScreen
+
+
+def apply_delta(state, delta):
+    for row in delta.itertuples(index=False):
+        if row.Change == "removed":
+            state.pop(row.Ticker, None)
+        else:
+            state[row.Ticker] = (row.Weight, row.Dollar_Allocation, row.Shares)
+    return state
+
+
+def test_deltas_reproduce_the_allocation_when_the_count_changes():
+    prices = pd.DataFrame({"Ticker": ["A", "B", "C"], "Price": [1000.0, 20.0, 30.0]})
+    stream = StreamingScreen(prices, pipeline=["price"], filters={"price": {"min_price": 5}}, portfolio_size=900)
+    state = apply_delta({}, stream.update()[0])
+    # C drops below the minimum price: A's weight goes from 1/3 to 1/2 with 0 shares either way
+    delta, _ = stream.update({"C": 1.0})
+    assert set(delta["Ticker"]) == {"A", "B", "C"}
+    apply_delta(state, delta)
+    expected = stream.allocation().set_index("Ticker")
+    assert state == {t: (row.Weight, row.Dollar_Allocation, row.Shares) for t, row in expected.iterrows()}
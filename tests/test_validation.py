@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from core.synthetic import synthetic_market
+from core.validation import validate
+
+
+def test_mostly_missing_history_quarantines_instead_of_crashing():
+    prices, fundamentals, history = synthetic_market(100, 60)
+    # a rate limited fetch: 60 of 100 tickers came back without closes, every date is "sparse"
+    history.iloc[:, :60] = np.nan
+    clean, kept, quarantine, report = validate(prices, fundamentals, history)
+    assert report["history_bars"] == 60
+    assert report["sparse_dates"] == 0
+    assert len(kept) == 60
+    blank = set(history.columns[:60])
+    assert set(quarantine["Ticker"]) == blank & set(prices["Ticker"])
+    assert all("low_coverage" in reasons for reasons in quarantine["Reasons"])
+    assert not blank & set(clean["Ticker"]) and len(clean)
+
+
+def test_history_that_stopped_updating_is_stale_for_everyone():
+    prices, fundamentals, history = synthetic_market(50, 60)
+    last = history.index[-1]
+    _, _, quarantine, report = validate(prices, fundamentals, history, as_of=last + pd.Timedelta(days=1))
+    assert report["history_lag_days"] == 1 and not report["reasons"].get("stale_history")
+    clean, _, quarantine, report = validate(prices, fundamentals, history, as_of=last + pd.Timedelta(days=14))
+    assert report["history_lag_days"] == 10
+    assert clean.empty and report["reasons"]["stale_history"] == len(prices)
+
+
+def test_warn_only_reasons_are_reported_not_quarantined():
+    prices, fundamentals, history = synthetic_market(50, 60)
+    ticker = prices["Ticker"].iloc[0]
+    history.iloc[-10:, history.columns.get_loc(ticker)] *= 2.5
+    prices.loc[0, "Price"] = history[ticker].iloc[-1]
+    _, _, quarantine, report = validate(prices, fundamentals, history)
+    assert quarantine["Ticker"].tolist() == [ticker]
+    clean, _, quarantine, report = validate(prices, fundamentals, history, warn_only=["history_jump"])
+    assert quarantine.empty and ticker in set(clean["Ticker"])
+    assert report["warnings"] == {"history_jump": 1}
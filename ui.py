@@ -1,25 +1,55 @@
 import streamlit as st
 import pandas as pd
-import io
+import time
 
-from core.data_loader import get_sp500_symbols, fetch_latest_prices, fetch_fundamentals, fetch_history
 from core.equal_weight import apply_equal_weight
+from core.runtime import fetch_snapshot, saved_snapshot
 from core.utils import summary_stats
+from core.writers import EXTENSIONS, MIME_TYPES, frame_bytes
+import config
 
-from filters.price_filter import filter_by_price
-from filters.volume_filter import filter_by_volume
-from filters.marketcap_filter import filter_by_marketcap
-from filters.pe_filter import filter_by_pe
-from filters.dividend_filter import filter_by_dividend
-from filters.beta_filter import filter_by_beta
-from filters.volatility_filter import filter_by_volatility
-from filters.momentum_filter import filter_by_momentum
-from filters.sector_filter import filter_by_sector
+from core.screen import screen
 
 st.set_page_config(page_title="S&P 500 Equal-Weight Screener", layout="wide")
 
+
+# Data snapshot: fetched once and shared by every session until it expires or is refreshed
+@st.cache_resource(ttl=config.SNAPSHOT_TTL, show_spinner="Fetching market data...")
+def get_snapshot(force_refresh=False):
+    # a fresh on-disk snapshot (e.g. from run_pipeline) opens memory-mapped without fetching
+    # an explicit refresh downloads again instead of reading the disk cache
+    snapshot = None if force_refresh else saved_snapshot(max_age=config.SNAPSHOT_TTL)
+    return snapshot or fetch_snapshot(refresh=force_refresh)
+
+
+# Screen + allocation memoized by parameters (and snapshot time), so going back to a setting is instant
+@st.cache_data(max_entries=64, show_spinner=False)
+def run_screen(fetched_at, pipeline, params, portfolio_size, _snapshot):
+    df = screen(_snapshot.prices, _snapshot.fundamentals, _snapshot.history, pipeline, params)
+    final = apply_equal_weight(df, portfolio_size=portfolio_size)
+    return final, summary_stats(final, portfolio_size)
+
+
+# serializing the download is the slow part of a re-screen, so it is memoized as well
+@st.cache_data(max_entries=16, show_spinner=False)
+def download_bytes(final, fmt):
+    return frame_bytes(final, fmt)
+
+
 st.title("📊 S&P 500 Equal Weight Screener")
-st.write("Use the controls on the left to customize filter settings and then run the screener.")
+st.write("Use the controls on the left to customize filter settings, results update as you change them.")
+
+# Data controls
+st.sidebar.header("Data")
+refresh = st.sidebar.button("Refresh data 🔄")
+if refresh:
+    get_snapshot.clear()
+    run_screen.clear()
+snapshot = get_snapshot(force_refresh=refresh)
+age_minutes = snapshot.age_seconds() / 60
+# fetched_at is the oldest source the cache served, not the time of the last refresh
+st.sidebar.caption("Data as of %s (%.0f min old)" % (
+    time.strftime("%Y-%m-%d %H:%M", time.localtime(snapshot.fetched_at)), age_minutes))
 
 # Sidebar settings
 st.sidebar.header("Filter Settings")
@@ -67,64 +97,35 @@ use_sector = st.sidebar.checkbox("Enable Sector Filter", value=False)
 include_sector = st.sidebar.text_input("Include sectors (comma-separated)", "")
 exclude_sector = st.sidebar.text_input("Exclude sectors (comma-separated)", "")
 
-# Run button
-run_button = st.sidebar.button("Run Screener 🚀")
-
-# When clicked
-if run_button:
-    st.write("### Running Screener...")
-    st.write("Fetching data...")
-
-    symbols = get_sp500_symbols()
-    prices_df = fetch_latest_prices(symbols)
-    fundamentals = fetch_fundamentals(prices_df["Ticker"].tolist())
-    history = fetch_history(prices_df["Ticker"].tolist())
-
-    df = prices_df.copy()
-
-    # Apply filters
-    if use_price:
-        df = filter_by_price(df, min_price=min_price, max_price=max_price)
-
-    if use_volume:
-        df = filter_by_volume(df, fundamentals_df=fundamentals, min_avg_volume=min_volume)
-
-    if use_mcap:
-        df = filter_by_marketcap(df, fundamentals_df=fundamentals, min_mcap=min_mcap)
-
-    if use_pe:
-        df = filter_by_pe(df, fundamentals_df=fundamentals, max_pe=max_pe)
-
-    if use_dividend:
-        df = filter_by_dividend(df, fundamentals_df=fundamentals, min_yield=min_yield)
-
-    if use_beta:
-        df = filter_by_beta(df, fundamentals_df=fundamentals, max_beta=max_beta)
-
-    if use_volatility:
-        df = filter_by_volatility(df, price_history_df=history, window_days=window_days, max_vol=max_vol)
-
-    if use_momentum:
-        df = filter_by_momentum(df, price_history_df=history, months=months, min_return=min_return)
-
-    if use_sector:
-        include_list = [s.strip() for s in include_sector.split(",") if s.strip()]
-        exclude_list = [s.strip() for s in exclude_sector.split(",") if s.strip()]
-        df = filter_by_sector(df, fundamentals_df=fundamentals, include=include_list, exclude=exclude_list)
-
-    # Apply equal weight
-    final = apply_equal_weight(df, portfolio_size=portfolio_size)
-
-    # Summary
-    stats = summary_stats(final, portfolio_size)
-    st.subheader("📈 Summary")
-    st.write(stats)
-
-    # Show table
-    st.subheader("📋 Screener Results")
-    st.dataframe(final, use_container_width=True)
-
-    # Download Excel
-    buffer = io.BytesIO()
-    final.to_excel(buffer, index=False)
-    st.download_button("Download Excel File", data=buffer, file_name="screener_output.xlsx")
+# Build the pipeline from the enabled filters and re-screen the in-memory snapshot
+include_list = [s.strip() for s in include_sector.split(",") if s.strip()]
+exclude_list = [s.strip() for s in exclude_sector.split(",") if s.strip()]
+steps = [
+    ("price", use_price, {"min_price": min_price, "max_price": max_price}),
+    ("volume", use_volume, {"min_avg_volume": min_volume}),
+    ("marketcap", use_mcap, {"min_mcap": min_mcap}),
+    ("pe", use_pe, {"max_pe": max_pe}),
+    ("dividend", use_dividend, {"min_yield": min_yield}),
+    ("beta", use_beta, {"max_beta": max_beta}),
+    ("volatility", use_volatility, {"window_days": window_days, "max_vol": max_vol}),
+    ("momentum", use_momentum, {"months": months, "min_return": min_return}),
+    ("sector", use_sector, {"include": include_list, "exclude": exclude_list}),
+]
+pipeline = tuple(name for name, enabled, _ in steps if enabled)
+params = {name: p for name, _, p in steps if name in pipeline}
+
+# Apply filters and equal weight (memoized)
+final, stats = run_screen(snapshot.fetched_at, pipeline, params, portfolio_size, snapshot)
+
+# Summary
+st.subheader("📈 Summary")
+st.write(stats)
+
+# Show table
+st.subheader("📋 Screener Results")
+st.dataframe(final, use_container_width=True)
+
+# Download
+download_format = st.selectbox("Download format", ["xlsx", "csv", "parquet", "feather"])
+st.download_button("Download results (%s)" % download_format, data=download_bytes(final, download_format),
+                   file_name="screener_output" + EXTENSIONS[download_format], mime=MIME_TYPES[download_format])